@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Limpieza del disco de la web: uploads/, results/ y los cachés en disco.
+Cada /upload deja su carpeta procesamiento_<timestamp>, cada torneo su carpeta
+torneo_<timestamp>, y los cachés de brackets y de ZIP crecen con cada corrida.
+El gestor borra:
+
+- lo que no se usa hace más de STORAGE_RETENTION_HOURS horas, y
+- si el total supera STORAGE_QUOTA_MB, lo usado hace más tiempo (LRU) hasta
+  volver a entrar en la cuota.
+
+Un trabajo (subida + resultados del mismo timestamp) se borra entero y su
+registro en la cola de trabajos queda como expirado (/status y /download
+responden 410). El
+"último uso" es el mtime más reciente de la carpeta o archivo; las descargas y
+los aciertos de los cachés lo actualizan. Nunca se borran los trabajos en cola
+o en proceso ni lo modificado en los últimos minutos (GRACIA_S).
+
+El barrido corre en un hilo cada STORAGE_SWEEP_MINUTES minutos y también a mano:
+    python almacenamiento.py [--simular] [--retencion-horas N] [--cuota-mb N]
+"""
+
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from cache_brackets import resolver_carpeta_cache
+from exportacion_zip import resolver_carpeta_cache_zip
+
+RETENCION_POR_DEFECTO_HORAS = 168
+INTERVALO_POR_DEFECTO_MINUTOS = 30
+# Nada modificado hace menos de esto se borra (subidas aún sin encolar, ZIP a medio escribir)
+GRACIA_S = 15 * 60
+# /status mide de nuevo si la última medición es más vieja que esto
+EDAD_MAXIMA_METRICAS_S = 60
+PREFIJOS_SUBIDAS = ('procesamiento_', 'temp_', 'editor_pdf_')
+PREFIJO_RESULTADOS = 'torneo_'
+MB = 1024 * 1024
+
+def _numero(valor, variable, por_defecto):
+    if valor is None:
+        valor = os.environ.get(variable, por_defecto)
+    try:
+        return max(float(valor), 0)
+    except (TypeError, ValueError):
+        print(f"⚠️ Valor inválido para {variable} '{valor}', se usa {por_defecto}")
+        return por_defecto
+
+def resolver_retencion_horas(valor=None):
+    """Horas sin uso antes de borrar. None = variable STORAGE_RETENTION_HOURS; 0 = sin vencimiento."""
+    return _numero(valor, 'STORAGE_RETENTION_HOURS', RETENCION_POR_DEFECTO_HORAS)
+
+def resolver_cuota_mb(valor=None):
+    """Espacio máximo en MB. None = variable STORAGE_QUOTA_MB; 0 = sin cuota."""
+    return _numero(valor, 'STORAGE_QUOTA_MB', 0)
+
+def resolver_intervalo_minutos(valor=None):
+    """Minutos entre barridos. None = variable STORAGE_SWEEP_MINUTES; 0 = sin barrido automático."""
+    return _numero(valor, 'STORAGE_SWEEP_MINUTES', INTERVALO_POR_DEFECTO_MINUTOS)
+
+def tocar(ruta):
+    """Marca la carpeta o archivo como recién usado (para el descarte LRU)."""
+    try:
+        os.utime(ruta)
+    except OSError:
+        pass
+
+def medir(ruta):
+    """(bytes, último uso) de un archivo o carpeta; el uso es el mtime más reciente del contenido."""
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return 0, 0
+    if not os.path.isdir(ruta):
+        return estado.st_size, estado.st_mtime
+    total, uso = 0, estado.st_mtime
+    pendientes = [ruta]
+    while pendientes:
+        try:
+            with os.scandir(pendientes.pop()) as entradas:
+                for entrada in entradas:
+                    try:
+                        if entrada.is_dir(follow_symlinks=False):
+                            pendientes.append(entrada.path)
+                            uso = max(uso, entrada.stat(follow_symlinks=False).st_mtime)
+                        else:
+                            estado = entrada.stat(follow_symlinks=False)
+                            total += estado.st_size
+                            uso = max(uso, estado.st_mtime)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total, uso
+
+def _archivos(carpeta):
+    """Rutas de todos los archivos bajo carpeta (los cachés se descartan archivo por archivo)."""
+    for raiz, _, nombres in os.walk(carpeta):
+        for nombre in nombres:
+            yield os.path.join(raiz, nombre)
+
+def _borrar(ruta):
+    try:
+        if os.path.isdir(ruta):
+            shutil.rmtree(ruta)
+        else:
+            os.remove(ruta)
+        return True
+    except FileNotFoundError:
+        return True
+    except OSError as e:
+        print(f"⚠️ No se pudo borrar {ruta}: {e}")
+        return False
+
+class GestorAlmacenamiento:
+    """
+    Inventario y limpieza de subidas, resultados y cachés en disco.
+    protegidos: función que devuelve los ids de los trabajos que no se pueden
+    borrar (los de la cola que siguen en_cola o en_proceso).
+    al_borrar: función que recibe el id de cada trabajo borrado (para marcar su
+    registro como expirado).
+    """
+
+    def __init__(self, carpeta_subidas, carpeta_resultados, carpetas_cache=None,
+                 retencion_horas=None, cuota_mb=None, protegidos=None, al_borrar=None):
+        self.carpeta_subidas = carpeta_subidas
+        self.carpeta_resultados = carpeta_resultados
+        # {área: carpeta} de los cachés (None = desactivado)
+        self.carpetas_cache = {area: carpeta for area, carpeta in (carpetas_cache or {}).items() if carpeta}
+        self.retencion_horas = resolver_retencion_horas(retencion_horas)
+        self.cuota_mb = resolver_cuota_mb(cuota_mb)
+        self.protegidos = protegidos or (lambda: set())
+        self.al_borrar = al_borrar
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._detener = threading.Event()
+        self._medicion = None
+        self.barridos = 0
+        self.borrados = 0
+        self.bytes_liberados = 0
+        self.ultimo_barrido = None
+
+    @classmethod
+    def desde_config(cls, config, protegidos=None, al_borrar=None):
+        """Instancia con las carpetas y valores de la configuración de la app."""
+        resultados = config['RESULTS_FOLDER']
+        return cls(config['UPLOAD_FOLDER'], resultados,
+                   carpetas_cache={'cache_brackets': resolver_carpeta_cache(resultados, config['BRACKET_CACHE']),
+                                   'cache_zip': resolver_carpeta_cache_zip(resultados, config['ZIP_CACHE'])},
+                   retencion_horas=config['STORAGE_RETENTION_HOURS'], cuota_mb=config['STORAGE_QUOTA_MB'],
+                   protegidos=protegidos, al_borrar=al_borrar)
+
+    def _elementos(self):
+        """[(área, trabajo o None, ruta)] de todo lo que el gestor puede borrar."""
+        elementos = []
+        for area, carpeta, prefijos in (('subidas', self.carpeta_subidas, PREFIJOS_SUBIDAS),
+                                        ('resultados', self.carpeta_resultados, (PREFIJO_RESULTADOS,))):
+            try:
+                nombres = sorted(os.listdir(carpeta))
+            except OSError:
+                continue
+            for nombre in nombres:
+                prefijo = next((p for p in prefijos if nombre.startswith(p)), None)
+                if prefijo:
+                    elementos.append((area, nombre[len(prefijo):], os.path.join(carpeta, nombre)))
+        for area, carpeta in self.carpetas_cache.items():
+            elementos.extend((area, None, ruta) for ruta in _archivos(carpeta))
+        return elementos
+
+    def inventario(self):
+        """
+        Unidades que se pueden borrar: dicts con rutas, areas, trabajo, bytes y uso
+        (epoch). La subida y los resultados de un mismo timestamp son una unidad.
+        """
+        unidades = {}
+        for area, trabajo, ruta in self._elementos():
+            clave = ('trabajo', trabajo) if trabajo else ('ruta', ruta)
+            tamano, uso = medir(ruta)
+            unidad = unidades.setdefault(clave, {'rutas': [], 'areas': {}, 'trabajo': trabajo, 'bytes': 0, 'uso': 0})
+            unidad['rutas'].append(ruta)
+            unidad['areas'][area] = unidad['areas'].get(area, 0) + tamano
+            unidad['bytes'] += tamano
+            unidad['uso'] = max(unidad['uso'], uso)
+        return list(unidades.values())
+
+    def _medir_uso(self, unidades):
+        """Bytes y cantidad por área, más el total y el espacio libre del disco."""
+        areas = {area: {'bytes': 0, 'elementos': 0}
+                 for area in ['subidas', 'resultados', *self.carpetas_cache]}
+        for unidad in unidades:
+            for area, tamano in unidad['areas'].items():
+                areas[area]['bytes'] += tamano
+                areas[area]['elementos'] += 1
+        medicion = {
+            'total_mb': round(sum(u['bytes'] for u in unidades) / MB, 1),
+            'areas': {area: {'mb': round(d['bytes'] / MB, 1), 'elementos': d['elementos']} for area, d in areas.items()},
+            'medido': datetime.now().isoformat(timespec='seconds'),
+        }
+        try:
+            disco = shutil.disk_usage(self.carpeta_resultados)
+            medicion['disco_libre_mb'] = round(disco.free / MB, 1)
+            medicion['disco_total_mb'] = round(disco.total / MB, 1)
+        except OSError:
+            pass
+        with self._lock:
+            self._medicion = (time.monotonic(), medicion)
+        return medicion
+
+    def uso(self):
+        """Espacio ocupado por área (medido ahora)."""
+        return self._medir_uso(self.inventario())
+
+    def barrer(self, simular=False):
+        """
+        Borra lo vencido y, si hace falta, lo menos usado hasta entrar en la cuota.
+        simular=True solo informa qué se borraría. Devuelve el resumen del barrido.
+        """
+        inicio = time.perf_counter()
+        ahora = time.time()
+        unidades = self.inventario()
+        protegidos = set(self.protegidos())
+        total = sum(u['bytes'] for u in unidades)
+        candidatas = sorted((u for u in unidades
+                             if u['trabajo'] not in protegidos and ahora - u['uso'] > GRACIA_S),
+                            key=lambda u: u['uso'])
+        limite_uso = ahora - self.retencion_horas * 3600
+        cuota = self.cuota_mb * MB
+        a_borrar = []
+        for unidad in candidatas:
+            vencida = self.retencion_horas and unidad['uso'] < limite_uso
+            if not vencida and not (cuota and total > cuota):
+                continue
+            a_borrar.append((unidad, 'vencida' if vencida else 'cuota'))
+            total -= unidad['bytes']
+
+        borradas = []
+        for unidad, motivo in a_borrar:
+            if simular or all([_borrar(ruta) for ruta in unidad['rutas']]):
+                borradas.append((unidad, motivo))
+                if not simular:
+                    self._avisar_borrado(unidad['trabajo'])
+        liberados = sum(u['bytes'] for u, _ in borradas)
+        resumen = {
+            'simulado': simular,
+            'borrados': len(borradas),
+            'vencidos': sum(1 for _, motivo in borradas if motivo == 'vencida'),
+            'por_cuota': sum(1 for _, motivo in borradas if motivo == 'cuota'),
+            'liberados_mb': round(liberados / MB, 1),
+            'protegidos': sum(1 for u in unidades if u['trabajo'] in protegidos),
+            'sobre_cuota': bool(cuota and total > cuota),
+            'duracion_s': round(time.perf_counter() - inicio, 3),
+        }
+        if not simular:
+            restantes = [u for u in unidades if all(u is not b for b, _ in borradas)]
+            resumen['uso'] = self._medir_uso(restantes)
+            with self._lock:
+                self.barridos += 1
+                self.borrados += len(borradas)
+                self.bytes_liberados += liberados
+                self.ultimo_barrido = {k: v for k, v in resumen.items() if k != 'uso'}
+                self.ultimo_barrido['fecha'] = datetime.now().isoformat(timespec='seconds')
+        if borradas or resumen['sobre_cuota']:
+            accion = "se borrarían" if simular else "borrados"
+            print(f"🧹 Almacenamiento: {len(borradas)} elementos {accion} ({resumen['liberados_mb']} MB)"
+                  + (" ⚠️ todavía sobre la cuota" if resumen['sobre_cuota'] else ""))
+        return resumen
+
+    def _avisar_borrado(self, trabajo):
+        if trabajo is None or self.al_borrar is None:
+            return
+        try:
+            self.al_borrar(trabajo)
+        except Exception as e:
+            print(f"⚠️ No se pudo marcar como expirado el trabajo {trabajo}: {e}")
+
+    def iniciar(self, intervalo_minutos=None):
+        """Lanza el hilo que barre cada intervalo_minutos (None = STORAGE_SWEEP_MINUTES; 0 = no lanza)."""
+        intervalo = resolver_intervalo_minutos(intervalo_minutos)
+        if not intervalo or not (self.retencion_horas or self.cuota_mb):
+            return False
+        with self._lock:
+            if self._hilo is not None:
+                return True
+            self._hilo = threading.Thread(target=self._bucle, args=(intervalo * 60,),
+                                          name="almacenamiento", daemon=True)
+            self._hilo.start()
+        return True
+
+    def detener(self):
+        self._detener.set()
+
+    def _bucle(self, intervalo_s):
+        while not self._detener.wait(intervalo_s):
+            try:
+                self.barrer()
+            except Exception as e:
+                print(f"❌ Error limpiando el almacenamiento: {e}")
+
+    def estadisticas(self):
+        with self._lock:
+            medicion = self._medicion
+        if medicion is None or time.monotonic() - medicion[0] > EDAD_MAXIMA_METRICAS_S:
+            uso = self.uso()
+        else:
+            uso = medicion[1]
+        with self._lock:
+            return {
+                **uso,
+                'retencion_horas': self.retencion_horas,
+                'cuota_mb': self.cuota_mb,
+                'barrido_automatico': self._hilo is not None,
+                'barridos': self.barridos,
+                'borrados': self.borrados,
+                'liberados_mb': round(self.bytes_liberados / MB, 1),
+                'ultimo_barrido': self.ultimo_barrido,
+            }
+
+def _trabajos_activos_del_almacen():
+    """Ids de los trabajos en cola o en proceso de JOB_STORE (sin JOB_STORE no hay forma de saberlo)."""
+    from trabajos import crear_almacen
+    ruta = os.environ.get('JOB_STORE', '')
+    return {trabajo['id'] for trabajo in crear_almacen(ruta).pendientes()} if ruta else set()
+
+def _expirar_en_almacen(trabajo_id):
+    """Marca el trabajo como expirado en JOB_STORE (en memoria los registros son de la app)."""
+    from trabajos import crear_almacen, expirar
+    ruta = os.environ.get('JOB_STORE', '')
+    return expirar(crear_almacen(ruta), trabajo_id) if ruta else False
+
+def main():
+    import argparse
+    from config import get_config
+    configuracion = get_config()
+    parser = argparse.ArgumentParser(description="Limpia uploads/, results/ y los cachés en disco")
+    parser.add_argument('--subidas', default=configuracion.UPLOAD_FOLDER, help="carpeta de uploads")
+    parser.add_argument('--resultados', default=configuracion.RESULTS_FOLDER, help="carpeta de resultados")
+    parser.add_argument('--retencion-horas', type=float, default=None,
+                        help="horas sin uso antes de borrar (por defecto STORAGE_RETENTION_HOURS o 168; 0 = nunca)")
+    parser.add_argument('--cuota-mb', type=float, default=None,
+                        help="espacio máximo en MB (por defecto STORAGE_QUOTA_MB; 0 = sin cuota)")
+    parser.add_argument('--simular', action='store_true', help="solo mostrar qué se borraría")
+    parser.add_argument('--uso', action='store_true', help="solo mostrar el espacio ocupado")
+    args = parser.parse_args()
+
+    gestor = GestorAlmacenamiento(
+        args.subidas, args.resultados,
+        carpetas_cache={'cache_brackets': resolver_carpeta_cache(args.resultados),
+                        'cache_zip': resolver_carpeta_cache_zip(args.resultados)},
+        retencion_horas=args.retencion_horas, cuota_mb=args.cuota_mb,
+        protegidos=_trabajos_activos_del_almacen, al_borrar=_expirar_en_almacen)
+    if not args.uso:
+        resumen = gestor.barrer(simular=args.simular)
+        print(f"🧹 {'Se borrarían' if args.simular else 'Borrados'}: {resumen['borrados']} "
+              f"({resumen['vencidos']} vencidos, {resumen['por_cuota']} por cuota, "
+              f"{resumen['protegidos']} trabajos activos protegidos)")
+    uso = gestor.uso()
+    print(f"💾 Ocupado: {uso['total_mb']} MB"
+          + (f" (cuota {gestor.cuota_mb:g} MB)" if gestor.cuota_mb else "")
+          + (f", libre en disco: {uso['disco_libre_mb']} MB" if 'disco_libre_mb' in uso else ""))
+    for area, datos in uso['areas'].items():
+        print(f"   {area}: {datos['mb']} MB en {datos['elementos']} elementos")
+
+if __name__ == "__main__":
+    main()
@@ -9,30 +9,36 @@ import os
 
 from flask_cors import CORS
 
-from flask import Flask, render_template, request, jsonify, send_file, send_from_directory
+from flask import Flask, Response, render_template, request, jsonify, send_file, send_from_directory, stream_with_context
 import tempfile
 import shutil
 from pathlib import Path
-import zipfile
 from datetime import datetime
 import traceback
 
 # Importar la lógica existente
-from filo_0_5 import AgrupadorMultiple, generar_brackets_desde_excel, generar_resumen_torneo
+from filo_0_5 import (PERFILES_RENDER, AgrupadorMultiple, contadores_cache_plantillas, generar_brackets_desde_df,
+                      generar_brackets_desde_excel, generar_resumen_torneo, precargar_fuentes)
+from trabajos import GestorTrabajos, crear_almacen, COMPLETADO, ERROR, EXPIRADO
+from fuentes import registro_fuentes
+from instrumentacion import perfilar
+from clasificacion_por_bloques import resolver_filas_por_bloque
+from lector_excel import leer_columnas, leer_encabezados, leer_excel
+from mapeo_columnas import mapeador_columnas
+from payload_editor import armar_categorias_editor
+from esquema_torneo import compactar_participantes, memoria_mb
+from snapshot_torneo import guardar_snapshot
+from cache_brackets import CacheBrackets
+from cache_plantillas import cache_plantillas
+from exportacion_zip import CacheZip, archivos_resultados, es_entregable, generar_zip, huella_resultados
+from almacenamiento import GestorAlmacenamiento, tocar
 import pandas as pd
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 
-# 🎨 ESTILO MEXXUS ARENA
-MEXXUS_COLORS = {
-    'gold': colors.Color(0.85, 0.65, 0.125),        # Dorado Mexxus
-    'dark_gold': colors.Color(0.72, 0.53, 0.04),    # Dorado oscuro
-    'red_fighter': colors.Color(0.8, 0.15, 0.15),   # Rojo luchador
-    'blue_fighter': colors.Color(0.15, 0.35, 0.8),  # Azul luchador
-    'dark_gray': colors.Color(0.2, 0.2, 0.2),       # Gris oscuro
-    'light_gray': colors.Color(0.95, 0.95, 0.95)    # Gris claro
-}
+# 🎨 ESTILO MEXXUS ARENA (definido junto al dibujo de llaves)
+from bracket_vectorial import MEXXUS_COLORS, MAX_PARTICIPANTES, dibujar_llave
 
 app = Flask(__name__)
 CORS(app)
@@ -48,6 +54,9 @@ app.config.from_object(config)
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['RESULTS_FOLDER'], exist_ok=True)
 
+# Fuentes de los brackets resueltas al arrancar (no en el primer torneo)
+precargar_fuentes(app.config['BRACKET_RENDER_PROFILE'])
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
@@ -72,6 +81,143 @@ def serve_bracket_template(filename):
     """Sirve las plantillas de brackets estáticamente."""
     return send_from_directory('bracket_templates', filename)
 
+def procesar_torneo(progreso, archivos, carpeta_salida, timestamp, perfil=None):
+    """
+    Pipeline completo de un torneo: lectura, CATEGORIAS, SOLOS, brackets y resumen.
+    Se ejecuta dentro de un trabajo de la cola; progreso registra cada etapa.
+    perfil: calidad de los brackets (None = BRACKET_RENDER_PROFILE, ver PERFILES_RENDER).
+    """
+    os.makedirs(carpeta_salida, exist_ok=True)
+    
+    # Perfilado opcional (FILO_PERFIL): se guarda junto a resumen_torneo.txt
+    with perfilar(carpeta_salida):
+        # Procesar archivos usando la lógica existente
+        agrupador = AgrupadorMultiple(fecha_referencia=app.config['TOURNAMENT_DATE'])
+        
+        # CLASSIFY_CHUNK_ROWS > 0: clasificación en bloques, CATEGORIAS.xlsx se escribe al leer
+        filas_por_bloque = resolver_filas_por_bloque(app.config['CLASSIFY_CHUNK_ROWS'])
+        with progreso.etapa('lectura') as etapa:
+            if filas_por_bloque:
+                df = agrupador.procesar_archivos_por_bloques(archivos, carpeta_salida, filas_por_bloque)
+                filas_leidas = 0 if df is None else df.filas_leidas
+                etapa.contar(bloques=0 if df is None else df.bloques)
+                etapa.archivos(None if df is None else df.archivo_categorias)
+            else:
+                df = agrupador.procesar_multiples_archivos(archivos, combinar=True,
+                                                           workers=app.config['INGEST_WORKERS'])
+                filas_leidas = 0 if df is None else len(df)
+                if df is not None:
+                    etapa.contar(memoria_df_mb=memoria_mb(df))
+            etapa.contar(archivos=len(archivos), filas=filas_leidas,
+                         fechas_no_reconocidas=agrupador.fechas.no_reconocidas)
+        
+        if filas_leidas == 0:
+            raise ValueError('No se pudieron procesar participantes')
+        
+        # Filtrar filas inválidas
+        if not filas_por_bloque:
+            df = df[df['categoria_completa'].notnull()]
+        if len(df) == 0:
+            raise ValueError('No quedan filas válidas para procesar')
+        
+        # 1. Exportar Excel de categorías (en bloques ya quedó escrito al leer)
+        with progreso.etapa('categorias') as etapa:
+            if filas_por_bloque:
+                excel_categorias = df.archivo_categorias
+                etapa.contar(filas=len(df), categorias=len(df.categorias))
+            else:
+                excel_categorias = agrupador.exportar_categorias_unico_excel(df, carpeta_salida)
+                etapa.contar(filas=len(df), categorias=int(df['categoria_completa'].nunique()),
+                             memoria_df_mb=memoria_mb(df))
+                etapa.archivos(excel_categorias, guardar_snapshot(df, carpeta_salida, app.config['TOURNAMENT_SNAPSHOT']))
+        
+        # 2. Identificar y exportar solos
+        with progreso.etapa('solos') as etapa:
+            df_solos = df.solos() if filas_por_bloque else agrupador.identificar_solos(df)
+            excel_solos = agrupador.exportar_solos(df_solos, carpeta_salida)
+            etapa.contar(solos=len(df_solos))
+            etapa.archivos(excel_solos)
+        
+        # 3. Generar brackets
+        with progreso.etapa('brackets') as etapa:
+            carpeta_brackets = os.path.join(carpeta_salida, "brackets")
+            # El caché de brackets se comparte entre trabajos: al volver a subir una planilla
+            # corregida solo se dibujan los brackets que cambiaron
+            opciones_render = {'workers': app.config['BRACKET_RENDER_WORKERS'],
+                               'exportar_png': app.config['EXPORT_BRACKET_PNGS'],
+                               'renderizador': app.config['BRACKET_RENDERER'],
+                               'perfil': perfil or app.config['BRACKET_RENDER_PROFILE'],
+                               'cache': CacheBrackets.desde_config(app.config['RESULTS_FOLDER'],
+                                                                   app.config['BRACKET_CACHE'])}
+            plantillas_antes = cache_plantillas.estadisticas()
+            # En memoria el DataFrame pasa directo; en bloques se lee CATEGORIAS.xlsx
+            if filas_por_bloque:
+                resultado_brackets = generar_brackets_desde_excel(excel_categorias, carpeta_brackets, **opciones_render)
+            else:
+                resultado_brackets = generar_brackets_desde_df(df, carpeta_brackets, **opciones_render)
+            etapa.contar(brackets=len(resultado_brackets['categorias']) if resultado_brackets else 0,
+                         **contadores_cache_plantillas(plantillas_antes))
+            if resultado_brackets and opciones_render['cache']:
+                etapa.contar(reutilizados=resultado_brackets['reutilizados'])
+            etapa.carpeta(carpeta_brackets)
+        
+        # 4. Generar resumen
+        with progreso.etapa('resumen') as etapa:
+            archivo_resumen = generar_resumen_torneo(df, df_solos, resultado_brackets, carpeta_salida)
+            etapa.archivos(archivo_resumen)
+    
+    # Preparar respuesta con información de resultados
+    response_data = {
+        'success': True,
+        'message': 'Torneo procesado exitosamente',
+        'timestamp': timestamp,
+        'files_processed': len(archivos),
+        'participantes': len(df),
+        'solos': len(df_solos),
+        'brackets': len(resultado_brackets['categorias']) if resultado_brackets else 0,
+        'output_folder': carpeta_salida,
+        'metricas': progreso.instrumentacion.resumen(),
+        'result_files': []
+    }
+    
+    # Listar archivos generados
+    for root, dirs, files in os.walk(carpeta_salida):
+        for file in files:
+            if not es_entregable(file):
+                continue
+            rel_path = os.path.relpath(os.path.join(root, file), carpeta_salida)
+            response_data['result_files'].append(rel_path)
+    
+    return response_data
+
+# Cola de trabajos: /upload responde al instante y el pipeline corre en segundo plano
+gestor_trabajos = GestorTrabajos(procesar_torneo, workers=app.config['JOB_WORKERS'],
+                                 almacen=crear_almacen(app.config['JOB_STORE'], app.config['STORAGE_RETENTION_HOURS']))
+
+# ZIP de /download-all por huella de contenido (ZIP_CACHE)
+cache_zip = CacheZip.desde_config(app.config['RESULTS_FOLDER'], app.config['ZIP_CACHE'])
+
+# Limpieza de uploads, resultados y cachés por antigüedad y cuota; no toca los trabajos activos
+# y deja como expirados los trabajos cuyos archivos borra
+gestor_almacenamiento = GestorAlmacenamiento.desde_config(app.config, protegidos=gestor_trabajos.activos,
+                                                          al_borrar=gestor_trabajos.expirar)
+
+_servicios_iniciados = False
+
+def iniciar_servicios():
+    """
+    Reencola los trabajos pendientes y lanza el barrido del almacenamiento.
+    Se llama desde el arranque (app.py, wsgi.py, render_start.py), no al importar:
+    con el reloader de Flask el proceso que vigila los archivos importa la app
+    pero no atiende pedidos, y no debe ejecutar trabajos ni barrer.
+    """
+    global _servicios_iniciados
+    if _servicios_iniciados:
+        return
+    _servicios_iniciados = True
+    gestor_trabajos.recuperar_pendientes()
+    gestor_almacenamiento.iniciar(app.config['STORAGE_SWEEP_MINUTES'])
+
 @app.route('/upload', methods=['POST'])
 def upload_files():
     try:
@@ -82,8 +228,14 @@ def upload_files():
         if not files or files[0].filename == '':
             return jsonify({'error': 'No se seleccionaron archivos'}), 400
         
+        # Calidad de los brackets: borrador, pantalla o impresion (por defecto BRACKET_RENDER_PROFILE)
+        perfil = request.form.get('perfil') or None
+        if perfil is not None and perfil not in PERFILES_RENDER:
+            return jsonify({'error': f"Perfil de render desconocido '{perfil}' "
+                                     f"(opciones: {', '.join(PERFILES_RENDER)})"}), 400
+        
         # Crear carpeta temporal para este procesamiento
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
         temp_folder = os.path.join(app.config['UPLOAD_FOLDER'], f'procesamiento_{timestamp}')
         os.makedirs(temp_folder, exist_ok=True)
         
@@ -99,60 +251,21 @@ def upload_files():
         if not uploaded_files:
             return jsonify({'error': 'No se pudieron guardar archivos válidos'}), 400
         
-        # Procesar archivos usando la lógica existente
         carpeta_salida = os.path.join(app.config['RESULTS_FOLDER'], f'torneo_{timestamp}')
-        os.makedirs(carpeta_salida, exist_ok=True)
-        
-        # Procesar archivos usando la lógica existente
-        agrupador = AgrupadorMultiple()
-        
-        # Procesar archivos
-        df = agrupador.procesar_multiples_archivos(uploaded_files, combinar=True)
         
-        if df is not None and len(df) > 0:
-            # Filtrar filas inválidas
-            df = df[df['categoria_completa'].notnull()].copy()
-            
-            if len(df) > 0:
-                # 1. Exportar Excel de categorías
-                excel_categorias = agrupador.exportar_categorias_unico_excel(df, carpeta_salida)
-                
-                # 2. Identificar y exportar solos
-                df_solos = agrupador.identificar_solos(df)
-                excel_solos = agrupador.exportar_solos(df_solos, carpeta_salida)
-                
-                # 3. Generar brackets
-                carpeta_brackets = os.path.join(carpeta_salida, "brackets")
-                resultado_brackets = generar_brackets_desde_excel(excel_categorias, carpeta_brackets)
-                
-                # 4. Generar resumen
-                generar_resumen_torneo(df, df_solos, resultado_brackets, carpeta_salida)
-                
-                # Preparar respuesta con información de resultados
-                response_data = {
-                    'success': True,
-                    'message': 'Torneo procesado exitosamente',
-                    'timestamp': timestamp,
-                    'files_processed': len(uploaded_files),
-                    'participantes': len(df),
-                    'solos': len(df_solos),
-                    'brackets': len(resultado_brackets['imagenes']) if resultado_brackets else 0,
-                    'output_folder': carpeta_salida,
-                    'result_files': []
-                }
-            else:
-                response_data = {'success': False, 'error': 'No quedan filas válidas para procesar'}
-        else:
-            response_data = {'success': False, 'error': 'No se pudieron procesar participantes'}
-        
-        # Listar archivos generados
-        if os.path.exists(carpeta_salida):
-            for root, dirs, files in os.walk(carpeta_salida):
-                for file in files:
-                    rel_path = os.path.relpath(os.path.join(root, file), carpeta_salida)
-                    response_data['result_files'].append(rel_path)
+        # El id del trabajo es el timestamp, así /download/<timestamp> sigue funcionando
+        gestor_trabajos.encolar(timestamp, archivos=uploaded_files, carpeta_salida=carpeta_salida,
+                                timestamp=timestamp, perfil=perfil)
         
-        return jsonify(response_data)
+        return jsonify({
+            'success': True,
+            'message': 'Torneo en cola de procesamiento',
+            'job_id': timestamp,
+            'timestamp': timestamp,
+            'files_processed': len(uploaded_files),
+            'render_profile': perfil or app.config['BRACKET_RENDER_PROFILE'],
+            'status_url': f'/status/{timestamp}'
+        }), 202
         
     except Exception as e:
         error_msg = f"Error procesando archivos: {str(e)}"
@@ -160,13 +273,50 @@ def upload_files():
         print(traceback.format_exc())
         return jsonify({'error': error_msg}), 500
 
+@app.route('/status/<job_id>')
+def job_status(job_id):
+    """
+    Estado de un trabajo de /upload: etapa actual, tiempos por etapa y resultado.
+    410 si sus archivos ya se borraron por la limpieza del almacenamiento.
+    """
+    trabajo = gestor_trabajos.obtener(job_id)
+    if trabajo is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    trabajo.pop('parametros', None)
+    if trabajo['estado'] == EXPIRADO:
+        return jsonify({**trabajo, 'error': 'Los resultados del torneo expiraron y se borraron'}), 410
+    return jsonify(trabajo)
+
+def _trabajo_no_disponible(timestamp):
+    """
+    Respuesta de error si los resultados de ese timestamp no se pueden descargar,
+    None si no aplica: 409 mientras el trabajo sigue en cola o en proceso, 500 con
+    el error del trabajo si falló (no va a terminar) y 410 si sus archivos ya se
+    borraron por la limpieza del almacenamiento.
+    """
+    trabajo = gestor_trabajos.obtener(timestamp)
+    if trabajo is None or trabajo['estado'] == COMPLETADO:
+        return None
+    if trabajo['estado'] == EXPIRADO:
+        return jsonify({'error': 'Los resultados del torneo expiraron y se borraron', 'estado': EXPIRADO}), 410
+    if trabajo['estado'] == ERROR:
+        return jsonify({'error': f"El torneo no se pudo procesar: {trabajo['error']}", 'estado': ERROR,
+                        'status_url': f'/status/{timestamp}'}), 500
+    return jsonify({'error': 'El torneo todavía no está listo', 'estado': trabajo['estado'],
+                    'status_url': f'/status/{timestamp}'}), 409
+
 @app.route('/download/<timestamp>/<filename>')
 def download_file(timestamp, filename):
     try:
+        no_disponible = _trabajo_no_disponible(timestamp)
+        if no_disponible:
+            return no_disponible
+        
         carpeta_salida = os.path.join(app.config['RESULTS_FOLDER'], f'torneo_{timestamp}')
         file_path = os.path.join(carpeta_salida, filename)
         
-        if os.path.exists(file_path):
+        if os.path.exists(file_path) and es_entregable(filename):
+            tocar(carpeta_salida)
             return send_file(file_path, as_attachment=True)
         else:
             return jsonify({'error': 'Archivo no encontrado'}), 404
@@ -177,22 +327,30 @@ def download_file(timestamp, filename):
 @app.route('/download-all/<timestamp>')
 def download_all(timestamp):
     try:
+        no_disponible = _trabajo_no_disponible(timestamp)
+        if no_disponible:
+            return no_disponible
+        
         carpeta_salida = os.path.join(app.config['RESULTS_FOLDER'], f'torneo_{timestamp}')
         
         if not os.path.exists(carpeta_salida):
             return jsonify({'error': 'Carpeta de resultados no encontrada'}), 404
-        
-        # Crear archivo ZIP con todos los resultados
-        zip_path = os.path.join(app.config['RESULTS_FOLDER'], f'torneo_completo_{timestamp}.zip')
-        
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(carpeta_salida):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, carpeta_salida)
-                    zipf.write(file_path, arcname)
-        
-        return send_file(zip_path, as_attachment=True, download_name=f'torneo_completo_{timestamp}.zip')
+        tocar(carpeta_salida)
+        
+        # El ZIP se guarda por huella de contenido: mientras no cambien los resultados,
+        # las descargas siguientes lo envían tal cual (ver exportacion_zip)
+        nombre_zip = f'torneo_completo_{timestamp}.zip'
+        archivos = archivos_resultados(carpeta_salida)
+        huella = huella_resultados(archivos)
+        zip_guardado = cache_zip.buscar(huella) if cache_zip else None
+        if zip_guardado:
+            return send_file(zip_guardado, as_attachment=True, download_name=nombre_zip, etag=huella)
+        
+        # Se envía a medida que se arma
+        bytes_zip = cache_zip.generar(archivos, huella) if cache_zip else generar_zip(archivos)
+        return Response(stream_with_context(bytes_zip), mimetype='application/zip',
+                        headers={'Content-Disposition': f'attachment; filename={nombre_zip}',
+                                 'ETag': f'"{huella}"'})
         
     except Exception as e:
         return jsonify({'error': f'Error creando archivo ZIP: {str(e)}'}), 500
@@ -203,7 +361,12 @@ def status():
         'status': 'running',
         'version': '0.5',
         'upload_folder': app.config['UPLOAD_FOLDER'],
-        'results_folder': app.config['RESULTS_FOLDER']
+        'results_folder': app.config['RESULTS_FOLDER'],
+        'fonts': registro_fuentes.elegidas(),
+        'column_maps': mapeador_columnas.estadisticas(),
+        'template_cache': cache_plantillas.estadisticas(),
+        'zip_cache': cache_zip.estadisticas() if cache_zip else None,
+        'storage': gestor_almacenamiento.estadisticas()
     })
 
 @app.route('/health')
@@ -286,40 +449,11 @@ def update_participant(bracket_id, participant_id):
 def detect_excel_columns(df):
     """
     Detecta automáticamente las columnas del Excel basándose en patrones flexibles.
-    Retorna un diccionario con las columnas encontradas.
+    Acepta un DataFrame o directamente la lista de encabezados.
+    Retorna un diccionario con las columnas encontradas (ver mapeo_columnas).
     """
-    detected_columns = {}
-    
-    # Convertir nombres de columnas a minúsculas para búsqueda
-    columnas_lower = {col.lower(): col for col in df.columns}
-    
-    # Patrones de búsqueda para cada campo requerido
-    patterns = {
-        'nombre': ['nombre', 'name', 'first_name', 'firstname'],
-        'apellido': ['apellido', 'lastname', 'last_name', 'surname'],
-        'documento': ['documento', 'dni', 'cedula', 'cédula', 'id', 'identificacion', 'identificación', 'pasaporte', 'ci'],
-        'fecha_nacimiento': ['nacim', 'fecha', 'birth', 'nacimiento', 'fecha_nacimiento', 'birthdate', 'born'],
-        'genero': ['sexo', 'genero', 'género', 'gender', 'sex'],
-        'kup': ['kup', 'dan', 'nivel', 'grado', 'cinturon', 'cinturón', 'belt', 'grade'],
-        'peso': ['peso', 'weight', 'kg', 'kilos'],
-        'modalidad': ['modalidad', 'modality', 'disciplina', 'discipline', 'category', 'tipo', 'sport'],
-        'abreviatura': ['abreviatura', 'abbreviation', 'abrev', 'academia', 'academy', 'club', 'escuela', 'school', 'team']
-    }
-    
-    # Buscar cada patrón
-    for field, field_patterns in patterns.items():
-        detected_columns[field] = None
-        for pattern in field_patterns:
-            found_col = None
-            for col_lower, col_original in columnas_lower.items():
-                if pattern in col_lower:
-                    found_col = col_original
-                    break
-            if found_col:
-                detected_columns[field] = found_col
-                break
-    
-    return detected_columns
+    columnas = df.columns if hasattr(df, 'columns') else df
+    return mapeador_columnas.resolver(columnas)
 
 
 
@@ -342,67 +476,70 @@ def process_file_for_editor():
         filepath = os.path.join(temp_folder, file.filename)
         file.save(filepath)
         
-        # Leer Excel directamente
+        # Leer solo los encabezados y detectar columnas automáticamente
         print(f"📊 Procesando archivo: {file.filename}")
-        df_raw = pd.read_excel(filepath)
-        print(f"📋 Filas totales en Excel: {len(df_raw)}")
-        print(f"📋 Columnas encontradas: {list(df_raw.columns)}")
-        
-        # Detectar columnas automáticamente
-        detected_cols = detect_excel_columns(df_raw)
+        encabezados = leer_encabezados(filepath)
+        if encabezados is None:
+            encabezados = list(leer_excel(filepath, nrows=0).columns)
+        print(f"📋 Columnas encontradas: {encabezados}")
+        detected_cols = detect_excel_columns(encabezados)
         print(f"🔍 Columnas detectadas: {detected_cols}")
         
-        # Mostrar estadísticas de modalidad si existe
-        if detected_cols['modalidad']:
-            modalidades = df_raw[detected_cols['modalidad']].value_counts()
-            print(f"📊 Distribución de modalidades:")
-            for modalidad, count in modalidades.items():
-                print(f"  • {modalidad}: {count} atletas")
-        
-        # Verificar columnas requeridas
+        # Verificar columnas requeridas (antes de parsear la hoja completa)
         required_fields = ['fecha_nacimiento', 'genero', 'kup', 'peso']
         missing_required = [field for field in required_fields if not detected_cols[field]]
         
         if missing_required:
+            shutil.rmtree(temp_folder, ignore_errors=True)
             return jsonify({
                 'error': f'Columnas requeridas faltantes: {", ".join(missing_required)}',
-                'columns_found': list(df_raw.columns),
+                'columns_found': encabezados,
                 'columns_detected': detected_cols
             }), 400
         
-        # Usar directamente el AgrupadorMultiple sin modificar el archivo
-        # El AgrupadorMultiple ya tiene patrones de búsqueda flexibles
-        agrupador = AgrupadorMultiple()
-        df = agrupador.procesar_multiples_archivos([filepath], combinar=True)
+        # Cargar solo las columnas detectadas (el clasificador usa el mismo mapeo)
+        df_raw = leer_columnas(filepath, list(detected_cols.values()), encabezados)
+        print(f"📋 Filas totales en Excel: {len(df_raw)}")
+        
+        # Mostrar estadísticas de modalidad si existe
+        if detected_cols['modalidad']:
+            modalidades = df_raw[detected_cols['modalidad']].value_counts()
+            print(f"📊 Distribución de modalidades:")
+            for modalidad, count in modalidades.items():
+                print(f"  • {modalidad}: {count} atletas")
+        
+        # Clasificar sobre el mismo frame ya leído (sin volver a parsear el Excel):
+        # las columnas calculadas se agregan a df_raw y las filas quedan alineadas
+        agrupador = AgrupadorMultiple(fecha_referencia=app.config['TOURNAMENT_DATE'])
+        df = agrupador.procesar_dataframe(df_raw, file.filename, detected_cols)
+        if df is not None and len(df) > 0:
+            agrupador.completar_categorias(df, file.filename)
+            compactar_participantes(df, agrupador.indice)
         
         print(f"🔄 Procesamiento completado. Filas obtenidas: {len(df) if df is not None else 0}")
         
         # Filtrar por modalidad KYORUGUI después del procesamiento si está disponible
         if detected_cols['modalidad'] and df is not None and len(df) > 0:
             print(f"🥋 Filtrando participantes de modalidad KYORUGUI...")
-            # Leer el Excel original para hacer el filtrado
-            df_original = pd.read_excel(filepath)
-            
             # Mostrar modalidades antes del filtrado
-            modalidades_antes = df_original[detected_cols['modalidad']].astype(str).str.upper().str.strip().value_counts()
+            modalidades = df[detected_cols['modalidad']].astype(str).str.upper().str.strip()
+            modalidades_antes = modalidades.value_counts()
             print(f"📊 Modalidades antes del filtrado:")
             for modalidad, count in modalidades_antes.items():
                 print(f"  • '{modalidad}': {count} atletas")
             
-            kyorugui_mask = df_original[detected_cols['modalidad']].astype(str).str.upper().str.strip().isin(
-                ['KYORUGUI', 'KYORUGI', 'COMBATE', 'SPARRING', 'LUCHA']
-            )
+            kyorugui_mask = modalidades.isin(['KYORUGUI', 'KYORUGI', 'COMBATE', 'SPARRING', 'LUCHA'])
             
             # Mostrar qué modalidades se van a excluir
-            modalidades_excluidas = df_original[~kyorugui_mask][detected_cols['modalidad']].astype(str).str.upper().str.strip().value_counts()
+            modalidades_excluidas = modalidades[~kyorugui_mask].value_counts()
             if len(modalidades_excluidas) > 0:
                 print(f"❌ Modalidades excluidas:")
                 for modalidad, count in modalidades_excluidas.items():
                     print(f"  • '{modalidad}': {count} atletas")
             
             # Aplicar el filtro al DataFrame procesado
-            df = df.iloc[kyorugui_mask.values].copy()
-            excluded_count = len(df_original) - len(df)
+            df = df[kyorugui_mask]
+            excluded_count = len(df_raw) - len(df)
             print(f"✅ {len(df)} participantes KYORUGUI incluidos, {excluded_count} excluidos")
         
         if df is not None and len(df) > 0:
@@ -419,56 +556,11 @@ def process_file_for_editor():
                     print(f"  ... y {len(sin_categoria) - 5} más")
             
             # Filtrar filas válidas
-            df = df[df['categoria_completa'].notnull()].copy()
+            df = df[df['categoria_completa'].notnull()]
             print(f"📊 Después del filtrado de categorías: {len(df)} participantes")
             
-            # Agrupar por categoría
-            categories_data = {}
-            for categoria in df['categoria_completa'].unique():
-                participants_in_cat = df[df['categoria_completa'] == categoria]
-                
-                participants = []
-                for _, row in participants_in_cat.iterrows():
-                    # Construir nombre completo usando columnas detectadas
-                    full_name = ""
-                    if detected_cols['nombre'] and detected_cols['apellido']:
-                        full_name = f"{row[detected_cols['nombre']]} {row[detected_cols['apellido']]}"
-                    elif detected_cols['nombre']:
-                        full_name = str(row[detected_cols['nombre']])
-                    else:
-                        # Fallback: buscar cualquier columna que pueda contener nombre
-                        for col in df.columns:
-                            if 'nombre' in col.lower():
-                                full_name = str(row[col])
-                                break
-                        if not full_name:
-                            full_name = f"Participante {row.name}"
-                    
-                    # Obtener abreviación de academia
-                    academy = ""
-                    if detected_cols['abreviatura'] and row[detected_cols['abreviatura']]:
-                        academy = str(row[detected_cols['abreviatura']]).strip()
-                    
-                    # Obtener documento si está disponible
-                    document = ""
-                    if detected_cols['documento'] and row[detected_cols['documento']]:
-                        document = str(row[detected_cols['documento']]).strip()
-                    
-                    participants.append({
-                        'name': full_name,
-                        'academy': academy,
-                        'document': document,
-                        'age': row.get('edad'),
-                        'weight': row.get('categoria_peso'),
-                        'level': row.get('nivel_normalizado'),
-                        'gender': row.get('sexo_normalizado')
-                    })
-                
-                categories_data[categoria] = {
-                    'name': categoria,
-                    'participants': participants,
-                    'count': len(participants)
-                }
+            # Agrupar por categoría (un solo groupby, columnas armadas de una vez)
+            categories_data = armar_categorias_editor(df, detected_cols)
             
             # Limpiar archivo temporal
             shutil.rmtree(temp_folder, ignore_errors=True)
@@ -659,25 +751,12 @@ def generate_dynamic_brackets_pdf(participants_data, temp_folder, timestamp):
             c.setFillColor(colors.black)  # Restaurar color negro
             y_position -= 60  # Más espacio después del título
             
-            # Centrar bracket horizontalmente en la página (ajustado para cajas más anchas)
-            bracket_x = (width - 550) / 2  # Centrar bracket (550px de ancho aprox) - aumentado de 450
+            if len(participants) > MAX_PARTICIPANTES:
+                print(f"⚠️ {category_name}: se dibujan los primeros {MAX_PARTICIPANTES} de {len(participants)} participantes")
+                participants = participants[:MAX_PARTICIPANTES]
             
-            # Dibujar bracket centrado
-            if len(participants) == 1:
-                # Un solo participante
-                draw_single_participant(c, bracket_x, y_position, participants[0])
-                
-            elif len(participants) == 2:
-                # Dos participantes conectados
-                draw_two_participants_bracket(c, bracket_x, y_position, participants)
-                
-            elif len(participants) == 3:
-                # Tres participantes (dos + bye)
-                draw_three_participants_bracket(c, bracket_x, y_position, participants)
-                
-            else:
-                # Cuatro o más participantes
-                draw_multiple_participants_bracket(c, bracket_x, y_position, participants)
+            # Llave completa (todas las rondas y byes) en el resto de la página
+            dibujar_llave(c, participants, 40, 40, width - 80, y_position - 40)
         
         c.save()
         print(f"✅ PDF dinámico generado: {pdf_path}")
@@ -687,145 +766,17 @@ def generate_dynamic_brackets_pdf(participants_data, temp_folder, timestamp):
         print(f"❌ Error generando PDF dinámico: {e}")
         raise
 
-def draw_single_participant(c, x, y, participant):
-    """Dibuja un participante solo - Estilo Mexxus Arena"""
-    # Participante único con color azul (primera ronda)
-    draw_participant_box(c, x, y, participant, 0, is_first_round=True)
-
-def draw_two_participants_bracket(c, x, y, participants):
-    """Dibuja bracket de 2 participantes con línea conectora - Estilo Mexxus Arena"""
-    # PRIMERA RONDA: Participantes con colores azul/rojo
-    draw_participant_box(c, x, y, participants[0], 0, is_first_round=True)      # Azul
-    draw_participant_box(c, x, y-40, participants[1], 1, is_first_round=True)   # Rojo
-    
-    # 🥇 TODAS LAS LÍNEAS DORADAS - Estilo Mexxus Arena (ajustadas para cajas más anchas)
-    c.setStrokeColor(MEXXUS_COLORS['gold'])
-    c.setLineWidth(2)
-    c.line(x+280, y-7.5, x+330, y-7.5)       # Desde participante 1 (centro) - ajustado de 200 a 280
-    c.line(x+280, y-47.5, x+330, y-47.5)     # Desde participante 2 (centro) - ajustado de 200 a 280
-    
-    # Línea vertical conectora
-    c.line(x+330, y-7.5, x+330, y-47.5)      # ajustado de 250 a 330
-    
-    # Línea hacia el ganador (desde el punto medio) - sin caja final
-    c.line(x+330, y-27.5, x+430, y-27.5)     # ajustado de 250/350 a 330/430
-    
-    # Restaurar configuración por defecto
-    c.setStrokeColor(colors.black)
-    c.setLineWidth(1)
-
-def draw_three_participants_bracket(c, x, y, participants):
-    """Dibuja bracket de 3 participantes siguiendo estructura de plantilla - Estilo Mexxus Arena"""
-    # PRIMERA RONDA: Solo estos participantes con colores azul/rojo
-    draw_participant_box(c, x, y-80, participants[0], 0, is_first_round=True)   # Azul
-    draw_participant_box(c, x, y-120, participants[1], 1, is_first_round=True)  # Rojo
-    draw_participant_box(c, x, y-40, participants[2], 2, is_first_round=True)   # Azul (bye)
-    
-    # 🥇 APLICAR ESTILO DORADO PARA TODAS LAS LÍNEAS (ajustadas para cajas más anchas)
-    c.setStrokeColor(MEXXUS_COLORS['gold'])
-    c.setLineWidth(2)
-    
-    # PRIMERA RONDA: Conexión de los dos primeros participantes
-    c.line(x+280, y-87.5, x+330, y-87.5)      # Línea desde participante 1 (centro) - ajustado de 200 a 280
-    c.line(x+280, y-127.5, x+330, y-127.5)    # Línea desde participante 2 (centro) - ajustado de 200 a 280
-    c.line(x+330, y-87.5, x+330, y-127.5)     # Línea vertical conectora - ajustado de 250 a 330
-    
-    # Línea horizontal hacia semifinal (desde el medio de la conexión)
-    c.line(x+330, y-107.5, x+430, y-107.5)    # Hacia punto de semifinal - ajustado de 250/350 a 330/430
-    
-    # SEGUNDA RONDA: Línea del bye hacia el punto de semifinal
-    c.line(x+280, y-47.5, x+430, y-47.5)      # Línea directa del bye - ajustado de 200/350 a 280/430
-    
-    # CONEXIÓN FINAL: Unir semifinal y bye hacia final - sin cajas
-    c.line(x+430, y-47.5, x+430, y-107.5)     # Línea vertical conectora - ajustado de 350 a 430
-    c.line(x+430, y-77.5, x+530, y-77.5)      # Línea horizontal hacia final - ajustado de 350/450 a 430/530
-    
-    # Restaurar configuración por defecto
-    c.setStrokeColor(colors.black)
-    c.setLineWidth(1)
-
-def draw_multiple_participants_bracket(c, x, y, participants):
-    """Dibuja bracket de 4+ participantes con estructura de eliminación - Estilo Mexxus Arena"""
-    participant_height = 25
-    spacing = 10
-    
-    # 🥇 TODAS LAS LÍNEAS DORADAS - Estilo Mexxus Arena
-    c.setStrokeColor(MEXXUS_COLORS['gold'])
-    c.setLineWidth(2)
-    
-    # Dibujar participantes en la primera ronda - Solo esta ronda con colores azul/rojo
-    for i, participant in enumerate(participants[:8]):  # Máximo 8 para que quepa
-        participant_y = y - (i * (participant_height + spacing))
-        draw_participant_box(c, x, participant_y, participant, i, is_first_round=True)  # Solo primera ronda colorida
-        
-        # Líneas de conexión por pares (ajustadas para cajas más anchas)
-        if i % 2 == 1:  # Cada segundo participante
-            # Conectar con el participante anterior
-            prev_y = y - ((i-1) * (participant_height + spacing))
-            current_y = participant_y
-            # Líneas horizontales - ajustado de 200 a 280
-            c.line(x+280, prev_y-10, x+330, prev_y-10)
-            c.line(x+280, current_y-10, x+330, current_y-10)
-            
-            # Línea vertical - ajustado de 250 a 330
-            c.line(x+330, prev_y-10, x+330, current_y-10)
-            
-            # Línea hacia siguiente ronda - ajustado de 250/300 a 330/380
-            middle_y = (prev_y + current_y) / 2 - 10
-            c.line(x+330, middle_y, x+380, middle_y)
-    
-    # Restaurar configuración por defecto al final
-    c.setStrokeColor(colors.black)
-    c.setLineWidth(1)
-
-def draw_participant_box(c, x, y, participant, position_index=0, is_first_round=True):
-    """Dibuja una caja de participante con nombre y academia - Estilo Mexxus Arena"""
-    name_with_academy = f"{participant['name']}"
-    if participant['academy']:
-        name_with_academy += f" ({participant['academy']})"
-    
-    # Truncar si es muy largo (aumentamos el límite)
-    if len(name_with_academy) > 50:
-        name_with_academy = name_with_academy[:47] + "..."
-    
-    # 🎨 CUADRO BASE: Siempre gris claro - MÁS ANCHO
-    base_fill_color = MEXXUS_COLORS['light_gray']
-    text_color = MEXXUS_COLORS['dark_gray']
-    
-    # Dibujar cuadro base (gris claro) - Aumentamos ancho de 200 a 280
-    c.setFillColor(base_fill_color)
-    c.setStrokeColor(MEXXUS_COLORS['dark_gold'])
-    c.setLineWidth(1.5)
-    c.rect(x, y-20, 280, 25, fill=1, stroke=1)
-    
-    if is_first_round:
-        # 🎨 FRANJA LATERAL: Solo una pequeña parte azul/roja al inicio
-        if position_index % 2 == 0:
-            accent_color = MEXXUS_COLORS['blue_fighter']  # Azul
-        else:
-            accent_color = MEXXUS_COLORS['red_fighter']   # Rojo
-        
-        # Dibujar franja lateral izquierda (10px de ancho)
-        c.setFillColor(accent_color)
-        c.rect(x, y-20, 10, 25, fill=1, stroke=0)  # Franja de 10px sin borde
-    
-    # Texto con fuente más pequeña y sin negrita
-    c.setFillColor(text_color)
-    c.setFont("Helvetica", 9)
-    c.drawString(x+15, y-13, name_with_academy)  # Mover texto 10px a la derecha
-    
-    # Restaurar solo el color de relleno (no interferir con líneas)
-    c.setFillColor(colors.black)
-    # NO restaurar setStrokeColor ni setLineWidth para no interferir con líneas doradas
-
-
-
 if __name__ == '__main__':
     print("🚀 Iniciando FILO 0.5 Web App...")
     print("📁 Carpeta de uploads:", app.config['UPLOAD_FOLDER'])
     print("📁 Carpeta de resultados:", app.config['RESULTS_FOLDER'])
     print("🌐 Servidor disponible en: http://localhost:5000")
     
+    # Con debug el reloader vuelve a ejecutar este script en un proceso hijo
+    # (WERKZEUG_RUN_MAIN=true), que es el que atiende los pedidos
+    if not app.config['DEBUG'] or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        iniciar_servicios()
+    
     app.run(
         debug=app.config['DEBUG'],
         host=app.config['HOST'],
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la clasificación de participantes (edad, sexo, nivel, división y peso).
+Compara la clasificación vectorizada con la versión por fila (apply) y
+verifica que ambas produzcan exactamente las mismas columnas.
+
+Uso:
+    python benchmarks/bench_clasificacion.py [filas]
+"""
+
+import os
+import sys
+import time
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from filo_0_5 import AgrupadorTaekwondo
+from datos_sinteticos import generar_participantes
+
+COLUMNAS = ['edad', 'sexo_normalizado', 'nivel_normalizado', 'categoria_edad', 'categoria_peso']
+
+def clasificar_por_filas(agrupador, df):
+    """Clasificación original: un apply por columna y un apply(axis=1) para el peso."""
+    df['edad'] = df['Fecha de Nacimiento'].apply(agrupador.calcular_edad)
+    df['sexo_normalizado'] = df['SEXO'].apply(agrupador.normalizar_sexo)
+    df['nivel_normalizado'] = df['KUP'].apply(agrupador.normalizar_kup_dan)
+    df['categoria_edad'] = df['edad'].apply(agrupador.determinar_categoria_edad)
+    df['categoria_peso'] = df.apply(lambda row: agrupador.determinar_categoria_peso(
+        row['PESO'], row['categoria_edad'], row['sexo_normalizado']), axis=1)
+    return df
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    os.chdir(RAIZ)
+    agrupador = AgrupadorTaekwondo()
+    base = generar_participantes(filas)
+    print(f"🧪 Clasificando {filas:,} participantes sintéticos")
+
+    inicio = time.perf_counter()
+    por_filas = clasificar_por_filas(agrupador, base.copy())
+    t_filas = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    vectorizado = agrupador.clasificar_participantes(base.copy(), 'Fecha de Nacimiento', 'SEXO', 'KUP', 'PESO')
+    t_vector = time.perf_counter() - inicio
+
+    for columna in COLUMNAS:
+        pd.testing.assert_series_equal(por_filas[columna], vectorizado[columna])
+
+    print(f"  • Por fila (apply):  {t_filas:8.3f} s  ({filas / t_filas:,.0f} filas/s)")
+    print(f"  • Vectorizado:       {t_vector:8.3f} s  ({filas / t_vector:,.0f} filas/s)")
+    print(f"  • Aceleración:       {t_filas / t_vector:8.1f}x")
+    print("✅ Columnas idénticas en ambas versiones")
+
+if __name__ == "__main__":
+    main()
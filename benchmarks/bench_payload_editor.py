@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark del JSON de categorías del editor (/api/process-file).
+Compara el armado original (un filtro por categoría + iterrows) con el armado
+por columnas de payload_editor, informa el costo por participante y verifica
+que ambos produzcan exactamente el mismo resultado.
+
+Uso:
+    python benchmarks/bench_payload_editor.py [filas]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from filo_0_5 import AgrupadorMultiple
+from mapeo_columnas import detectar_columnas
+from esquema_torneo import compactar_participantes
+from payload_editor import armar_categorias_editor
+from datos_sinteticos import generar_participantes
+
+def armar_categorias_por_filas(df, detected_cols):
+    """Armado original: filtra el DataFrame por cada categoría y recorre las filas."""
+    categories_data = {}
+    for categoria in df['categoria_completa'].unique():
+        participants_in_cat = df[df['categoria_completa'] == categoria]
+        participants = []
+        for _, row in participants_in_cat.iterrows():
+            full_name = ""
+            if detected_cols['nombre'] and detected_cols['apellido']:
+                full_name = f"{row[detected_cols['nombre']]} {row[detected_cols['apellido']]}"
+            elif detected_cols['nombre']:
+                full_name = str(row[detected_cols['nombre']])
+            else:
+                for col in df.columns:
+                    if 'nombre' in col.lower():
+                        full_name = str(row[col])
+                        break
+                if not full_name:
+                    full_name = f"Participante {row.name}"
+            academy = ""
+            if detected_cols['abreviatura'] and row[detected_cols['abreviatura']]:
+                academy = str(row[detected_cols['abreviatura']]).strip()
+            document = ""
+            if detected_cols['documento'] and row[detected_cols['documento']]:
+                document = str(row[detected_cols['documento']]).strip()
+            participants.append({
+                'name': full_name,
+                'academy': academy,
+                'document': document,
+                'age': row.get('edad'),
+                'weight': row.get('categoria_peso'),
+                'level': row.get('nivel_normalizado'),
+                'gender': row.get('sexo_normalizado')
+            })
+        categories_data[categoria] = {
+            'name': categoria,
+            'participants': participants,
+            'count': len(participants)
+        }
+    return categories_data
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    os.chdir(RAIZ)
+    base = generar_participantes(filas)
+    columnas = detectar_columnas(list(base.columns))
+    with contextlib.redirect_stdout(io.StringIO()):
+        agrupador = AgrupadorMultiple()
+        df = agrupador.procesar_dataframe(base, 'sintetico', columnas)
+        agrupador.completar_categorias(df, 'sintetico')
+        compactar_participantes(df, agrupador.indice)
+    df = df[df['categoria_completa'].notnull()]
+    print(f"🧪 JSON del editor para {len(df):,} participantes en {df['categoria_completa'].nunique()} categorías")
+
+    inicio = time.perf_counter()
+    por_filas = armar_categorias_por_filas(df, columnas)
+    t_filas = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    por_columnas = armar_categorias_editor(df, columnas)
+    t_columnas = time.perf_counter() - inicio
+
+    assert list(por_filas) == list(por_columnas), "Orden de categorías distinto"
+    assert por_filas == por_columnas, "Participantes distintos"
+
+    print(f"  • Filtro + iterrows:  {t_filas:8.3f} s  ({t_filas * 1e6 / len(df):8.1f} µs/participante)")
+    print(f"  • Por columnas:       {t_columnas:8.3f} s  ({t_columnas * 1e6 / len(df):8.1f} µs/participante)")
+    print(f"  • Aceleración:        {t_filas / t_columnas:8.1f}x")
+    print("✅ JSON idéntico en ambas versiones")
+
+if __name__ == "__main__":
+    main()
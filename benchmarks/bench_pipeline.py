@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Benchmark del pipeline completo de un torneo.
+Genera planillas sintéticas (una por academia), corre cada etapa por separado
+(lectura, clasificación, exportación, snapshot, solos, render de brackets, PDF,
+resumen) y escribe un JSON con tiempos, throughput y pico de memoria por etapa
+para comparar entre commits.
+
+Uso:
+    python benchmarks/bench_pipeline.py [--atletas 2000] [--academias 13] [--sesgo 0.0]
+                                        [--max-brackets 40] [--renderizador plantilla]
+                                        [--perfil impresion]
+                                        [--workers 1] [--workers-ingesta 1]
+                                        [--filas-por-bloque 5000]
+                                        [--salida resultado.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # Windows: sin pico de memoria
+    resource = None
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import filo_0_5
+from filo_0_5 import (AgrupadorMultiple, armar_participantes_por_categoria, crear_pdf_brackets,
+                      generar_resumen_torneo, renderizar_brackets)
+from datos_sinteticos import escribir_planillas
+from lector_excel import leer_excel, motor_excel
+from snapshot_torneo import guardar_snapshot, resolver_formato
+
+def rss_pico_mb():
+    """Pico de memoria residente del proceso y de sus hijos (pool de render), en MB; (None, None) sin resource."""
+    if resource is None:
+        return None, None
+    propio = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    hijos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux informa KB, macOS bytes
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(propio / divisor, 1), round(hijos / divisor, 1)
+
+def commit_actual():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class Medidor:
+    """Registra la duración y el pico de memoria de cada etapa."""
+
+    def __init__(self, silencioso=True):
+        self.etapas = []
+        self.silencioso = silencioso
+
+    @contextlib.contextmanager
+    def etapa(self, nombre, unidades=None, unidad='filas'):
+        registro = {'nombre': nombre}
+        salida = io.StringIO() if self.silencioso else None
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(salida) if salida else contextlib.nullcontext():
+            yield registro
+        registro['segundos'] = round(time.perf_counter() - inicio, 4)
+        unidades = registro.pop('unidades', unidades)
+        if unidades:
+            registro[unidad] = unidades
+            registro[f'{unidad}_por_s'] = round(unidades / registro['segundos'], 1) if registro['segundos'] else None
+        registro['rss_pico_mb'], registro['rss_pico_hijos_mb'] = rss_pico_mb()
+        self.etapas.append(registro)
+        pico = f"   pico {registro['rss_pico_mb']:8.1f} MB" if registro['rss_pico_mb'] is not None else ""
+        print(f"  • {nombre:<24} {registro['segundos']:9.3f} s{pico}")
+
+def correr(args):
+    os.chdir(RAIZ)
+    medidor = Medidor(silencioso=not args.verbose)
+    with tempfile.TemporaryDirectory(prefix='bench_pipeline_') as tmp:
+        carpeta_entrada = os.path.join(tmp, 'planillas')
+        carpeta_salida = os.path.join(tmp, 'resultados')
+        carpeta_brackets = os.path.join(carpeta_salida, 'brackets')
+        os.makedirs(carpeta_brackets)
+
+        print(f"🧪 {args.atletas:,} atletas, {args.academias} academias, sesgo {args.sesgo}")
+        with medidor.etapa('generar_planillas', args.atletas):
+            planillas = escribir_planillas(carpeta_entrada, args.atletas, args.academias, args.sesgo, args.semilla)
+
+        inicio_total = time.perf_counter()
+        agrupador = AgrupadorMultiple()
+        if args.filas_por_bloque:
+            # Sin la etapa de lectura completa: el pico de memoria es el del modo en bloques
+            with medidor.etapa('clasificacion_por_bloques') as registro:
+                df = agrupador.procesar_archivos_por_bloques(planillas, carpeta_salida, args.filas_por_bloque)
+                excel_categorias = df.archivo_categorias
+                registro['unidades'] = len(df)
+
+            with medidor.etapa('solos', len(df)):
+                df_solos = df.solos()
+                agrupador.exportar_solos(df_solos, carpeta_salida)
+        else:
+            with medidor.etapa('lectura', args.atletas):
+                for planilla in planillas:
+                    leer_excel(planilla)
+
+            with medidor.etapa('lectura_y_clasificacion') as registro:
+                df = agrupador.procesar_multiples_archivos(planillas, combinar=True, workers=args.workers_ingesta)
+                df = df[df['categoria_completa'].notnull()]
+                registro['unidades'] = len(df)
+
+            with medidor.etapa('exportar_categorias', len(df)):
+                excel_categorias = agrupador.exportar_categorias_unico_excel(df, carpeta_salida)
+
+            with medidor.etapa('snapshot', len(df)) as registro:
+                snapshot = guardar_snapshot(df, carpeta_salida)
+                registro['formato'] = resolver_formato()
+                registro['bytes'] = os.path.getsize(snapshot) if snapshot else 0
+
+            with medidor.etapa('solos', len(df)):
+                df_solos = agrupador.identificar_solos(df)
+                agrupador.exportar_solos(df_solos, carpeta_salida)
+
+        with medidor.etapa('armar_brackets') as registro:
+            # En memoria los brackets salen del mismo DataFrame; en bloques, de CATEGORIAS.xlsx
+            df_categorias = pd.read_excel(excel_categorias) if args.filas_por_bloque else df
+            categorias_participantes = armar_participantes_por_categoria(df_categorias)
+            registro['unidades'] = len(categorias_participantes)
+        total_categorias = len(categorias_participantes)
+        if args.max_brackets is not None:
+            categorias_participantes = categorias_participantes[:args.max_brackets]
+
+        # El render y el PDF van intercalados (streaming): se separan midiendo el
+        # tiempo que pasa dentro del generador de brackets
+        tiempo_render = [0.0]
+        renderizadas = []
+
+        def cronometrar(brackets):
+            while True:
+                inicio = time.perf_counter()
+                bracket = next(brackets, None)
+                tiempo_render[0] += time.perf_counter() - inicio
+                if bracket is None:
+                    return
+                renderizadas.append(bracket.categoria)
+                yield bracket
+
+        with medidor.etapa('render_y_pdf') as registro:
+            brackets = renderizar_brackets(categorias_participantes, carpeta_brackets, workers=args.workers,
+                                           exportar_png=args.png, renderizador=args.renderizador,
+                                           perfil=args.perfil)
+            pdf = crear_pdf_brackets(cronometrar(brackets), carpeta_brackets)
+            registro['unidades'] = len(renderizadas)
+        render_pdf = medidor.etapas[-1]
+        render_pdf['render_s'] = round(tiempo_render[0], 4)
+        render_pdf['pdf_s'] = round(render_pdf['segundos'] - tiempo_render[0], 4)
+        render_pdf['pdf_bytes'] = os.path.getsize(pdf) if pdf else 0
+        if renderizadas:
+            render_pdf['ms_por_bracket'] = round(render_pdf['segundos'] * 1000 / len(renderizadas), 1)
+
+        resultado_brackets = {'imagenes': [], 'categorias': renderizadas, 'pdf': pdf}
+        with medidor.etapa('resumen', len(df)):
+            generar_resumen_torneo(df, df_solos, resultado_brackets, carpeta_salida)
+        total_s = time.perf_counter() - inicio_total
+
+    rss_propio, rss_hijos = rss_pico_mb()
+    return {
+        'commit': commit_actual(),
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'cpus': os.cpu_count(),
+        'parametros': {
+            'atletas': args.atletas,
+            'academias': args.academias,
+            'sesgo': args.sesgo,
+            'semilla': args.semilla,
+            'max_brackets': args.max_brackets,
+            'renderizador': filo_0_5.resolver_renderizador(args.renderizador),
+            'perfil': filo_0_5.resolver_perfil_render(args.perfil),
+            'workers': filo_0_5.resolver_workers_render(args.workers),
+            'workers_ingesta': filo_0_5.resolver_workers_ingesta(args.workers_ingesta),
+            'png': args.png,
+            'filas_por_bloque': args.filas_por_bloque,
+            'motor_excel': motor_excel(),
+        },
+        'participantes_validos': len(df),
+        'categorias_con_bracket': total_categorias,
+        'brackets_renderizados': len(renderizadas),
+        'total_s': round(total_s, 4),
+        'atletas_por_s': round(args.atletas / total_s, 1),
+        'rss_pico_mb': rss_propio,
+        'rss_pico_hijos_mb': rss_hijos,
+        'etapas': medidor.etapas,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline completo de un torneo")
+    parser.add_argument('--atletas', type=int, default=2000)
+    parser.add_argument('--academias', type=int, default=13)
+    parser.add_argument('--sesgo', type=float, default=0.0,
+                        help="fracción de atletas concentrados en pocas categorías (0 a 1)")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--max-brackets', type=int, default=40,
+                        help="cuántas categorías renderizar (el render domina el tiempo); -1 = todas")
+    parser.add_argument('--renderizador', choices=filo_0_5.RENDERIZADORES, default=None)
+    parser.add_argument('--perfil', choices=list(filo_0_5.PERFILES_RENDER), default=None,
+                        help="calidad del render con plantillas (por defecto BRACKET_RENDER_PROFILE)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--workers-ingesta', type=int, default=None,
+                        help="procesos para leer y clasificar las planillas (ver INGEST_WORKERS)")
+    parser.add_argument('--filas-por-bloque', type=int, default=None,
+                        help="clasificar en streaming con bloques de N filas (ver CLASSIFY_CHUNK_ROWS)")
+    parser.add_argument('--png', action='store_true', help="además del PDF, exportar un PNG por bracket")
+    parser.add_argument('--salida', help="archivo JSON donde guardar el resultado (por defecto stdout)")
+    parser.add_argument('--verbose', action='store_true', help="mostrar los mensajes del pipeline")
+    args = parser.parse_args()
+    if args.max_brackets is not None and args.max_brackets < 0:
+        args.max_brackets = None
+
+    resultado = correr(args)
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + "\n")
+        print(f"✅ Resultado guardado en {args.salida}")
+    else:
+        print(texto)
+
+if __name__ == "__main__":
+    main()
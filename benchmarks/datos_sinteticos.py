@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Generador de inscripciones sintéticas para benchmarks.
+Imita las planillas reales: fechas mezcladas (datetime y texto), pesos con
+texto, grados KUP/DAN escritos de varias formas y academias con abreviatura.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+NOMBRES = ['JUAN', 'MARIA', 'CARLOS', 'ANA', 'LUIS', 'SOFIA', 'DIEGO', 'VALERIA', 'JOSE', 'CAMILA']
+APELLIDOS = ['PEREZ', 'GOMEZ', 'RODRIGUEZ', 'LOPEZ', 'DIAZ', 'TORRES', 'RAMIREZ', 'FLORES', 'CRUZ', 'REYES']
+GRADOS = ['10MO', '10mo', '9NO', '8VO', '8°KUP', '7MO', '6TO', '5TO', '4TO', '3ER', '2DO', '1ER',
+          'I DAN', 'II DAN', 'NEGRO', 'AMARILLO', 'VERDE AZUL']
+SEXOS = ['MASCULINO', 'FEMENINO', 'M', 'F', 'masculino', 'Femenino ', 'MUJER', 'HOMBRE']
+FORMATOS_TEXTO = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y']
+PERFILES_POPULARES = 8
+
+def generar_participantes(n, semilla=0, academias=13, prop_texto=0.02, prop_invalidos=0.01, sesgo=0.0):
+    """
+    Devuelve un DataFrame con n inscripciones y las columnas de una planilla real.
+    prop_texto: fracción de fechas y pesos escritos como texto.
+    prop_invalidos: fracción de celdas vacías o mal escritas.
+    sesgo: fracción de atletas que copian uno de unos pocos perfiles populares
+        (edad, peso, grado, sexo), para concentrarlos en pocas categorías grandes.
+    """
+    rng = np.random.default_rng(semilla)
+    hoy = datetime(2025, 6, 1)
+    dias = rng.integers(4 * 365, 40 * 365, size=n)
+    fechas = np.array([hoy - timedelta(days=int(d)) for d in dias], dtype=object)
+    como_texto = rng.random(n) < prop_texto
+    for i in np.flatnonzero(como_texto):
+        fechas[i] = fechas[i].strftime(FORMATOS_TEXTO[i % len(FORMATOS_TEXTO)])
+    edades_aprox = dias / 365.0
+    pesos = np.round(15 + edades_aprox * 1.9 + rng.normal(0, 6, size=n), 1).astype(object)
+    for i in np.flatnonzero(rng.random(n) < prop_texto):
+        pesos[i] = str(pesos[i])
+    invalidos = rng.random(n) < prop_invalidos
+    for i in np.flatnonzero(invalidos):
+        if i % 2:
+            fechas[i] = 'sin fecha'
+        else:
+            pesos[i] = None
+    codigos_academia = [f"AC{k:02d}" for k in range(academias)]
+    academia = rng.integers(0, academias, size=n)
+    # Mismo orden de sorteos que las columnas, para que la semilla dé los mismos datos
+    documentos = rng.integers(10_000_000, 99_999_999, size=n)
+    nombres = rng.choice(NOMBRES, size=n)
+    apellidos = rng.choice(APELLIDOS, size=n)
+    grados = rng.choice(GRADOS, size=n)
+    sexos = rng.choice(SEXOS, size=n)
+    modalidades = np.where(rng.random(n) < 0.9, 'KYORUGUI', 'POOMSAE')
+    if sesgo > 0:
+        perfiles = rng.choice(n, size=min(PERFILES_POPULARES, n), replace=False)
+        copian = np.flatnonzero(rng.random(n) < sesgo)
+        origen = rng.choice(perfiles, size=len(copian))
+        fechas[copian] = fechas[origen]
+        pesos[copian] = pesos[origen]
+        grados[copian] = grados[origen]
+        sexos[copian] = sexos[origen]
+    return pd.DataFrame({
+        'N°': np.arange(1, n + 1),
+        'DOCUMENTO': documentos,
+        'NOMBRES': nombres,
+        'APELLIDOS': apellidos,
+        'Fecha de Nacimiento': fechas,
+        'PESO': pesos,
+        'KUP': grados,
+        'SEXO': sexos,
+        'MODALIDAD': modalidades,
+        'ACADEMIA': [f"ACADEMIA {codigos_academia[a]}" for a in academia],
+        'ABREVIATURA': [codigos_academia[a] for a in academia],
+    })
+
+def escribir_planillas(carpeta, atletas, academias=13, sesgo=0.0, semilla=0):
+    """
+    Escribe una planilla .xlsx por academia (como las que manda cada academia al
+    torneo) con `atletas` inscripciones en total. Devuelve las rutas en orden.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    df = generar_participantes(atletas, semilla=semilla, academias=academias, sesgo=sesgo)
+    rutas = []
+    for abreviatura, planilla in df.groupby('ABREVIATURA', sort=True):
+        ruta = os.path.join(carpeta, f"inscripciones_{abreviatura}.xlsx")
+        planilla.to_excel(ruta, index=False)
+        rutas.append(ruta)
+    return rutas
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Verifica que la clasificación en bloques (CLASSIFY_CHUNK_ROWS) produzca los
+mismos CATEGORIAS.xlsx, SOLOS.xlsx y resumen que el modo en memoria, con
+planillas sintéticas y varios tamaños de bloque. También simula una planilla
+que falla a mitad de lectura (en ambos modos tiene que quedar afuera completa)
+y una con fechas de texto mes/día cuyos primeros bloques solo traen fechas
+ambiguas (03/04/2010): el orden de formatos tiene que ser el de toda la columna.
+
+Uso:
+    python benchmarks/verificar_bloques.py [atletas]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from unittest import mock
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import filo_0_5
+from filo_0_5 import AgrupadorMultiple, generar_resumen_torneo
+from datos_sinteticos import escribir_planillas, generar_participantes
+
+TAMANOS_BLOQUE = (13, 97, 100_000)
+
+def correr(archivos, carpeta, filas_por_bloque=None):
+    """Pipeline sin brackets en un modo; devuelve los archivos procesados."""
+    os.makedirs(carpeta, exist_ok=True)
+    agrupador = AgrupadorMultiple()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if filas_por_bloque:
+            df = agrupador.procesar_archivos_por_bloques(archivos, carpeta, filas_por_bloque)
+            solos = df.solos()
+        else:
+            df = agrupador.procesar_multiples_archivos(archivos, workers=1)
+            df = df[df['categoria_completa'].notnull()]
+            agrupador.exportar_categorias_unico_excel(df, carpeta)
+            solos = agrupador.identificar_solos(df)
+        agrupador.exportar_solos(solos, carpeta)
+        generar_resumen_torneo(df, solos, None, carpeta)
+    return agrupador.archivos_procesados
+
+def comparar(carpeta_a, carpeta_b):
+    for nombre in ('CATEGORIAS.xlsx', 'SOLOS.xlsx'):
+        pd.testing.assert_frame_equal(pd.read_excel(os.path.join(carpeta_a, nombre)),
+                                      pd.read_excel(os.path.join(carpeta_b, nombre)))
+    with open(os.path.join(carpeta_a, 'resumen_torneo.txt'), encoding='utf-8') as a, \
+            open(os.path.join(carpeta_b, 'resumen_torneo.txt'), encoding='utf-8') as b:
+        assert a.read() == b.read(), "resumen_torneo.txt distinto"
+
+@contextlib.contextmanager
+def fallo_a_mitad(archivo):
+    """La lectura de `archivo` falla después del primer bloque (en memoria, al leerlo)."""
+    leer_excel = filo_0_5.leer_excel
+    leer_por_bloques = filo_0_5.leer_excel_por_bloques
+
+    def leer_excel_con_fallo(ruta, *args, **kwargs):
+        if ruta == archivo:
+            raise OSError("lectura interrumpida (simulada)")
+        return leer_excel(ruta, *args, **kwargs)
+
+    def leer_por_bloques_con_fallo(ruta, *args, **kwargs):
+        for bloque in leer_por_bloques(ruta, *args, **kwargs):
+            yield bloque
+            if ruta == archivo:
+                raise OSError("lectura interrumpida (simulada)")
+
+    with mock.patch.object(filo_0_5, 'leer_excel', leer_excel_con_fallo), \
+            mock.patch.object(filo_0_5, 'leer_excel_por_bloques', leer_por_bloques_con_fallo):
+        yield
+
+def escribir_planilla_mes_dia(ruta, atletas):
+    """Planilla con todas las fechas como texto MM/DD/AAAA, primero las de día <= 12 (ambiguas)."""
+    df = generar_participantes(atletas, semilla=2, academias=1, prop_invalidos=0)
+    fechas = [f if isinstance(f, datetime) else None for f in df['Fecha de Nacimiento']]
+    df = df.assign(_dia=[f.day if f else 0 for f in fechas],
+                   **{'Fecha de Nacimiento': [f.strftime('%m/%d/%Y') if f else None for f in fechas]})
+    df.sort_values('_dia', kind='stable').drop(columns='_dia').to_excel(ruta, index=False)
+    return ruta
+
+def verificar(nombre, archivos, carpeta):
+    inicio = time.perf_counter()
+    procesados = correr(archivos, os.path.join(carpeta, f"{nombre}_memoria"))
+    t_memoria = time.perf_counter() - inicio
+    for filas in TAMANOS_BLOQUE:
+        inicio = time.perf_counter()
+        en_bloques = correr(archivos, os.path.join(carpeta, f"{nombre}_{filas}"), filas)
+        assert en_bloques == procesados, (en_bloques, procesados)
+        comparar(os.path.join(carpeta, f"{nombre}_memoria"), os.path.join(carpeta, f"{nombre}_{filas}"))
+        print(f"  • {nombre:<16} bloques de {filas:>7}: idéntico "
+              f"({t_memoria:.2f} s en memoria, {time.perf_counter() - inicio:.2f} s en bloques)")
+    return procesados
+
+def main():
+    atletas = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    os.chdir(RAIZ)
+    carpeta = tempfile.mkdtemp(prefix='verificar_bloques_')
+    archivos = escribir_planillas(os.path.join(carpeta, 'planillas'), atletas, academias=7, sesgo=0.3, semilla=1)
+    print(f"🧪 {atletas:,} atletas en {len(archivos)} planillas ({carpeta})")
+
+    verificar('completo', archivos, carpeta)
+
+    # Una planilla que falla después de su primer bloque no aporta ninguna fila
+    fallida = archivos[len(archivos) // 2]
+    with fallo_a_mitad(fallida):
+        procesados = verificar('fallo_a_mitad', archivos, carpeta)
+    assert fallida not in procesados
+
+    mes_dia = escribir_planilla_mes_dia(os.path.join(carpeta, 'planillas', 'mes_dia.xlsx'), 1000)
+    verificar('fechas_mes_dia', [mes_dia], carpeta)
+    print("✅ Mismos resultados en memoria y en bloques")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Llaves de eliminación simple dibujadas con primitivas de reportlab.
+Calcula el árbol completo (siembra, byes y todas las rondas) para hasta 128
+participantes y lo dibuja en un rectángulo (x, y, ancho, alto) del canvas, con
+el estilo Mexxus Arena del editor. No usa plantillas PNG ni rasteriza nada.
+"""
+
+from reportlab.lib import colors
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+MAX_PARTICIPANTES = 128
+
+# 🎨 ESTILO MEXXUS ARENA
+MEXXUS_COLORS = {
+    'gold': colors.Color(0.85, 0.65, 0.125),        # Dorado Mexxus
+    'dark_gold': colors.Color(0.72, 0.53, 0.04),    # Dorado oscuro
+    'red_fighter': colors.Color(0.8, 0.15, 0.15),   # Rojo luchador
+    'blue_fighter': colors.Color(0.15, 0.35, 0.8),  # Azul luchador
+    'dark_gray': colors.Color(0.2, 0.2, 0.2),       # Gris oscuro
+    'light_gray': colors.Color(0.95, 0.95, 0.95)    # Gris claro
+}
+
+# Medidas máximas (en puntos) de las cajas del editor; se achican si no caben
+ANCHO_CAJA_MAX = 280
+ALTO_CAJA_MAX = 25
+SEPARACION_MAX = 10
+PASO_RONDA_MAX = 100
+FUENTE = "Helvetica"
+TAMANO_FUENTE_MAX = 9
+
+def tamano_llave(num_participantes):
+    """Potencia de 2 más chica que alcanza para num_participantes."""
+    tamano = 1
+    while tamano < num_participantes:
+        tamano *= 2
+    return tamano
+
+def orden_siembra(tamano):
+    """
+    Orden de siembras en los casilleros de la primera ronda (1 contra el último,
+    y los mejores sembrados en mitades opuestas). Ej. 8 -> [1, 8, 4, 5, 2, 7, 3, 6].
+    """
+    orden = [1]
+    while len(orden) < tamano:
+        total = len(orden) * 2 + 1
+        orden = [siembra for s in orden for siembra in (s, total - s)]
+    return orden
+
+def calcular_llave(participantes):
+    """
+    Arma la llave de eliminación simple. El orden de `participantes` es la siembra.
+    Devuelve un dict con:
+        tamano: casilleros de la primera ronda (potencia de 2)
+        rondas: cantidad de rondas hasta la final
+        byes: casilleros vacíos (los reciben los mejores sembrados)
+        casilleros: lista de participantes o None (bye) en orden de arriba a abajo
+    """
+    num = len(participantes)
+    if num > MAX_PARTICIPANTES:
+        raise ValueError(f"Máximo {MAX_PARTICIPANTES} participantes por llave (recibidos {num})")
+    tamano = tamano_llave(max(num, 1))
+    casilleros = [participantes[s - 1] if s <= num else None for s in orden_siembra(tamano)]
+    return {
+        'tamano': tamano,
+        'rondas': tamano.bit_length() - 1,
+        'byes': tamano - num,
+        'casilleros': casilleros,
+    }
+
+def texto_participante(participante):
+    """Acepta un nombre ya armado o un dict {'name', 'academy'} del editor."""
+    if isinstance(participante, dict):
+        texto = f"{participante.get('name', '')}"
+        if participante.get('academy'):
+            texto += f" ({participante['academy']})"
+        return texto
+    return str(participante)
+
+def _recortar(texto, ancho, tamano_fuente):
+    if stringWidth(texto, FUENTE, tamano_fuente) <= ancho:
+        return texto
+    while texto and stringWidth(texto + "...", FUENTE, tamano_fuente) > ancho:
+        texto = texto[:-1]
+    return texto + "..."
+
+def _conectar(lineas, x_entrada, paso, y1, y2):
+    """Une dos entradas en un combate y devuelve la altura de la salida."""
+    x_medio = x_entrada + paso / 2
+    y_salida = (y1 + y2) / 2
+    lineas.extend([
+        (x_entrada, y1, x_medio, y1),
+        (x_entrada, y2, x_medio, y2),
+        (x_medio, y1, x_medio, y2),
+        (x_medio, y_salida, x_entrada + paso, y_salida),
+    ])
+    return y_salida
+
+def geometria_llave(llave, x, y, ancho, alto):
+    """
+    Calcula cajas y líneas de la llave dentro del rectángulo (x, y, ancho, alto),
+    anclada arriba a la izquierda. Coordenadas de reportlab (y crece hacia arriba).
+    Devuelve {'cajas': [(x, y, w, h, participante, casillero)], 'lineas': [(x1, y1, x2, y2)],
+              'tamano_fuente': float}.
+    """
+    tamano, rondas, casilleros = llave['tamano'], llave['rondas'], llave['casilleros']
+    alto_casillero = min(alto / tamano, ALTO_CAJA_MAX + SEPARACION_MAX)
+    alto_caja = alto_casillero * ALTO_CAJA_MAX / (ALTO_CAJA_MAX + SEPARACION_MAX)
+    if rondas:
+        ancho_caja = min(ANCHO_CAJA_MAX, ancho * 0.55)
+        paso = min(PASO_RONDA_MAX, (ancho - ancho_caja) / rondas)
+    else:
+        ancho_caja, paso = min(ANCHO_CAJA_MAX, ancho), 0
+    tope = y + alto
+
+    def centro(casillero):
+        return tope - (casillero + 0.5) * alto_casillero
+
+    def caja(participante, casillero, cy):
+        return (x, cy - alto_caja / 2, ancho_caja, alto_caja, participante, casillero)
+
+    cajas = []
+    lineas = []
+    if not rondas:
+        if casilleros[0] is not None:
+            cajas.append(caja(casilleros[0], 0, centro(0)))
+        return {'cajas': cajas, 'lineas': lineas, 'tamano_fuente': min(TAMANO_FUENTE_MAX, alto_caja * 0.6)}
+
+    # Primera ronda: combates normales o byes (el sembrado pasa directo a la segunda)
+    x_entrada = x + ancho_caja
+    salidas = []
+    for casillero in range(0, tamano, 2):
+        arriba, abajo = casilleros[casillero], casilleros[casillero + 1]
+        if arriba is not None and abajo is not None:
+            cajas.append(caja(arriba, casillero, centro(casillero)))
+            cajas.append(caja(abajo, casillero + 1, centro(casillero + 1)))
+            salidas.append(_conectar(lineas, x_entrada, paso, centro(casillero), centro(casillero + 1)))
+        else:
+            cy = (centro(casillero) + centro(casillero + 1)) / 2
+            casillero_real = casillero if arriba is not None else casillero + 1
+            cajas.append(caja(casilleros[casillero_real], casillero_real, cy))
+            lineas.append((x_entrada, cy, x_entrada + paso, cy))
+            salidas.append(cy)
+
+    # Rondas siguientes hasta la final
+    for ronda in range(1, rondas):
+        x_entrada = x + ancho_caja + ronda * paso
+        salidas = [_conectar(lineas, x_entrada, paso, salidas[k], salidas[k + 1])
+                   for k in range(0, len(salidas), 2)]
+
+    return {'cajas': cajas, 'lineas': lineas, 'tamano_fuente': min(TAMANO_FUENTE_MAX, alto_caja * 0.6)}
+
+def dibujar_llave(c, participantes, x, y, ancho, alto, titulo=None):
+    """
+    Dibuja la llave completa de `participantes` en el rectángulo (x, y, ancho, alto)
+    del canvas `c`. Si hay título, ocupa la parte de arriba del rectángulo.
+    Los participantes pueden ser nombres o dicts {'name', 'academy'}.
+    """
+    if titulo:
+        tamano_titulo = min(14, alto * 0.06)
+        c.setFillColor(MEXXUS_COLORS['gold'])
+        c.setFont("Helvetica-Bold", tamano_titulo)
+        c.drawString(x, y + alto - tamano_titulo, _recortar(titulo, ancho, tamano_titulo))
+        alto -= tamano_titulo * 2
+
+    llave = calcular_llave(list(participantes))
+    geometria = geometria_llave(llave, x, y, ancho, alto)
+    tamano_fuente = geometria['tamano_fuente']
+
+    # Cajas de la primera ronda: gris claro con franja azul/roja según el casillero
+    c.setLineWidth(1.5 if tamano_fuente >= 6 else 0.5)
+    c.setStrokeColor(MEXXUS_COLORS['dark_gold'])
+    c.setFont(FUENTE, tamano_fuente)
+    franja = min(10, geometria['cajas'][0][2] * 0.04) if geometria['cajas'] else 0
+    for cx, cy, w, h, participante, casillero in geometria['cajas']:
+        c.setFillColor(MEXXUS_COLORS['light_gray'])
+        c.rect(cx, cy, w, h, fill=1, stroke=1)
+        c.setFillColor(MEXXUS_COLORS['blue_fighter'] if casillero % 2 == 0 else MEXXUS_COLORS['red_fighter'])
+        c.rect(cx, cy, franja, h, fill=1, stroke=0)
+        c.setFillColor(MEXXUS_COLORS['dark_gray'])
+        texto = _recortar(texto_participante(participante), w - franja * 2, tamano_fuente)
+        c.drawString(cx + franja * 1.5, cy + (h - tamano_fuente) / 2 + tamano_fuente * 0.2, texto)
+
+    # 🥇 Todas las líneas doradas
+    c.setStrokeColor(MEXXUS_COLORS['gold'])
+    c.setLineWidth(2 if tamano_fuente >= 6 else 1)
+    if geometria['lineas']:
+        c.lines(geometria['lineas'])
+
+    # Restaurar configuración por defecto
+    c.setFillColor(colors.black)
+    c.setStrokeColor(colors.black)
+    c.setLineWidth(1)
+    return llave
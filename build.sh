@@ -40,6 +40,10 @@ else
     pip install -r requirements_binary.txt
 fi
 
+# Precalcular geometría de plantillas (evita OpenCV al generar brackets)
+echo "📐 Precalculando geometría de plantillas..."
+python precalcular_plantillas.py bracket_templates || echo "⚠️ No se pudo precalcular la geometría, se calculará bajo demanda"
+
 echo "🎉 Build completado exitosamente!"
 
 # Verificar que la aplicación puede iniciar
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Regeneración incremental de brackets.
+Cada bracket tiene una huella (sha1) de su contenido: categoría, participantes
+en orden, contenido de la plantilla, fuentes, tamaños y renderizador. La imagen
+se guarda en un caché direccionado por contenido (<carpeta>/<ab>/<huella>.png),
+compartido entre corridas y entre trabajos de la web; si un organizador vuelve
+a subir la planilla con una corrección, solo se dibujan los brackets cuya huella
+cambió y BRACKETS.pdf se vuelve a armar con las imágenes del caché.
+
+Cada carpeta de brackets guarda un manifiesto (manifiesto_brackets.json) con la
+huella de cada categoría y de dónde salió (render, caché o llave vectorial).
+
+BRACKET_CACHE: 'auto' (por defecto, _cache_brackets dentro de la carpeta de
+resultados), una ruta, o 'none' para desactivarlo.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+
+from PIL import Image
+
+# Subir al cambiar cómo se dibujan los brackets, así no se reutilizan imágenes viejas
+VERSION_CACHE = 1
+NOMBRE_CARPETA_CACHE = '_cache_brackets'
+NOMBRE_MANIFIESTO = 'manifiesto_brackets.json'
+
+_huellas_archivos = {}
+_lock_huellas = threading.Lock()
+
+def huella_archivo(ruta):
+    """sha1 del contenido de un archivo, memorizado por (ruta, tamaño, mtime)."""
+    estado = os.stat(ruta)
+    clave = (os.path.abspath(ruta), estado.st_size, estado.st_mtime_ns)
+    with _lock_huellas:
+        huella = _huellas_archivos.get(clave)
+    if huella is None:
+        sha = hashlib.sha1()
+        with open(ruta, 'rb') as f:
+            for parte in iter(lambda: f.read(1 << 20), b''):
+                sha.update(parte)
+        huella = sha.hexdigest()
+        with _lock_huellas:
+            _huellas_archivos[clave] = huella
+    return huella
+
+def huella_bracket(*partes):
+    """sha1 de las partes (serializables a JSON) que definen el dibujo de un bracket."""
+    texto = json.dumps([VERSION_CACHE, *partes], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+def resolver_carpeta_cache(carpeta_resultados, valor=None):
+    """
+    Carpeta del caché de brackets o None si está desactivado.
+    valor None = variable BRACKET_CACHE; 'auto' = _cache_brackets en carpeta_resultados.
+    """
+    if valor is None:
+        valor = os.environ.get('BRACKET_CACHE', 'auto')
+    valor = (valor or '').strip()
+    if valor.lower() in ('', '0', 'none'):
+        return None
+    if valor.lower() == 'auto':
+        return os.path.join(carpeta_resultados, NOMBRE_CARPETA_CACHE)
+    return valor
+
+class CacheBrackets:
+    """
+    Imágenes de brackets por huella. Solo guarda la ruta de la carpeta, así se
+    puede pasar a los procesos del pool de render; la escritura es atómica
+    (temporal + rename), por lo que varios trabajos pueden compartirla.
+    """
+
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+
+    @classmethod
+    def desde_config(cls, carpeta_resultados, valor=None):
+        """Instancia según BRACKET_CACHE (ver resolver_carpeta_cache) o None."""
+        carpeta = resolver_carpeta_cache(carpeta_resultados, valor)
+        return cls(carpeta) if carpeta else None
+
+    def ruta(self, huella):
+        return os.path.join(self.carpeta, huella[:2], f"{huella}.png")
+
+    def cargar(self, huella, copiar_a=None):
+        """
+        Imagen guardada para la huella (cargada en memoria) o None si no está.
+        copiar_a: además copia el PNG ahí (el PNG del bracket en la carpeta de salida).
+        """
+        ruta = self.ruta(huella)
+        try:
+            imagen = Image.open(ruta)
+            imagen.load()
+            if copiar_a:
+                shutil.copyfile(ruta, copiar_a)
+        except (OSError, SyntaxError):
+            return None
+        # El mtime marca el último uso para la limpieza de almacenamiento (LRU)
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        return imagen
+
+    def guardar(self, huella, imagen, ruta_png=None):
+        """Guarda la imagen de la huella; si ya está escrita en ruta_png se copia el archivo."""
+        destino = self.ruta(huella)
+        if os.path.exists(destino):
+            return destino
+        temporal = None
+        try:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(destino), suffix='.tmp')
+            os.close(descriptor)
+            if ruta_png and os.path.exists(ruta_png):
+                shutil.copyfile(ruta_png, temporal)
+            else:
+                imagen.save(temporal, format='PNG', optimize=False)
+            os.replace(temporal, destino)
+            return destino
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el bracket en el caché: {e}")
+            if temporal and os.path.exists(temporal):
+                os.remove(temporal)
+            return None
+
+def leer_manifiesto(carpeta_salida):
+    """Manifiesto de brackets de la carpeta o None si no hay (o no se puede leer)."""
+    ruta = os.path.join(carpeta_salida, NOMBRE_MANIFIESTO)
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def escribir_manifiesto(carpeta_salida, entradas, cache=None):
+    """
+    Guarda el manifiesto de brackets de la corrida. entradas: dicts con
+    categoria, huella, origen ('render', 'cache' o 'vectorial') y png.
+    Borra los PNG de las categorías del manifiesto anterior que ya no existen
+    y devuelve el resumen (reutilizados, renderizados, cambiados).
+    """
+    anterior = leer_manifiesto(carpeta_salida) or {}
+    huellas_anteriores = {e['categoria']: e.get('huella') for e in anterior.get('categorias', [])}
+    actuales = set(e['categoria'] for e in entradas)
+    for entrada in anterior.get('categorias', []):
+        png = entrada.get('png')
+        if png and entrada['categoria'] not in actuales and os.path.exists(os.path.join(carpeta_salida, png)):
+            os.remove(os.path.join(carpeta_salida, png))
+
+    resumen = {
+        'reutilizados': sum(1 for e in entradas if e['origen'] == 'cache'),
+        'renderizados': sum(1 for e in entradas if e['origen'] == 'render'),
+        'vectoriales': sum(1 for e in entradas if e['origen'] == 'vectorial'),
+        'cambiados': sum(1 for e in entradas if huellas_anteriores.get(e['categoria']) != e['huella']),
+    }
+    manifiesto = {
+        'version': VERSION_CACHE,
+        'generado': datetime.now().isoformat(timespec='seconds'),
+        'cache': cache.carpeta if cache else None,
+        **resumen,
+        'categorias': entradas,
+    }
+    ruta = os.path.join(carpeta_salida, NOMBRE_MANIFIESTO)
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+    return resumen
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Caché en memoria de las plantillas de bracket ya ampliadas.
+mark_positions dibuja cada bracket sobre la plantilla convertida a RGB y
+ampliada con LANCZOS, y la misma decena de plantillas se usa para todas las
+categorías. La plantilla ampliada se guarda una vez por proceso (por ruta,
+mtime, tamaño y escala) y cada bracket parte de una copia, que es mucho más
+barata que volver a ampliar.
+
+Una plantilla ampliada 4x ocupa ~80 MB, así que el caché tiene un límite de
+memoria (TEMPLATE_CACHE_MB) y descarta la menos usada recientemente. Con
+BRACKET_RENDER_WORKERS > 1 cada proceso del pool tiene su propio caché.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+LIMITE_POR_DEFECTO_MB = 256
+
+def resolver_limite_mb(limite_mb=None):
+    """Límite de memoria del caché en MB. None = variable TEMPLATE_CACHE_MB; 0 = desactivado."""
+    if limite_mb is None:
+        try:
+            limite_mb = float(os.environ.get('TEMPLATE_CACHE_MB', LIMITE_POR_DEFECTO_MB))
+        except ValueError:
+            limite_mb = LIMITE_POR_DEFECTO_MB
+    return max(limite_mb, 0)
+
+def _bytes_imagen(imagen):
+    # PIL guarda RGB con 4 bytes por píxel
+    return imagen.width * imagen.height * 4
+
+class CachePlantillas:
+    """
+    Plantillas en RGB ampliadas por escala, con descarte LRU por memoria.
+    base(ruta, escala) devuelve (copia de la plantilla ampliada, tamaño original).
+    """
+
+    def __init__(self, limite_mb=None):
+        self.limite_bytes = int(resolver_limite_mb(limite_mb) * 1024 * 1024)
+        self._imagenes = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartes = 0
+
+    def _clave(self, ruta, escala):
+        estado = os.stat(ruta)
+        return (os.path.abspath(ruta), estado.st_mtime_ns, estado.st_size, escala)
+
+    def base(self, ruta, escala):
+        """Copia de la plantilla en RGB ampliada `escala` veces y su tamaño original."""
+        clave = self._clave(ruta, escala)
+        with self._lock:
+            entrada = self._imagenes.get(clave)
+            if entrada is not None:
+                self._imagenes.move_to_end(clave)
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+        if entrada is not None:
+            imagen, tamano = entrada
+            return imagen.copy(), tamano
+
+        original = Image.open(ruta).convert('RGB')
+        imagen = original
+        if escala != 1:
+            imagen = original.resize((original.width * escala, original.height * escala), Image.Resampling.LANCZOS)
+        if self._guardar(clave, imagen, original.size):
+            return imagen.copy(), original.size
+        return imagen, original.size
+
+    def _guardar(self, clave, imagen, tamano):
+        """Guarda la plantilla ampliada; False si no entra en el límite."""
+        tamano_bytes = _bytes_imagen(imagen)
+        if tamano_bytes > self.limite_bytes:
+            return False
+        with self._lock:
+            if clave in self._imagenes:
+                return True
+            self._imagenes[clave] = (imagen, tamano)
+            self._bytes += tamano_bytes
+            while self._bytes > self.limite_bytes:
+                _, (descartada, _) = self._imagenes.popitem(last=False)
+                self._bytes -= _bytes_imagen(descartada)
+                self.descartes += 1
+        return True
+
+    def vaciar(self):
+        with self._lock:
+            self._imagenes.clear()
+            self._bytes = 0
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'plantillas': len(self._imagenes),
+                'memoria_mb': round(self._bytes / (1024 * 1024), 1),
+                'limite_mb': round(self.limite_bytes / (1024 * 1024), 1),
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'descartes': self.descartes,
+            }
+
+# Caché compartido del proceso
+cache_plantillas = CachePlantillas()
@@ -1,39 +1,17 @@
-import json
-from pathlib import Path
+
+from indice_categorias import obtener_indice_categorias, generar_combinaciones
 
 def load_categories():
     """Load categories from the JSON file."""
     try:
-        with open('categorias_taekwondo.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return obtener_indice_categorias('categorias_taekwondo.json').datos_json()
     except FileNotFoundError:
         print("❌ Error: No se encontró el archivo categorias_taekwondo.json")
         return None
 
 def generate_category_combinations(categories):
     """Generate all possible category combinations."""
-    all_combinations = []
-    
-    for division, data in categories.items():
-        niveles = data['NIVEL']
-        
-        # Handle divisions with different weight structures
-        if isinstance(data['SEXO'], dict):
-            # For divisions like CADETE, JUVENIL, MAYORES where weights differ by gender
-            for nivel in niveles:
-                for genero, pesos in data['SEXO'].items():
-                    for peso in pesos:
-                        categoria = f"{nivel} {division.replace('_', ' ')} {genero} {peso}"
-                        all_combinations.append(categoria)
-        else:
-            # For divisions like PRE_INFANTIL, INFANTIL_A, etc.
-            for nivel in niveles:
-                for genero in data['SEXO']:
-                    for peso in data['PESOS']:
-                        categoria = f"{nivel} {division.replace('_', ' ')} {genero} {peso}"
-                        all_combinations.append(categoria)
-    
-    return sorted(all_combinations)
+    return generar_combinaciones(categories)
 
 def display_categories(combinations):
     """Display categories in a formatted way."""
@@ -63,13 +41,14 @@ def main():
     """Main function to run the category logger."""
     print("\n🔍 Cargando categorías de taekwondo...")
     
-    # Load categories from JSON
-    categories = load_categories()
-    if not categories:
+    # Load the compiled category index (already holds every combination)
+    try:
+        indice = obtener_indice_categorias('categorias_taekwondo.json')
+    except FileNotFoundError:
+        print("❌ Error: No se encontró el archivo categorias_taekwondo.json")
         return
     
-    # Generate all possible combinations
-    combinations = generate_category_combinations(categories)
+    combinations = indice.combinaciones
     
     # Display the categories
     display_categories(combinations)
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Clasificación en bloques para torneos grandes.
+Las planillas se leen de a bloques de filas (lector_excel.leer_excel_por_bloques),
+cada bloque se clasifica y se escribe directo en CATEGORIAS.xlsx con un libro
+openpyxl en modo write_only. Por categoría solo se guardan contadores y la
+primera fila (alcanza para SOLOS y para el resumen), así la memoria depende del
+tamaño del bloque y de la cantidad de categorías, no de la cantidad de atletas.
+La escritura fila por fila de openpyxl es bastante más rápida si lxml está instalado.
+
+Los bloques de cada planilla pasan primero por BloquesPendientes y solo llegan a
+CATEGORIAS.xlsx cuando la planilla se leyó completa: si falla a mitad de lectura
+no aporta ninguna fila, igual que en el modo en memoria.
+
+CLASSIFY_CHUNK_ROWS (filas por bloque, 0 = desactivado) activa este modo en la
+web y en la línea de comandos.
+"""
+
+import math
+import os
+import pickle
+import tempfile
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+# Estilo y formatos que usa pandas.to_excel, para que el archivo sea el mismo
+_BORDE_FINO = Side(style='thin')
+ESTILO_ENCABEZADO = {
+    'font': Font(bold=True),
+    'border': Border(top=_BORDE_FINO, right=_BORDE_FINO, bottom=_BORDE_FINO, left=_BORDE_FINO),
+    'alignment': Alignment(horizontal='center', vertical='top'),
+}
+FORMATO_FECHA_HORA = 'YYYY-MM-DD HH:MM:SS'
+FORMATO_FECHA = 'YYYY-MM-DD'
+
+# Columnas que se muestran de las filas sin categoría (para revisar el Excel)
+COLUMNAS_DEPURACION = ['edad', 'sexo_normalizado', 'nivel_normalizado', 'categoria_edad', 'categoria_peso']
+MAX_EJEMPLOS_SIN_CATEGORIA = 20
+
+def resolver_filas_por_bloque(filas=None):
+    """None = variable CLASSIFY_CHUNK_ROWS. Devuelve None si el modo está desactivado (0)."""
+    if filas is None:
+        try:
+            filas = int(os.environ.get('CLASSIFY_CHUNK_ROWS', 0))
+        except ValueError:
+            filas = 0
+    return filas if filas > 0 else None
+
+def valor_excel(valor):
+    """(valor, formato) con el mismo criterio que pandas.to_excel; faltantes quedan vacíos."""
+    if valor is None:
+        return None, None
+    if isinstance(valor, (bool, np.bool_)):
+        return bool(valor), None
+    if isinstance(valor, (int, np.integer)):
+        return int(valor), None
+    if isinstance(valor, (float, np.floating)):
+        if math.isnan(valor):
+            return None, None
+        if math.isinf(valor):
+            return 'inf' if valor > 0 else '-inf', None
+        return float(valor), None
+    if valor is pd.NaT or valor is pd.NA:
+        return None, None
+    if isinstance(valor, datetime):
+        return valor, FORMATO_FECHA_HORA
+    if isinstance(valor, date):
+        return valor, FORMATO_FECHA
+    if isinstance(valor, timedelta):
+        return valor.total_seconds() / 86400, '0'
+    return str(valor), None
+
+class EscritorExcelPorBloques:
+    """
+    Escribe un Excel fila por fila con un libro write_only de openpyxl.
+    Las columnas se fijan al crear el escritor; los bloques se alinean a ellas
+    (las que falten en un bloque quedan vacías). Se guarda en un temporal y se
+    renombra al cerrar, así nunca queda un archivo a medias con el nombre final.
+    """
+
+    def __init__(self, ruta, columnas):
+        self.ruta = ruta
+        self.columnas = list(columnas)
+        self.filas = 0
+        self._libro = Workbook(write_only=True)
+        self._hoja = self._libro.create_sheet('Sheet1')
+        encabezado = []
+        for columna in self.columnas:
+            celda = WriteOnlyCell(self._hoja, value=valor_excel(columna)[0])
+            celda.font = ESTILO_ENCABEZADO['font']
+            celda.border = ESTILO_ENCABEZADO['border']
+            celda.alignment = ESTILO_ENCABEZADO['alignment']
+            encabezado.append(celda)
+        self._hoja.append(encabezado)
+
+    def _celda(self, valor):
+        valor, formato = valor_excel(valor)
+        if formato is None:
+            return valor
+        celda = WriteOnlyCell(self._hoja, value=valor)
+        celda.number_format = formato
+        return celda
+
+    def validar(self, df):
+        """Error si df trae columnas que no están en el archivo."""
+        sobrantes = [c for c in df.columns if c not in set(self.columnas)]
+        if sobrantes:
+            raise ValueError(f"Columnas no previstas en {self.ruta}: {sobrantes}")
+
+    def agregar(self, df):
+        self.validar(df)
+        for fila in df.reindex(columns=self.columnas).itertuples(index=False, name=None):
+            self._hoja.append([self._celda(valor) for valor in fila])
+        self.filas += len(df)
+
+    def cerrar(self):
+        carpeta = os.path.dirname(self.ruta) or '.'
+        os.makedirs(carpeta, exist_ok=True)
+        temporal = os.path.join(carpeta, f".{os.path.basename(self.ruta)}.tmp")
+        try:
+            self._libro.save(temporal)
+            os.replace(temporal, self.ruta)
+        except Exception:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+        return self.ruta
+
+    def descartar(self):
+        """Abandona el libro sin escribir el Excel y borra el temporal de la hoja que usa openpyxl."""
+        if self._hoja.closed:
+            # save() ya cerró la hoja y borró su temporal
+            return
+        try:
+            self._hoja.close()
+            self._hoja._writer.cleanup()
+        except Exception as e:
+            print(f"⚠️ No se pudo limpiar el Excel a medio escribir {self.ruta}: {e}")
+
+class AcumuladorCategorias:
+    """
+    Resultado de la clasificación en bloques: en lugar del DataFrame completo
+    guarda, por categoría, cuántos participantes tiene y su primera fila, más los
+    conteos por nivel y sexo del resumen. len() es la cantidad de participantes
+    con categoría, igual que len(df) en el modo normal.
+    """
+
+    COLUMNAS_CONTADAS = ('categoria_completa', 'nivel_normalizado', 'sexo_normalizado')
+
+    def __init__(self, columnas):
+        self.columnas = list(columnas)
+        self.archivo_categorias = None
+        self.filas_leidas = 0
+        self.bloques = 0
+        self.filas_sin_categoria = 0
+        self.ejemplos_sin_categoria = []
+        self._conteos = {columna: {} for columna in self.COLUMNAS_CONTADAS}
+        self._primeras_filas = {}
+        self._total = 0
+
+    def __len__(self):
+        return self._total
+
+    def registrar_sin_categoria(self, df):
+        """Cuenta las filas sin categoría y guarda algunas para mostrarlas."""
+        self.filas_sin_categoria += len(df)
+        faltan = MAX_EJEMPLOS_SIN_CATEGORIA - len(self.ejemplos_sin_categoria)
+        if faltan > 0 and len(df):
+            self.ejemplos_sin_categoria.extend(
+                df[COLUMNAS_DEPURACION].head(faltan).itertuples(index=False, name=None))
+
+    def agregar(self, df):
+        """Suma un bloque de participantes ya clasificados (todos con categoría)."""
+        self._total += len(df)
+        for columna, conteos in self._conteos.items():
+            for valor, cantidad in df[columna].value_counts(sort=False).items():
+                conteos[valor] = conteos.get(valor, 0) + int(cantidad)
+        nuevas = ~df['categoria_completa'].duplicated() & ~df['categoria_completa'].isin(self._primeras_filas.keys())
+        if nuevas.any():
+            filas = df.loc[nuevas].reindex(columns=self.columnas)
+            for categoria, fila in zip(filas['categoria_completa'], filas.itertuples(index=False, name=None)):
+                self._primeras_filas[categoria] = fila
+
+    def fusionar(self, otro):
+        """Suma a este acumulador el de una planilla completa (ver BloquesPendientes)."""
+        self._total += otro._total
+        self.filas_leidas += otro.filas_leidas
+        self.bloques += otro.bloques
+        for columna, conteos in self._conteos.items():
+            for valor, cantidad in otro._conteos[columna].items():
+                conteos[valor] = conteos.get(valor, 0) + cantidad
+        for categoria, fila in otro._primeras_filas.items():
+            self._primeras_filas.setdefault(categoria, fila)
+        self.filas_sin_categoria += otro.filas_sin_categoria
+        faltan = MAX_EJEMPLOS_SIN_CATEGORIA - len(self.ejemplos_sin_categoria)
+        self.ejemplos_sin_categoria.extend(otro.ejemplos_sin_categoria[:max(faltan, 0)])
+
+    @property
+    def categorias(self):
+        """Categorías en el orden en que aparecieron."""
+        return list(self._conteos['categoria_completa'])
+
+    def conteos(self, columna):
+        """Mismo resultado que df[columna].value_counts() sobre todos los participantes."""
+        conteos = self._conteos[columna]
+        serie = pd.Series(list(conteos.values()), index=pd.Index(list(conteos.keys()), name=columna),
+                          name='count', dtype='int64')
+        return serie.sort_values(ascending=False)
+
+    def solos(self):
+        """DataFrame de SOLOS: la única fila de cada categoría con un participante, en orden."""
+        filas = [self._primeras_filas[categoria]
+                 for categoria, cantidad in self._conteos['categoria_completa'].items() if cantidad == 1]
+        return pd.DataFrame(filas, columns=self.columnas)
+
+    def ejemplos_sin_categoria_df(self):
+        return pd.DataFrame(self.ejemplos_sin_categoria, columns=COLUMNAS_DEPURACION)
+
+class BloquesEnDisco:
+    """DataFrames guardados en orden en un temporal en disco y leídos de vuelta de a uno."""
+
+    def __init__(self):
+        self._temporal = tempfile.TemporaryFile(suffix='.bloques')
+        self.cantidad = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self._temporal.close()
+
+    def agregar(self, df):
+        pickle.dump(df, self._temporal, protocol=pickle.HIGHEST_PROTOCOL)
+        self.cantidad += 1
+
+    def __iter__(self):
+        self._temporal.seek(0)
+        for _ in range(self.cantidad):
+            yield pickle.load(self._temporal)
+
+class BloquesPendientes(BloquesEnDisco):
+    """
+    Bloques ya clasificados de la planilla que se está leyendo. Las filas con
+    categoría se guardan en un temporal en disco (la memoria sigue dependiendo
+    del tamaño del bloque) y se cuentan en un acumulador propio. confirmar() las
+    pasa al Excel y al acumulador del torneo cuando la planilla terminó sin
+    errores; si no, al cerrar se descartan.
+    """
+
+    def __init__(self, escritor):
+        super().__init__()
+        self.escritor = escritor
+        self.acumulador = AcumuladorCategorias(escritor.columnas)
+
+    def agregar(self, bloque):
+        """Registra un bloque clasificado (con categoria_completa, vacía en las filas sin categoría)."""
+        validas = bloque['categoria_completa'].notnull()
+        self.acumulador.registrar_sin_categoria(bloque.loc[~validas])
+        bloque = bloque.loc[validas]
+        # Se valida ahora para que confirmar() no falle a mitad de la escritura
+        self.escritor.validar(bloque)
+        super().agregar(bloque)
+        self.acumulador.agregar(bloque)
+        self.acumulador.bloques += 1
+        self.acumulador.filas_leidas += len(validas)
+
+    def confirmar(self, acumulador):
+        """Escribe los bloques en el Excel y suma los conteos al acumulador del torneo."""
+        for bloque in self:
+            self.escritor.agregar(bloque)
+        acumulador.fusionar(self.acumulador)
@@ -1,5 +1,19 @@
 import os
 
+def _numero_env(variable, por_defecto, tipo=int):
+    """
+    Valor numérico (tipo int o float) de la variable de entorno. Si falta o no es
+    un número válido se usa por_defecto, avisando, en lugar de fallar al importar.
+    """
+    valor = os.environ.get(variable)
+    if valor is None or not valor.strip():
+        return por_defecto
+    try:
+        return tipo(valor)
+    except ValueError:
+        print(f"⚠️ Valor inválido para {variable} '{valor}', se usa {por_defecto}")
+        return por_defecto
+
 class Config:
     """Configuración base para la aplicación"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
@@ -7,6 +21,37 @@ class Config:
     RESULTS_FOLDER = 'results'
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max
     ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
+    # Procesos para renderizar brackets (1 = secuencial, 0 = todos los CPUs)
+    BRACKET_RENDER_WORKERS = _numero_env('BRACKET_RENDER_WORKERS', 1)
+    # Guardar un PNG por bracket además del PDF (0 = solo BRACKETS.pdf)
+    EXPORT_BRACKET_PNGS = os.environ.get('EXPORT_BRACKET_PNGS', '1') != '0'
+    # 'plantilla' = PNG de bracket_templates, 'vectorial' = llaves dibujadas en el PDF
+    BRACKET_RENDERER = os.environ.get('BRACKET_RENDERER', 'plantilla')
+    # Calidad de los brackets con plantilla: borrador (1x), pantalla (2x) o impresion (4x)
+    BRACKET_RENDER_PROFILE = os.environ.get('BRACKET_RENDER_PROFILE', 'impresion')
+    # Hilos que procesan torneos de /upload en segundo plano
+    JOB_WORKERS = _numero_env('JOB_WORKERS', 1)
+    # Ruta a una base SQLite para persistir la cola de trabajos (vacío = en memoria)
+    JOB_STORE = os.environ.get('JOB_STORE', '')
+    # Procesos para leer y clasificar las planillas de un torneo (1 = secuencial, 0 = todos los CPUs)
+    INGEST_WORKERS = _numero_env('INGEST_WORKERS', 1)
+    # Filas por bloque para clasificar planillas grandes en streaming (0 = todo en memoria)
+    CLASSIFY_CHUNK_ROWS = _numero_env('CLASSIFY_CHUNK_ROWS', 0)
+    # Formato del snapshot binario del torneo clasificado: auto (feather si hay pyarrow, si no ninguno),
+    # feather, parquet, pickle o none
+    TOURNAMENT_SNAPSHOT = os.environ.get('TOURNAMENT_SNAPSHOT', 'auto')
+    # Caché de brackets por huella para regenerar solo lo que cambió ('auto', una ruta o 'none')
+    BRACKET_CACHE = os.environ.get('BRACKET_CACHE', 'auto')
+    # Fecha del torneo (AAAA-MM-DD) a la que se calculan las edades (vacío = hoy)
+    TOURNAMENT_DATE = os.environ.get('TOURNAMENT_DATE', '')
+    # Caché de los ZIP de /download-all por huella de contenido ('auto', una ruta o 'none')
+    ZIP_CACHE = os.environ.get('ZIP_CACHE', 'auto')
+    # Horas sin uso antes de borrar subidas, resultados y cachés (0 = sin vencimiento)
+    STORAGE_RETENTION_HOURS = _numero_env('STORAGE_RETENTION_HOURS', 168, float)
+    # Espacio máximo de subidas, resultados y cachés en MB; se borra lo menos usado (0 = sin cuota)
+    STORAGE_QUOTA_MB = _numero_env('STORAGE_QUOTA_MB', 0, float)
+    # Minutos entre barridos de limpieza en segundo plano (0 = solo con python almacenamiento.py)
+    STORAGE_SWEEP_MINUTES = _numero_env('STORAGE_SWEEP_MINUTES', 30, float)
 
 class DevelopmentConfig(Config):
     """Configuración para desarrollo"""
@@ -18,7 +63,7 @@ class ProductionConfig(Config):
     """Configuración para producción"""
     DEBUG = False
     HOST = '0.0.0.0'
-    PORT = int(os.environ.get('PORT', 5000))
+    PORT = _numero_env('PORT', 5000)
 
 # Configuración por defecto basada en variable de entorno
 config = {
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tipos compactos para el DataFrame de participantes clasificados.
+Las columnas de clasificación se repiten en cada fila con pocos valores
+distintos: se guardan como categóricas de pandas con las categorías fijas de
+categorias_taekwondo.json (más, al final, cualquier valor no oficial que
+aparezca, así no se pierde nada). La edad pasa a Int16. Los valores, los
+Excel y el orden de los grupos no cambian; groupby y los filtros trabajan
+sobre códigos enteros en lugar de cadenas.
+
+Los pesos de la planilla se dejan como vienen: van tal cual a CATEGORIAS.xlsx
+y un float32 cambiaría cómo se ven (45.3 -> 45.29999923706055).
+"""
+
+import numpy as np
+import pandas as pd
+
+from indice_categorias import SEXOS
+
+COLUMNAS_CATEGORICAS = ('sexo_normalizado', 'nivel_normalizado', 'categoria_edad',
+                        'categoria_peso', 'categoria_completa')
+
+def categorias_fijas(indice):
+    """{columna: categorías oficiales en orden} a partir del índice de categorías."""
+    return {
+        'sexo_normalizado': SEXOS,
+        'nivel_normalizado': indice.niveles,
+        'categoria_edad': tuple(indice.rangos_edad),
+        'categoria_peso': indice.etiquetas_peso,
+        'categoria_completa': indice.combinaciones,
+    }
+
+def como_categorica(serie, categorias):
+    """Serie categórica con `categorias` más los valores no previstos, en orden de aparición."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie
+    conocidas = set(categorias)
+    extra = [valor for valor in pd.unique(serie.dropna()) if valor not in conocidas]
+    return serie.astype(pd.CategoricalDtype(list(categorias) + extra))
+
+def edades_compactas(serie):
+    """Edades como Int16 (faltantes = <NA>); si no son enteros chicos se dejan igual."""
+    numeros = pd.to_numeric(serie, errors='coerce')
+    validos = numeros.dropna()
+    if len(validos) and ((validos % 1 != 0).any() or validos.abs().max() > np.iinfo(np.int16).max):
+        return serie
+    return numeros.astype('Int16')
+
+def compactar_participantes(df, indice):
+    """
+    Convierte en el lugar (sin copiar el DataFrame) las columnas de clasificación
+    a categóricas y la edad a Int16. Devuelve el mismo DataFrame.
+    """
+    for columna, categorias in categorias_fijas(indice).items():
+        if columna in df.columns:
+            df[columna] = como_categorica(df[columna], categorias)
+    if 'edad' in df.columns:
+        df['edad'] = edades_compactas(df['edad'])
+    return df
+
+def conteos(serie):
+    """
+    Igual que serie.value_counts(): para una categórica omite las categorías sin
+    participantes y desempata por orden de aparición, como con cadenas.
+    """
+    if not isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.value_counts()
+    codigos = serie.cat.codes.to_numpy()
+    codigos = codigos[codigos >= 0]
+    unicos, primeras = np.unique(codigos, return_index=True)
+    orden = unicos[np.argsort(primeras)]
+    cantidades = np.bincount(codigos, minlength=len(serie.cat.categories))[orden]
+    indice = pd.Index(serie.cat.categories.take(orden), name=serie.name)
+    return pd.Series(cantidades.astype('int64'), index=indice, name='count').sort_values(ascending=False)
+
+def memoria_mb(df):
+    """Memoria del DataFrame (incluye el contenido de las cadenas), en MB."""
+    return round(df.memory_usage(deep=True).sum() / (1024 * 1024), 2)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+ZIP con todos los resultados de un torneo (/download-all).
+El ZIP se arma mientras se envía: cada archivo se escribe en un temporal y sus
+bytes salen hacia el cliente apenas queda cerrado, sin esperar al archivo
+completo. PNG, PDF y Excel ya vienen comprimidos y se guardan tal cual
+(ZIP_STORED); el resto (textos, JSON) se comprime.
+
+El ZIP terminado queda en un caché direccionado por contenido
+(<resultados>/_zip_cache/<huella>.zip): la huella sale del nombre y del sha1 de
+cada archivo del torneo, así el mismo ZIP sirve a todas las descargas hasta
+que cambia algún resultado. ZIP_CACHE: 'auto' (por defecto), una ruta o 'none'.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zipfile
+
+from cache_brackets import huella_archivo
+
+NOMBRE_CARPETA_CACHE = '_zip_cache'
+# Formatos que ya están comprimidos: recomprimirlos solo gasta CPU
+EXTENSIONES_COMPRIMIDAS = frozenset({'.png', '.jpg', '.jpeg', '.pdf', '.xlsx', '.zip', '.gz', '.feather', '.parquet'})
+# Archivos internos que no se entregan: un pickle ejecuta código al abrirlo
+EXTENSIONES_NO_ENTREGABLES = frozenset({'.pkl'})
+TAMANO_BLOQUE = 1 << 20
+
+def resolver_carpeta_cache_zip(carpeta_resultados, valor=None):
+    """
+    Carpeta del caché de ZIP o None si está desactivado.
+    valor None = variable ZIP_CACHE; 'auto' = _zip_cache en carpeta_resultados.
+    """
+    if valor is None:
+        valor = os.environ.get('ZIP_CACHE', 'auto')
+    valor = (valor or '').strip()
+    if valor.lower() in ('', '0', 'none'):
+        return None
+    if valor.lower() == 'auto':
+        return os.path.join(carpeta_resultados, NOMBRE_CARPETA_CACHE)
+    return valor
+
+def compresion_para(nombre):
+    """ZIP_STORED para formatos ya comprimidos, ZIP_DEFLATED para el resto."""
+    if os.path.splitext(nombre)[1].lower() in EXTENSIONES_COMPRIMIDAS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+def es_entregable(nombre):
+    """False para los archivos internos que no se envían al usuario (snapshot pickle)."""
+    return os.path.splitext(nombre)[1].lower() not in EXTENSIONES_NO_ENTREGABLES
+
+def archivos_resultados(carpeta):
+    """[(nombre dentro del ZIP, ruta)] de los archivos entregables de la carpeta, ordenados."""
+    archivos = []
+    for raiz, _, nombres in os.walk(carpeta):
+        for nombre in nombres:
+            if not es_entregable(nombre):
+                continue
+            ruta = os.path.join(raiz, nombre)
+            archivos.append((os.path.relpath(ruta, carpeta).replace(os.sep, '/'), ruta))
+    return sorted(archivos)
+
+def huella_resultados(archivos):
+    """sha1 de los nombres y contenidos (el sha1 de cada archivo se memoriza por mtime)."""
+    contenido = [(nombre, huella_archivo(ruta)) for nombre, ruta in archivos]
+    return hashlib.sha1(json.dumps(contenido).encode('utf-8')).hexdigest()
+
+def _enviar_hasta(lector, posicion):
+    """Bloques del lector desde donde quedó hasta posicion."""
+    while lector.tell() < posicion:
+        bloque = lector.read(min(TAMANO_BLOQUE, posicion - lector.tell()))
+        if not bloque:
+            return
+        yield bloque
+
+def generar_zip(archivos, destino=None):
+    """
+    Generador con los bytes del ZIP de `archivos` ([(nombre, ruta)]), a medida que
+    se escribe. Si se recorre completo y hay destino, el ZIP queda guardado ahí
+    (escritura atómica); si el cliente corta la descarga, el temporal se borra.
+    """
+    carpeta_temporal = os.path.dirname(destino) if destino else None
+    if carpeta_temporal:
+        os.makedirs(carpeta_temporal, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(suffix='.zip.tmp', dir=carpeta_temporal)
+    try:
+        with os.fdopen(descriptor, 'wb') as salida, open(temporal, 'rb') as lector:
+            with zipfile.ZipFile(salida, 'w') as archivo_zip:
+                for nombre, ruta in archivos:
+                    archivo_zip.write(ruta, nombre, compress_type=compresion_para(nombre))
+                    # El encabezado local ya se reescribió: todo lo anterior es definitivo
+                    salida.flush()
+                    yield from _enviar_hasta(lector, salida.tell())
+            salida.flush()
+            yield from _enviar_hasta(lector, salida.tell())
+        if destino:
+            os.replace(temporal, destino)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+class CacheZip:
+    """ZIP de resultados por huella de contenido, compartido entre descargas y trabajos."""
+
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.generados = 0
+
+    @classmethod
+    def desde_config(cls, carpeta_resultados, valor=None):
+        """Instancia según ZIP_CACHE (ver resolver_carpeta_cache_zip) o None."""
+        carpeta = resolver_carpeta_cache_zip(carpeta_resultados, valor)
+        return cls(carpeta) if carpeta else None
+
+    def ruta(self, huella):
+        return os.path.join(self.carpeta, f"{huella}.zip")
+
+    def buscar(self, huella):
+        """Ruta del ZIP guardado para la huella o None."""
+        ruta = self.ruta(huella)
+        if not os.path.isfile(ruta):
+            return None
+        # El mtime marca el último uso para la limpieza de almacenamiento (LRU)
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        with self._lock:
+            self.aciertos += 1
+        return ruta
+
+    def generar(self, archivos, huella):
+        """Como generar_zip, guardando el resultado en el caché."""
+        with self._lock:
+            self.generados += 1
+        return generar_zip(archivos, self.ruta(huella))
+
+    def estadisticas(self):
+        with self._lock:
+            return {'carpeta': self.carpeta, 'aciertos': self.aciertos, 'generados': self.generados}
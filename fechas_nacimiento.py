@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Cálculo de edades a partir de las fechas de nacimiento de las planillas.
+Las planillas repiten las mismas fechas miles de veces y cada academia escribe
+las fechas de texto con un solo formato. Por eso el motor trabaja sobre los
+valores distintos de la columna (se convierten una vez y se reparten a las
+filas) y ordena los formatos según cuál reconoce más textos de una muestra de
+la columna: el formato de la planilla se prueba primero sobre todos los textos
+juntos y los demás solo con lo que quede sin reconocer.
+
+Leyendo en bloques (CLASSIFY_CHUNK_ROWS) el orden se deduce una vez por
+planilla con los textos de toda la columna (textos_distintos) y se fija con
+MotorFechas.con_formatos para todos sus bloques: una fecha ambigua como
+03/04/2010 se lee igual en todos los bloques y que en el modo en memoria.
+
+La edad se calcula a una fecha de referencia fija para toda la corrida (la
+fecha del torneo), no a la fecha del reloj de cada fila. TOURNAMENT_DATE
+(AAAA-MM-DD) la fija; sin valor se usa la fecha de hoy al crear el motor.
+"""
+
+import os
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y')
+# Textos distintos que se miran para ordenar los formatos de una columna
+MUESTRA_FORMATOS = 200
+EJEMPLOS_NO_RECONOCIDOS = 5
+
+def resolver_fecha_referencia(valor=None):
+    """
+    Fecha a la que se calculan las edades.
+    None = variable TOURNAMENT_DATE (AAAA-MM-DD); vacío = hoy.
+    """
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    if valor is None:
+        valor = os.environ.get('TOURNAMENT_DATE', '')
+    valor = (valor or '').strip()
+    if not valor:
+        return date.today()
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        print(f"⚠️ Fecha de referencia inválida '{valor}' (formato AAAA-MM-DD), se usa la de hoy")
+        return date.today()
+
+def edad_en_fecha(nacimiento, referencia):
+    """Años cumplidos a la fecha de referencia."""
+    edad = referencia.year - nacimiento.year
+    if (referencia.month, referencia.day) < (nacimiento.month, nacimiento.day):
+        edad -= 1
+    return edad
+
+def edad_desde_valor(valor, formatos, referencia):
+    """Edad para un valor suelto (fecha o texto en alguno de los formatos) o None."""
+    if pd.isna(valor):
+        return None
+    try:
+        if isinstance(valor, str):
+            for formato in formatos:
+                try:
+                    valor = datetime.strptime(valor, formato)
+                    break
+                except ValueError:
+                    continue
+            else:
+                return None
+        if hasattr(valor, 'date'):
+            valor = valor.date()
+        return edad_en_fecha(valor, referencia)
+    except Exception:
+        return None
+
+def textos_distintos(valores):
+    """Textos distintos de una columna en orden de aparición (los que mira ordenar_formatos)."""
+    return [valor for valor in pd.unique(np.asarray(valores, dtype=object)) if isinstance(valor, str)]
+
+def ordenar_formatos(textos, formatos=FORMATOS_FECHA, muestra=MUESTRA_FORMATOS):
+    """
+    Formatos ordenados por cuántos textos de la muestra reconocen (de más a
+    menos); a igual cantidad queda el orden original. Así en una columna
+    día/mes, 03/04/2010 sigue siendo 3 de abril, y en una mes/día, 4 de marzo.
+    """
+    textos = np.asarray(textos, dtype=object)
+    if len(textos) > muestra:
+        textos = textos[np.linspace(0, len(textos) - 1, muestra).astype(int)]
+    muestra_serie = pd.Series(textos, dtype=object)
+    aciertos = [int(pd.to_datetime(muestra_serie, format=formato, errors='coerce').notna().sum())
+                for formato in formatos]
+    orden = sorted(range(len(formatos)), key=lambda i: -aciertos[i])
+    return tuple(formatos[i] for i in orden)
+
+class MotorFechas:
+    """
+    Convierte columnas de fechas de nacimiento en edades a fecha_referencia.
+    no_reconocidas acumula los valores no vacíos sin edad (texto sin formato
+    conocido, números sueltos, fechas imposibles) de todas las columnas vistas.
+    """
+
+    def __init__(self, fecha_referencia=None, formatos=FORMATOS_FECHA):
+        self.fecha_referencia = resolver_fecha_referencia(fecha_referencia)
+        self.formatos = tuple(formatos)
+        self.no_reconocidas = 0
+        self._formatos_columna = None
+
+    @contextmanager
+    def con_formatos(self, formatos):
+        """
+        Dentro del bloque se usa este orden de formatos (deducido con
+        ordenar_formatos sobre toda la columna) en lugar de deducirlo en cada
+        llamada a edades(). None = deducirlo como siempre.
+        """
+        anterior, self._formatos_columna = self._formatos_columna, formatos
+        try:
+            yield self
+        finally:
+            self._formatos_columna = anterior
+
+    def _edades_de_fechas(self, fechas_dt):
+        """Edades (float, NaN si falta la fecha) de un DatetimeIndex."""
+        referencia = self.fecha_referencia
+        anio = fechas_dt.year.to_numpy(dtype=float)
+        cumple_pendiente = (fechas_dt.month.to_numpy(dtype=float) * 100 +
+                            fechas_dt.day.to_numpy(dtype=float)) > (referencia.month * 100 + referencia.day)
+        return referencia.year - anio - cumple_pendiente
+
+    def _edades_unicas(self, valores):
+        """Edades de un arreglo de valores distintos (sin vacíos)."""
+        n = len(valores)
+        es_texto = np.fromiter((isinstance(v, str) for v in valores), dtype=bool, count=n)
+        es_fecha = np.fromiter((isinstance(v, date) for v in valores), dtype=bool, count=n)
+        fechas_dt = pd.DatetimeIndex(np.full(n, np.datetime64('NaT'), dtype='datetime64[ns]'))
+        if es_fecha.any():
+            fechas_dt = fechas_dt.where(~es_fecha, pd.to_datetime(
+                pd.Series(np.where(es_fecha, valores, None)), errors='coerce').to_numpy())
+        formatos = self.formatos
+        if es_texto.any():
+            posiciones = np.flatnonzero(es_texto)
+            textos = pd.Series(valores[posiciones], dtype=object)
+            formatos = self._formatos_columna or ordenar_formatos(textos.to_numpy(), self.formatos)
+            convertidas = np.full(len(posiciones), np.datetime64('NaT'), dtype='datetime64[ns]')
+            por_resolver = np.ones(len(posiciones), dtype=bool)
+            for formato in formatos:
+                if not por_resolver.any():
+                    break
+                intento = pd.to_datetime(textos[por_resolver], format=formato, errors='coerce').to_numpy()
+                resueltas = np.flatnonzero(por_resolver)[~pd.isna(intento)]
+                convertidas[resueltas] = intento[~pd.isna(intento)]
+                por_resolver[resueltas] = False
+            valores_dt = fechas_dt.to_numpy().copy()
+            valores_dt[posiciones] = convertidas
+            fechas_dt = pd.DatetimeIndex(valores_dt)
+        edades = self._edades_de_fechas(fechas_dt)
+        # Fuera de rango para pandas (p.ej. año 1200) o textos sin formato conocido
+        for i in np.flatnonzero((es_texto | es_fecha) & pd.isna(fechas_dt)):
+            edad = edad_desde_valor(valores[i], formatos, self.fecha_referencia)
+            edades[i] = np.nan if edad is None else edad
+        return edades
+
+    def edades(self, fechas):
+        """
+        Edades (arreglo float, NaN sin edad) para una columna de fechas. Cada
+        valor distinto se convierte una sola vez; los no reconocidos se cuentan
+        en no_reconocidas y se avisan con algunos ejemplos.
+        """
+        serie = pd.Series(fechas)
+        if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+            return self._edades_de_fechas(pd.DatetimeIndex(serie))
+        codigos, unicos = pd.factorize(serie.to_numpy(dtype=object), use_na_sentinel=True)
+        edades_unicas = self._edades_unicas(unicos)
+        sin_edad = np.flatnonzero(np.isnan(edades_unicas))
+        if len(sin_edad):
+            repeticiones = np.bincount(codigos[codigos >= 0], minlength=len(unicos))
+            cantidad = int(repeticiones[sin_edad].sum())
+            self.no_reconocidas += cantidad
+            ejemplos = ', '.join(repr(unicos[i]) for i in sin_edad[:EJEMPLOS_NO_RECONOCIDOS])
+            print(f"⚠️ {cantidad} fechas de nacimiento no reconocidas (quedan sin categoría), p. ej.: {ejemplos}")
+        return np.append(edades_unicas, np.nan)[codigos]
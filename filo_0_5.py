@@ -7,66 +7,79 @@ Fecha: 2024
 """
 
 import pandas as pd
+import numpy as np
 import json
 import os
 import re
-from datetime import datetime, date
 from pathlib import Path
+import contextlib
 import glob
+import io
+import itertools
 import shutil
 import sys
 import tempfile
+import threading
 import time
+from collections import deque, namedtuple
+from collections.abc import Mapping
+
+from indice_categorias import obtener_indice_categorias, generar_combinaciones
+from instrumentacion import Instrumentacion, perfilar
+from lector_excel import (FILAS_POR_BLOQUE, ColumnasFaltantesError, leer_columnas, leer_encabezados,
+                          leer_excel, leer_excel_por_bloques, motor_por_bloques, verificar_requeridas)
+from mapeo_columnas import CAMPOS_REQUERIDOS, MapeadorColumnas, mapeador_columnas
+from clasificacion_por_bloques import (AcumuladorCategorias, BloquesEnDisco, BloquesPendientes, EscritorExcelPorBloques,
+                                       resolver_filas_por_bloque)
+from esquema_torneo import compactar_participantes, conteos, memoria_mb
+from fechas_nacimiento import FORMATOS_FECHA, MotorFechas, edad_desde_valor, ordenar_formatos, textos_distintos
+from snapshot_torneo import cargar_snapshot, es_snapshot, guardar_snapshot, leer_columnas_snapshot, snapshot_vigente
 
 # --- UTILIDADES DE CATEGORÍAS ---
 def load_categories():
-    """Carga las categorías desde el archivo JSON."""
+    """Carga las categorías desde el archivo JSON (usa el índice compilado)."""
     try:
-        with open('categorias_taekwondo.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return obtener_indice_categorias('categorias_taekwondo.json').datos_json()
     except FileNotFoundError:
         print("❌ Error: No se encontró el archivo categorias_taekwondo.json")
         return None
 
 def generate_category_combinations(categories):
     """Genera todas las combinaciones posibles de categorías (formato clásico)."""
-    all_combinations = []
-    for division, data in categories.items():
-        niveles = data['NIVEL']
-        # Para CADETE, JUVENIL, MAYORES: pesos por sexo
-        if isinstance(data['SEXO'], dict):
-            for nivel in niveles:
-                for genero, pesos in data['SEXO'].items():
-                    for peso in pesos:
-                        categoria = f"{nivel} {division.replace('_', ' ')} {genero} {peso}"
-                        all_combinations.append(categoria)
-        else:
-            # Para divisiones con pesos mixtos
-            for nivel in niveles:
-                for genero in data['SEXO']:
-                    for peso in data['PESOS']:
-                        categoria = f"{nivel} {division.replace('_', ' ')} {genero} {peso}"
-                        all_combinations.append(categoria)
-    return sorted(all_combinations)
+    return generar_combinaciones(categories)
 
 def validate_categories(df_participantes):
     """
     Valida que todas las categorías generadas estén en las oficiales.
+    Acepta el DataFrame de participantes o el AcumuladorCategorias del modo en bloques.
     """
-    categories = load_categories()
-    if not categories:
+    try:
+        indice = obtener_indice_categorias('categorias_taekwondo.json')
+    except (OSError, ValueError):
         raise Exception("No se pudieron cargar las categorías oficiales.")
-    valid_categories = generate_category_combinations(categories)
-    participant_categories = df_participantes['categoria_completa'].unique()
+    if isinstance(df_participantes, AcumuladorCategorias):
+        participant_categories = df_participantes.categorias
+    else:
+        participant_categories = df_participantes['categoria_completa'].unique()
     # Filtrar None y categorías inválidas
-    invalid_categories = [cat for cat in participant_categories if cat is None or cat not in valid_categories]
+    invalid_categories = indice.categorias_invalidas(participant_categories)
     return len(invalid_categories) == 0, invalid_categories
 
 # --- CLASE BASE DE AGRUPAMIENTO ---
 class AgrupadorTaekwondo:
     """Clase principal para agrupar participantes de taekwondo según criterios oficiales."""
-    def __init__(self, archivo_categorias="categorias_taekwondo.json"):
-        self.categorias = self._cargar_categorias(archivo_categorias)
+    FORMATOS_FECHA = list(FORMATOS_FECHA)
+    # Las columnas se resuelven con la tabla de patrones de mapeo_columnas
+    COLUMNAS_REQUERIDAS = CAMPOS_REQUERIDOS
+
+    def __init__(self, archivo_categorias="categorias_taekwondo.json", mapeador=None, fecha_referencia=None):
+        self.archivo_categorias = archivo_categorias
+        self.mapeador = mapeador or mapeador_columnas
+        # Las edades se calculan a una fecha fija para toda la corrida (TOURNAMENT_DATE u hoy)
+        self.fechas = MotorFechas(fecha_referencia, self.FORMATOS_FECHA)
+        self.indice = self._cargar_categorias(archivo_categorias)
+        # JSON de solo lectura compartido por todos los agrupadores del proceso (sin copiarlo)
+        self.categorias = self.indice.datos
         self.mapeo_niveles = {
             "10": "Festival", "9": "Festival", "8": "Festival", "7": "Festival",
             "6": "Noveles", "5": "Noveles", "4": "Noveles", "3": "Noveles",
@@ -78,35 +91,13 @@ class AgrupadorTaekwondo:
         }
     def _cargar_categorias(self, archivo):
         try:
-            with open(archivo, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            # El índice se compila una vez por proceso y se comparte entre agrupadores
+            return obtener_indice_categorias(archivo)
         except Exception as e:
             raise Exception(f"Error al cargar categorías: {e}")
     def calcular_edad(self, fecha_nacimiento):
-        if pd.isna(fecha_nacimiento):
-            return None
-        try:
-            if isinstance(fecha_nacimiento, str):
-                formatos = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y']
-                for formato in formatos:
-                    try:
-                        fecha_nacimiento = datetime.strptime(fecha_nacimiento, formato)
-                        break
-                    except ValueError:
-                        continue
-                else:
-                    return None
-            if isinstance(fecha_nacimiento, datetime):
-                fecha_nacimiento = fecha_nacimiento.date()
-            elif hasattr(fecha_nacimiento, 'date'):
-                fecha_nacimiento = fecha_nacimiento.date()
-            hoy = date.today()
-            edad = hoy.year - fecha_nacimiento.year
-            if (hoy.month, hoy.day) < (fecha_nacimiento.month, fecha_nacimiento.day):
-                edad -= 1
-            return edad
-        except Exception:
-            return None
+        """Edad a la fecha de referencia del torneo (ver fechas_nacimiento) o None."""
+        return edad_desde_valor(fecha_nacimiento, self.FORMATOS_FECHA, self.fechas.fecha_referencia)
     def normalizar_kup_dan(self, kup_dan):
         if pd.isna(kup_dan):
             return "Festival"
@@ -179,18 +170,7 @@ class AgrupadorTaekwondo:
         if edad is None:
             return None
         
-        # Mapeo de rangos de edad según el formato del JSON
-        rangos_edad = {
-            'PRE_INFANTIL': (4, 6),
-            'INFANTIL_A': (7, 8),
-            'INFANTIL_B': (9, 10),
-            'INFANTIL_C': (11, 12),
-            'CADETE': (12, 14),
-            'JUVENIL': (15, 17),
-            'MAYORES': (18, 100)
-        }
-        
-        for categoria, (edad_min, edad_max) in rangos_edad.items():
+        for categoria, (edad_min, edad_max) in self.indice.rangos_edad.items():
             if edad_min <= edad <= edad_max:
                 return categoria
         return None
@@ -204,7 +184,7 @@ class AgrupadorTaekwondo:
             return None
         criterios = self.categorias[categoria_edad]
         # Pesos por sexo (CADETE, JUVENIL, MAYORES)
-        if isinstance(criterios.get('SEXO'), dict) and sexo.upper() in criterios['SEXO']:
+        if isinstance(criterios.get('SEXO'), Mapping) and sexo.upper() in criterios['SEXO']:
             rangos_peso = criterios['SEXO'][sexo.upper()]
         else:
             rangos_peso = criterios['PESOS']
@@ -219,55 +199,147 @@ class AgrupadorTaekwondo:
                     return peso_cat
         return None
 
+    # --- CLASIFICACIÓN VECTORIZADA ---
+    # Mismos resultados que los métodos por fila de arriba, pero sobre columnas
+    # completas. Los valores que el camino rápido no resuelve se delegan al
+    # método por fila, así los casos raros se comportan exactamente igual.
+    @staticmethod
+    def _mapear_valores_unicos(serie, funcion):
+        """Aplica una función escalar una vez por valor distinto de la columna."""
+        codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+        tabla = np.empty(len(unicos) + 1, dtype=object)
+        for i, valor in enumerate(unicos):
+            tabla[i] = funcion(valor)
+        tabla[-1] = funcion(None)
+        return tabla[codigos]
+
+    def calcular_edades(self, fechas):
+        """
+        Versión vectorizada de calcular_edad para una columna de fechas: cada fecha
+        distinta se convierte una vez, con los formatos ordenados según la columna.
+        """
+        serie = pd.Series(fechas)
+        n = len(serie)
+        edades = self.fechas.edades(serie)
+
+        # Mismo dtype que produce Series.apply con enteros y None
+        validas = ~np.isnan(edades)
+        if n == 0 or not validas.any():
+            return pd.Series([None] * n, index=serie.index, dtype=object)
+        if validas.all():
+            return pd.Series(edades.astype('int64'), index=serie.index)
+        return pd.Series(edades, index=serie.index)
+
+    def normalizar_sexos(self, sexos):
+        """Versión vectorizada de normalizar_sexo."""
+        serie = pd.Series(sexos)
+        return pd.Series(self._mapear_valores_unicos(serie, self.normalizar_sexo), index=serie.index)
+
+    def normalizar_niveles(self, niveles):
+        """Versión vectorizada de normalizar_kup_dan."""
+        serie = pd.Series(niveles)
+        return pd.Series(self._mapear_valores_unicos(serie, self.normalizar_kup_dan), index=serie.index)
+
+    def determinar_categorias_edad(self, edades):
+        """Versión vectorizada de determinar_categoria_edad."""
+        serie = pd.Series(edades)
+        valores = pd.to_numeric(serie, errors='coerce').to_numpy(dtype=float)
+        condiciones = [(valores >= edad_min) & (valores <= edad_max) for edad_min, edad_max in self.indice.rangos_edad.values()]
+        # np.select se queda con la primera condición verdadera, igual que el bucle
+        resultado = np.select(condiciones, list(self.indice.rangos_edad.keys()), default='')
+        return pd.Series(np.where(resultado == '', None, resultado).astype(object), index=serie.index)
+
+    @staticmethod
+    def _peso_a_float(peso):
+        if peso is None:
+            return np.nan
+        try:
+            return float(peso)
+        except (TypeError, ValueError):
+            return np.nan
+
+    def determinar_categorias_peso(self, pesos, categorias_edad, sexos):
+        """Versión vectorizada de determinar_categoria_peso usando np.searchsorted."""
+        pesos = pd.Series(pesos)
+        if pd.api.types.is_numeric_dtype(pesos.dtype) and not pd.api.types.is_bool_dtype(pesos.dtype):
+            valores = pesos.to_numpy(dtype=float)
+        else:
+            valores = self._mapear_valores_unicos(pesos, self._peso_a_float).astype(float)
+        divisiones = np.asarray(categorias_edad, dtype=object)
+        sexos = np.asarray(sexos, dtype=object)
+        resultado = np.full(len(valores), None, dtype=object)
+        grupos = pd.DataFrame({'division': divisiones, 'sexo': sexos}).groupby(['division', 'sexo'], sort=False).indices
+        for (division, sexo), posiciones in grupos.items():
+            rangos = self.indice.rangos_peso.get((division, str(sexo).upper()))
+            if not rangos:
+                for i in posiciones:
+                    resultado[i] = self.determinar_categoria_peso(pesos.iloc[i], division, sexo)
+                continue
+            etiquetas_menores, limites_menores, etiquetas_mayores, limites_mayores = rangos
+            valores_grupo = valores[posiciones]
+            idx = np.searchsorted(limites_menores, valores_grupo, side='left')
+            dentro = idx < len(limites_menores)
+            resultado[posiciones[dentro]] = etiquetas_menores[idx[dentro]]
+            fuera = posiciones[~dentro]
+            for etiqueta, limite in zip(etiquetas_mayores, limites_mayores):
+                coincide = valores[fuera] > limite
+                resultado[fuera[coincide]] = etiqueta
+                fuera = fuera[~coincide]
+        return pd.Series(resultado, index=pesos.index)
+
+    def clasificar_participantes(self, df, col_fecha, col_sexo, col_kup, col_peso):
+        """Agrega al DataFrame las columnas de clasificación (edad, sexo, nivel, división y peso)."""
+        df['edad'] = self.calcular_edades(df[col_fecha])
+        df['sexo_normalizado'] = self.normalizar_sexos(df[col_sexo])
+        df['nivel_normalizado'] = self.normalizar_niveles(df[col_kup])
+        df['categoria_edad'] = self.determinar_categorias_edad(df['edad'])
+        df['categoria_peso'] = self.determinar_categorias_peso(df[col_peso], df['categoria_edad'], df['sexo_normalizado'])
+        return df
+
     def procesar_participantes(self, archivo_excel):
+        # Encabezados primero: si faltan columnas no se parsea la hoja completa
+        encabezados = leer_encabezados(archivo_excel)
+        columnas = None
+        if encabezados is not None:
+            columnas = self.mapeador.resolver(encabezados)
+            try:
+                verificar_requeridas(archivo_excel, columnas, self.COLUMNAS_REQUERIDAS, encabezados)
+            except ColumnasFaltantesError as e:
+                self._informar_columnas_faltantes(archivo_excel, e.encontradas)
+                return None
         try:
-            df = pd.read_excel(archivo_excel)
+            # Se cargan todas las columnas: van completas a CATEGORIAS.xlsx
+            df = leer_excel(archivo_excel)
         except Exception as e:
             print(f"❌ Error leyendo {archivo_excel}: {e}")
             return None
-        
-        # Búsqueda más flexible de columnas
-        columnas_lower = [c.lower() for c in df.columns]
-        
-        # Buscar columna de fecha de nacimiento
-        col_fecha = None
-        for patron in ['nacim', 'fecha', 'birth', 'nacimiento']:
-            col_fecha = next((c for c in df.columns if patron in c.lower()), None)
-            if col_fecha:
-                break
-        
-        # Buscar columna de sexo
-        col_sexo = None
-        for patron in ['sexo', 'genero', 'género', 'gender', 'sex']:
-            col_sexo = next((c for c in df.columns if patron in c.lower()), None)
-            if col_sexo:
-                break
-        
-        # Buscar columna de nivel
-        col_kup = None
-        for patron in ['kup', 'dan', 'nivel', 'grado', 'cinturon', 'cinturón', 'belt']:
-            col_kup = next((c for c in df.columns if patron in c.lower()), None)
-            if col_kup:
-                break
-        
-        # Buscar columna de peso
-        col_peso = None
-        for patron in ['peso', 'weight', 'kg', 'kilos']:
-            col_peso = next((c for c in df.columns if patron in c.lower()), None)
-            if col_peso:
-                break
-        
-        # Buscar columna de abreviación (opcional)
-        col_abreviatura = None
-        for patron in ['abreviatura', 'abbreviation', 'abrev', 'academia']:
-            col_abreviatura = next((c for c in df.columns if patron in c.lower()), None)
-            if col_abreviatura:
-                break
+        return self.procesar_dataframe(df, archivo_excel, columnas)
+
+    def _informar_columnas_faltantes(self, origen, columnas):
+        print(f"❌ Faltan columnas requeridas en {origen}")
+        print(f"Columnas encontradas: {list(columnas)}")
+        print("Buscando: fecha (nacim/fecha/birth), sexo (sexo/genero/gender), nivel (kup/dan/nivel), peso (peso/weight/kg)")
+        print("💡 Para un formato propio: python mapeo_columnas.py fijar <planilla> peso=<columna> ...")
+
+    def procesar_dataframe(self, df, origen="DataFrame", columnas=None):
+        """
+        Detecta columnas y clasifica un DataFrame ya leído, agregando las columnas
+        calculadas sobre el mismo frame (mismo índice y filas que los datos crudos).
+        origen solo se usa en los mensajes. columnas: mapeo ya resuelto sobre los
+        encabezados originales (p. ej. si df trae solo algunas columnas).
+        Devuelve None si faltan columnas.
+        """
+        # Búsqueda flexible de columnas (ver mapeo_columnas.PATRONES_CAMPOS)
+        if columnas is None:
+            columnas = self.mapeador.resolver(df.columns)
+        col_fecha = columnas['fecha_nacimiento']
+        col_sexo = columnas['genero']
+        col_kup = columnas['kup']
+        col_peso = columnas['peso']
+        col_abreviatura = columnas['abreviatura']
         
         if not all([col_fecha, col_sexo, col_kup, col_peso]):
-            print(f"❌ Faltan columnas requeridas en {archivo_excel}")
-            print(f"Columnas encontradas: {list(df.columns)}")
-            print(f"Buscando: fecha (nacim/fecha/birth), sexo (sexo/genero/gender), nivel (kup/dan/nivel), peso (peso/weight/kg)")
+            self._informar_columnas_faltantes(origen, df.columns)
             return None
         
         print(f"✅ Columnas identificadas:")
@@ -280,15 +352,15 @@ class AgrupadorTaekwondo:
         else:
             print(f"  • Abreviación: No encontrada (opcional)")
         
-        df['edad'] = df[col_fecha].apply(self.calcular_edad)
-        df['sexo_normalizado'] = df[col_sexo].apply(self.normalizar_sexo)
-        df['nivel_normalizado'] = df[col_kup].apply(self.normalizar_kup_dan)
-        df['categoria_edad'] = df['edad'].apply(self.determinar_categoria_edad)
-        df['categoria_peso'] = df.apply(lambda row: self.determinar_categoria_peso(row[col_peso], row['categoria_edad'], row['sexo_normalizado']), axis=1)
+        return self.clasificar_con_columnas(df, columnas)
+
+    def clasificar_con_columnas(self, df, columnas):
+        """Clasifica df con columnas ya resueltas ({campo: columna}, ver mapeo_columnas)."""
+        self.clasificar_participantes(df, columnas['fecha_nacimiento'], columnas['genero'], columnas['kup'], columnas['peso'])
         
         # Agregar columna de abreviación si existe
-        if col_abreviatura:
-            df['abreviatura'] = df[col_abreviatura]
+        if columnas['abreviatura']:
+            df['abreviatura'] = df[columnas['abreviatura']]
         else:
             df['abreviatura'] = ''
         
@@ -297,55 +369,124 @@ class AgrupadorTaekwondo:
         if None in [categoria_edad, sexo, nivel, peso]:
             return None
         
+        nombre_division = self._nombre_division(categoria_edad)
+        return f"{nivel.title()} {nombre_division} {sexo} {peso}" 
+
+    def _nombre_division(self, categoria_edad):
         # Obtener nombre de la división de edad
         try:
-            nombre_division = self.categorias['divisiones_edad'][categoria_edad]['nombre']
+            return self.categorias['divisiones_edad'][categoria_edad]['nombre']
         except:
-            nombre_division = categoria_edad.replace('_', ' ')
-        
-        return f"{nivel.title()} {nombre_division} {sexo} {peso}" 
+            return categoria_edad.replace('_', ' ')
+
+    def generar_nombres_categoria(self, df):
+        """Versión vectorizada de generar_nombre_categoria sobre las columnas de clasificación."""
+        columnas = ['categoria_edad', 'sexo_normalizado', 'nivel_normalizado', 'categoria_peso']
+        completas = np.ones(len(df), dtype=bool)
+        for columna in columnas:
+            completas &= np.fromiter((v is not None for v in df[columna].to_numpy(dtype=object)), dtype=bool, count=len(df))
+        resultado = np.full(len(df), None, dtype=object)
+        if completas.any():
+            filas = df.loc[completas, columnas]
+            # Las divisiones y niveles distintos son pocos: se resuelven una vez cada uno
+            divisiones = {d: self._nombre_division(d) for d in filas['categoria_edad'].unique()}
+            niveles = {n: n.title() for n in filas['nivel_normalizado'].unique()}
+            resultado[completas] = (filas['nivel_normalizado'].map(niveles) + ' ' +
+                                    filas['categoria_edad'].map(divisiones) + ' ' +
+                                    filas['sexo_normalizado'].astype(str) + ' ' +
+                                    filas['categoria_peso'].astype(str)).to_numpy(dtype=object)
+        return pd.Series(resultado, index=df.index)
 
 class AgrupadorMultiple(AgrupadorTaekwondo):
     """Procesa múltiples archivos Excel y exporta categorías y solos."""
-    def __init__(self, archivo_categorias="categorias_taekwondo.json"):
-        super().__init__(archivo_categorias)
+    # Columnas que agregan la clasificación y completar_categorias, en orden
+    COLUMNAS_CALCULADAS = ('edad', 'sexo_normalizado', 'nivel_normalizado', 'categoria_edad',
+                           'categoria_peso', 'abreviatura', 'categoria_completa', 'archivo_origen')
+
+    def __init__(self, archivo_categorias="categorias_taekwondo.json", mapeador=None, fecha_referencia=None):
+        super().__init__(archivo_categorias, mapeador, fecha_referencia)
         self.archivos_procesados = []
         self.participantes_por_archivo = {}
 
-    def procesar_multiples_archivos(self, archivos_excel, combinar=True):
+    def _procesar_archivo(self, archivo):
+        """Lee y clasifica una planilla; None si no tiene participantes válidos."""
+        df = self.procesar_participantes(archivo)
+        if df is not None and len(df) > 0:
+            self.completar_categorias(df, archivo)
+            return df
+        return None
+
+    def _procesar_en_serie(self, archivos_excel):
+        """Genera (df o None, error o None) por archivo, procesando al pedir cada uno."""
+        for archivo in archivos_excel:
+            try:
+                yield self._procesar_archivo(archivo), None
+            except Exception as e:
+                yield None, e
+
+    def _procesar_en_paralelo(self, archivos_excel, workers):
+        """
+        Como _procesar_en_serie, pero las planillas se leen y clasifican en un pool de
+        procesos. Los resultados salen en el orden de archivos_excel y los mensajes de
+        cada archivo se muestran juntos, en ese mismo orden.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+        # La fecha de referencia viaja con la tarea: todas las edades salen a la misma fecha
+        tareas = [(archivo, self.archivo_categorias, self.mapeador.ruta, self.mapeador.patrones,
+                   self.fechas.fecha_referencia) for archivo in archivos_excel]
+        entregados = 0
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for df, error, salida, no_reconocidas in executor.map(_tarea_ingesta, tareas):
+                    print(salida, end='')
+                    self.fechas.no_reconocidas += no_reconocidas
+                    entregados += 1
+                    yield df, error
+        except BrokenProcessPool as e:
+            print(f"⚠️ El pool de lectura se interrumpió ({e}), se sigue en serie")
+            yield from self._procesar_en_serie(archivos_excel[entregados:])
+
+    def procesar_multiples_archivos(self, archivos_excel, combinar=True, workers=None):
+        """
+        Lee y clasifica varias planillas. workers: procesos para leerlas en paralelo
+        (None = INGEST_WORKERS, 1 = secuencial, 0 = todos los CPUs). El resultado y
+        archivos_procesados/participantes_por_archivo no dependen de workers.
+        """
         print(f"🔄 Procesando {len(archivos_excel)} archivos Excel...")
+        workers = min(resolver_workers_ingesta(workers), len(archivos_excel))
+        if workers > 1 and not self.mapeador.ruta and self.mapeador.estadisticas()['fijados']:
+            # Los mapeos fijados solo en memoria no llegan a los otros procesos
+            workers = 1
+        if workers > 1:
+            print(f"⚙️ Leyendo planillas con {workers} procesos...")
+            resultados = self._procesar_en_paralelo(archivos_excel, workers)
+        else:
+            resultados = self._procesar_en_serie(archivos_excel)
         todos_participantes = []
         participantes_por_archivo = {}
         archivos_exitosos = []
         archivos_fallidos = []
         for i, archivo in enumerate(archivos_excel, 1):
-            try:
-                print(f"\n📊 [{i}/{len(archivos_excel)}] Procesando: {Path(archivo).name}")
-                df = self.procesar_participantes(archivo)
-                if df is not None and len(df) > 0:
-                    df['categoria_completa'] = df.apply(
-                        lambda row: self.generar_nombre_categoria(
-                            row['categoria_edad'],
-                            row['sexo_normalizado'],
-                            row['nivel_normalizado'],
-                            row['categoria_peso']
-                        ), axis=1
-                    )
-                    df['archivo_origen'] = Path(archivo).stem
-                    participantes_por_archivo[Path(archivo).stem] = df
-                    todos_participantes.append(df)
-                    archivos_exitosos.append(archivo)
-                    print(f"✅ {len(df)} participantes válidos encontrados")
-                else:
-                    print(f"❌ No se encontraron participantes válidos")
-                    archivos_fallidos.append(archivo)
-            except Exception as e:
-                print(f"❌ Error procesando {Path(archivo).name}: {e}")
+            print(f"\n📊 [{i}/{len(archivos_excel)}] Procesando: {Path(archivo).name}")
+            df, error = next(resultados)
+            if error is not None:
+                print(f"❌ Error procesando {Path(archivo).name}: {error}")
+                archivos_fallidos.append(archivo)
+            elif df is not None:
+                participantes_por_archivo[Path(archivo).stem] = df
+                todos_participantes.append(df)
+                archivos_exitosos.append(archivo)
+                print(f"✅ {len(df)} participantes válidos encontrados")
+            else:
+                print("❌ No se encontraron participantes válidos")
                 archivos_fallidos.append(archivo)
+        resultados.close()
         self.archivos_procesados = archivos_exitosos
         self.participantes_por_archivo = participantes_por_archivo
         if combinar and todos_participantes:
-            df_combinado = pd.concat(todos_participantes, ignore_index=True)
+            # Columnas de clasificación categóricas y edad Int16 (ver esquema_torneo)
+            df_combinado = compactar_participantes(pd.concat(todos_participantes, ignore_index=True), self.indice)
             return df_combinado
         elif not combinar and participantes_por_archivo:
             return participantes_por_archivo
@@ -353,6 +494,100 @@ class AgrupadorMultiple(AgrupadorTaekwondo):
             print("❌ No se pudieron procesar participantes de ningún archivo")
             return None
 
+    def _columnas_por_bloques(self, archivo):
+        """Encabezados y columnas resueltas de una planilla, o None si no sirve."""
+        encabezados = leer_encabezados(archivo, motor_por_bloques(archivo))
+        if encabezados is None:
+            return None
+        columnas = self.mapeador.resolver(encabezados)
+        try:
+            verificar_requeridas(archivo, columnas, self.COLUMNAS_REQUERIDAS, encabezados)
+        except ColumnasFaltantesError as e:
+            self._informar_columnas_faltantes(archivo, e.encontradas)
+            return None
+        return encabezados, columnas
+
+    def procesar_archivos_por_bloques(self, archivos_excel, carpeta_salida, filas_por_bloque=None):
+        """
+        Modo streaming de procesar_multiples_archivos + exportar_categorias_unico_excel
+        para torneos grandes: lee cada planilla en bloques de filas_por_bloque filas,
+        los clasifica y escribe directo en carpeta_salida/CATEGORIAS.xlsx, sin armar
+        el DataFrame combinado. Devuelve un AcumuladorCategorias (conteos, categorías,
+        solos() y archivo_categorias) o None si ningún archivo tenía las columnas.
+        Los bloques de cada planilla se confirman recién al terminar de leerla: si
+        falla a mitad de lectura se descarta completa, como en el modo en memoria.
+        Cada planilla se lee una vez guardando los bloques crudos en disco; con las
+        fechas de texto de toda la columna se deduce el orden de formatos y recién
+        ahí se clasifican los bloques, todos con el mismo orden.
+        """
+        filas_por_bloque = filas_por_bloque or FILAS_POR_BLOQUE
+        print(f"🔄 Procesando {len(archivos_excel)} archivos Excel en bloques de {filas_por_bloque} filas...")
+        # Encabezados primero: con ellos se arman las columnas de CATEGORIAS.xlsx,
+        # en el mismo orden que daría pd.concat
+        planillas = []
+        columnas_salida = []
+        archivos_fallidos = []
+        for archivo in archivos_excel:
+            resultado = self._columnas_por_bloques(archivo)
+            if resultado is None:
+                archivos_fallidos.append(archivo)
+                continue
+            encabezados, columnas = resultado
+            planillas.append((archivo, columnas))
+            for columna in encabezados + [c for c in self.COLUMNAS_CALCULADAS if c not in encabezados]:
+                if columna not in columnas_salida:
+                    columnas_salida.append(columna)
+        if not planillas:
+            print("❌ No se pudieron procesar participantes de ningún archivo")
+            return None
+
+        acumulador = AcumuladorCategorias(columnas_salida)
+        escritor = EscritorExcelPorBloques(os.path.join(carpeta_salida, 'CATEGORIAS.xlsx'), columnas_salida)
+        # Si algo falla antes de cerrar el Excel, el libro a medio armar se descarta
+        try:
+            archivos_exitosos = []
+            for i, (archivo, columnas) in enumerate(planillas, 1):
+                print(f"\n📊 [{i}/{len(planillas)}] Procesando: {Path(archivo).name}")
+                with BloquesEnDisco() as crudos, BloquesPendientes(escritor) as pendientes:
+                    try:
+                        textos_fecha = {}
+                        for bloque in leer_excel_por_bloques(archivo, filas_por_bloque):
+                            crudos.agregar(bloque)
+                            textos_fecha.update(dict.fromkeys(textos_distintos(bloque[columnas['fecha_nacimiento']])))
+                        formatos = ordenar_formatos(list(textos_fecha), self.fechas.formatos) if textos_fecha else None
+                        with self.fechas.con_formatos(formatos):
+                            for bloque in crudos:
+                                self.clasificar_con_columnas(bloque, columnas)
+                                self.completar_categorias(bloque, archivo)
+                                pendientes.agregar(bloque)
+                    except Exception as e:
+                        print(f"❌ Error procesando {Path(archivo).name}: {e}")
+                        archivos_fallidos.append(archivo)
+                        continue
+                    filas_archivo = pendientes.acumulador.filas_leidas
+                    if filas_archivo > 0:
+                        pendientes.confirmar(acumulador)
+                        archivos_exitosos.append(archivo)
+                        print(f"✅ {filas_archivo} participantes válidos encontrados")
+                    else:
+                        print("❌ No se encontraron participantes válidos")
+                        archivos_fallidos.append(archivo)
+            self.archivos_procesados = archivos_exitosos
+            # En este modo no se guardan los DataFrames por archivo
+            self.participantes_por_archivo = {}
+            acumulador.archivo_categorias = escritor.cerrar()
+        except Exception:
+            escritor.descartar()
+            raise
+        print(f"✅ Excel de categorías exportado: {acumulador.archivo_categorias}")
+        return acumulador
+
+    def completar_categorias(self, df, archivo):
+        """Agrega categoria_completa y archivo_origen a un DataFrame ya clasificado."""
+        df['categoria_completa'] = self.generar_nombres_categoria(df)
+        df['archivo_origen'] = Path(archivo).stem
+        return df
+
     def identificar_solos(self, df):
         """Devuelve un DataFrame con los participantes que están solos en su categoría."""
         conteos = df['categoria_completa'].value_counts()
@@ -378,14 +613,60 @@ class AgrupadorMultiple(AgrupadorTaekwondo):
         print(f"✅ Excel de categorías exportado: {archivo}")
         return archivo
 
+# --- LECTURA DE PLANILLAS EN PARALELO ---
+def resolver_workers_ingesta(workers=None):
+    """
+    Número de procesos para leer y clasificar planillas.
+    None = variable INGEST_WORKERS (por defecto 1), 0 o negativo = todos los CPUs.
+    """
+    if workers is None:
+        try:
+            workers = int(os.environ.get('INGEST_WORKERS', 1))
+        except ValueError:
+            workers = 1
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+# Un agrupador por proceso del pool (el índice de categorías se compila una sola vez)
+_agrupadores_ingesta = {}
+
+def _tarea_ingesta(tarea):
+    """
+    Procesa una planilla en un proceso del pool:
+    (df o None, error o None, mensajes, fechas de nacimiento no reconocidas).
+    """
+    archivo, archivo_categorias, ruta_mapeos, patrones, fecha_referencia = tarea
+    salida = io.StringIO()
+    no_reconocidas = 0
+    with contextlib.redirect_stdout(salida):
+        try:
+            clave = (archivo_categorias, ruta_mapeos, json.dumps(patrones, sort_keys=True), fecha_referencia)
+            agrupador = _agrupadores_ingesta.get(clave)
+            if agrupador is None:
+                mapeador = MapeadorColumnas(ruta_mapeos, patrones, persistir=bool(ruta_mapeos))
+                agrupador = _agrupadores_ingesta[clave] = AgrupadorMultiple(archivo_categorias, mapeador,
+                                                                            fecha_referencia)
+            antes = agrupador.fechas.no_reconocidas
+            try:
+                df, error = agrupador._procesar_archivo(archivo), None
+            finally:
+                no_reconocidas = agrupador.fechas.no_reconocidas - antes
+        except Exception as e:
+            df, error = None, str(e)
+    return df, error, salida.getvalue(), no_reconocidas
+
 # --- GENERACIÓN DE BRACKETS, IMÁGENES Y PDF ---
 try:
     from reportlab.lib.pagesizes import letter, A4
     from reportlab.pdfgen import canvas
     from reportlab.lib.utils import ImageReader
-    from PIL import Image, ImageDraw, ImageFont
+    from PIL import Image, ImageDraw
     import cv2
-    import numpy as np
+    from bracket_vectorial import dibujar_llave, MAX_PARTICIPANTES
+    from fuentes import registro_fuentes
+    from cache_brackets import CacheBrackets, escribir_manifiesto, huella_archivo, huella_bracket
+    from cache_plantillas import cache_plantillas
 except ImportError:
     print("⚠️ Módulos adicionales requeridos para generar PDF y brackets:")
     print("pip install reportlab pillow opencv-python")
@@ -417,42 +698,37 @@ def detect_free_line_positions(image_path, line_length_thresh=20, hough_threshol
         print(f"Error en detección de líneas: {e}")
         return []
 
-def load_font(font_type='regular', font_category='names'):
-    """Load appropriate font based on type and category."""
-    try:
-        # Try to load system fonts first
-        if font_category == 'category':
-            if font_type == 'bold':
-                try:
-                    return ImageFont.truetype("arialbd.ttf", 72)
-                except:
-                    try:
-                        return ImageFont.truetype("Arial-Bold.ttf", 72)
-                    except:
-                        return ImageFont.truetype("fonts/Anton-Regular.ttf", 72)
-            else:
-                return ImageFont.truetype("arial.ttf", 48)
-        else:  # names
-            if font_type == 'bold':
-                try:
-                    return ImageFont.truetype("arialbd.ttf", 36)
-                except:
-                    try:
-                        return ImageFont.truetype("Arial-Bold.ttf", 36)
-                    except:
-                        return ImageFont.truetype("fonts/Anton-Regular.ttf", 36)
-            else:
-                try:
-                    return ImageFont.truetype("arial.ttf", 32)
-                except:
-                    try:
-                        return ImageFont.truetype("Arial.ttf", 32)
-                    except:
-                        return ImageFont.truetype("fonts/Roboto-VariableFont_wdth,wght.ttf", 32)
-    except Exception as e:
-        print(f"Error loading font: {e}")
-        # Fallback to default font
-        return ImageFont.load_default()
+# Tamaños (sobre la imagen x4) por categoría de texto y peso
+TAMANOS_FUENTE = {
+    'category': {'bold': 72, 'regular': 48},
+    'names': {'bold': 36, 'regular': 32},
+}
+
+def _tamano_fuente(tamano, scale_factor):
+    if scale_factor != 4:
+        tamano = max(1, round(tamano * scale_factor / 4))
+    return tamano
+
+def load_font(font_type='regular', font_category='names', scale_factor=4):
+    """
+    Load appropriate font based on type and category.
+    Sizes in TAMANOS_FUENTE are for the 4x image and follow scale_factor.
+    Files are resolved once per process by registro_fuentes (see fuentes.py);
+    later calls are a dictionary lookup.
+    """
+    tamano = TAMANOS_FUENTE.get(font_category, TAMANOS_FUENTE['names']).get(font_type, 32)
+    return registro_fuentes.fuente('arial', 'bold' if font_type == 'bold' else 'regular',
+                                   _tamano_fuente(tamano, scale_factor))
+
+def precargar_fuentes(perfil=None):
+    """
+    Resuelve y carga al arrancar todas las fuentes de TAMANOS_FUENTE para el
+    perfil de render (None = BRACKET_RENDER_PROFILE). Devuelve las elegidas.
+    """
+    escala = PERFILES_RENDER[resolver_perfil_render(perfil)]
+    return registro_fuentes.precargar(
+        ('arial', peso, _tamano_fuente(tamano, escala))
+        for tamanos in TAMANOS_FUENTE.values() for peso, tamano in tamanos.items())
 
 def detect_color_positions(image_path, area_thresh=20):
     """Detecta posiciones de círculos de colores en la imagen del bracket."""
@@ -528,19 +804,123 @@ def detect_color_positions(image_path, area_thresh=20):
         print(f"Error en detect_color_positions: {e}")
         return []
 
-def mark_positions(image_path, participants, output_path, category_name=None, font_path=None, font_size=None, margin=25, line_params=None, color_params=None):
+# --- CACHÉ DE GEOMETRÍA DE PLANTILLAS ---
+# La detección de líneas y círculos depende solo de la plantilla y de los
+# parámetros de detección, así que se calcula una vez y se reutiliza.
+ARCHIVO_CACHE_GEOMETRIA = "geometria_plantillas.json"
+VERSION_CACHE_GEOMETRIA = 1
+
+_cache_geometria = {}
+_sidecars_geometria_leidos = set()
+_lock_geometria = threading.Lock()
+
+def _clave_geometria(image_path, line_params=None, color_params=None):
+    """Clave de caché: nombre de plantilla + mtime + parámetros de detección."""
+    mtime_ns = os.stat(image_path).st_mtime_ns
+    parametros = json.dumps({'lineas': line_params or {}, 'colores': color_params or {}}, sort_keys=True)
+    return f"{Path(image_path).name}|{mtime_ns}|{parametros}"
+
+def _ruta_sidecar_geometria(image_path):
+    return os.path.join(os.path.dirname(os.path.abspath(image_path)), ARCHIVO_CACHE_GEOMETRIA)
+
+def _leer_sidecar_geometria(ruta_sidecar):
+    try:
+        with open(ruta_sidecar, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+        if datos.get('version') != VERSION_CACHE_GEOMETRIA:
+            return {}
+        return datos.get('plantillas', {})
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _escribir_sidecar_geometria(ruta_sidecar, entradas):
+    """Escribe el sidecar de forma atómica para no dejar JSON a medias."""
+    try:
+        directorio = os.path.dirname(ruta_sidecar)
+        fd, tmp_path = tempfile.mkstemp(prefix='.geometria_', suffix='.json', dir=directorio)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'version': VERSION_CACHE_GEOMETRIA, 'plantillas': entradas}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, ruta_sidecar)
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar la caché de geometría en {ruta_sidecar}: {e}")
+
+def _cargar_sidecar_en_memoria(ruta_sidecar):
+    if ruta_sidecar in _sidecars_geometria_leidos:
+        return
+    directorio = os.path.dirname(ruta_sidecar)
+    for clave, entrada in _leer_sidecar_geometria(ruta_sidecar).items():
+        _cache_geometria[(directorio, clave)] = (
+            [tuple(p) for p in entrada['lineas']],
+            [tuple(p) for p in entrada['circulos']],
+        )
+    _sidecars_geometria_leidos.add(ruta_sidecar)
+
+def obtener_geometria_plantilla(image_path, line_params=None, color_params=None, persistir=True):
+    """
+    Devuelve (lineas_libres, circulos) de una plantilla usando la caché.
+    Solo ejecuta la detección con OpenCV si la plantilla cambió o no estaba cacheada.
+    Siempre devuelve listas nuevas, el llamador puede modificarlas.
+    """
+    clave = _clave_geometria(image_path, line_params, color_params)
+    ruta_sidecar = _ruta_sidecar_geometria(image_path)
+    clave_memoria = (os.path.dirname(ruta_sidecar), clave)
+    with _lock_geometria:
+        _cargar_sidecar_en_memoria(ruta_sidecar)
+        geometria = _cache_geometria.get(clave_memoria)
+    if geometria is None:
+        lineas = [(int(x), int(y)) for x, y in detect_free_line_positions(image_path, **(line_params or {}))]
+        circulos = [(int(x), int(y)) for x, y in detect_color_positions(image_path, **(color_params or {}))]
+        geometria = (lineas, circulos)
+        with _lock_geometria:
+            _cache_geometria[clave_memoria] = geometria
+            if persistir:
+                # Se relee el sidecar para no pisar entradas de otros procesos
+                entradas = _leer_sidecar_geometria(ruta_sidecar)
+                entradas[clave] = {'lineas': lineas, 'circulos': circulos}
+                _escribir_sidecar_geometria(ruta_sidecar, entradas)
+    lineas, circulos = geometria
+    return list(lineas), list(circulos)
+
+def precalcular_geometria_plantillas(plantillas_path="bracket_templates", line_params=None, color_params=None):
+    """
+    Detecta la geometría de todas las plantillas y reescribe el sidecar.
+    Pensado para ejecutarse en el deploy, después de copiar las plantillas.
+    """
+    plantillas = sorted(glob.glob(os.path.join(plantillas_path, '*.png')))
+    if not plantillas:
+        print(f"⚠️ No se encontraron plantillas en {plantillas_path}")
+        return {}
+    ruta_sidecar = _ruta_sidecar_geometria(plantillas[0])
+    directorio = os.path.dirname(ruta_sidecar)
+    entradas = {}
+    for plantilla in plantillas:
+        lineas = [(int(x), int(y)) for x, y in detect_free_line_positions(plantilla, **(line_params or {}))]
+        circulos = [(int(x), int(y)) for x, y in detect_color_positions(plantilla, **(color_params or {}))]
+        clave = _clave_geometria(plantilla, line_params, color_params)
+        entradas[clave] = {'lineas': lineas, 'circulos': circulos}
+        print(f"  • {Path(plantilla).name}: {len(lineas)} líneas, {len(circulos)} círculos")
+    with _lock_geometria:
+        # Solo se conservan las entradas de las plantillas actuales
+        _escribir_sidecar_geometria(ruta_sidecar, entradas)
+        for clave_memoria in [k for k in _cache_geometria if k[0] == directorio]:
+            del _cache_geometria[clave_memoria]
+        _sidecars_geometria_leidos.discard(ruta_sidecar)
+    print(f"✅ Geometría de {len(entradas)} plantillas guardada en {ruta_sidecar}")
+    return entradas
+
+def mark_positions(image_path, participants, output_path=None, category_name=None, font_path=None, font_size=None, margin=25, line_params=None, color_params=None, scale_factor=4):
     """
     Mark participant positions on a bracket template.
+    Text is drawn on the template upscaled scale_factor times and downsampled back
+    (4 = print quality, 1 = drawn at native size; see PERFILES_RENDER).
+    Returns the rendered PIL image; it is only written to disk if output_path is given.
     """
-    # Open image and convert to RGB
-    pil_img = Image.open(image_path).convert('RGB')
-    scale_factor = 4  # Quadruple the resolution for better quality
-    high_res_img = pil_img.resize((pil_img.width * scale_factor, pil_img.height * scale_factor), Image.Resampling.LANCZOS)
+    # RGB template already upscaled, copied from the per-process cache (see cache_plantillas)
+    high_res_img, original_size = cache_plantillas.base(image_path, scale_factor)
     draw = ImageDraw.Draw(high_res_img)
     
-    # Get positions for participants
-    free_lines = detect_free_line_positions(image_path, **(line_params or {}))
-    circles = detect_color_positions(image_path, **(color_params or {}))
+    # Get positions for participants (cached per template, see obtener_geometria_plantilla)
+    free_lines, circles = obtener_geometria_plantilla(image_path, line_params, color_params)
     
     # Handle case where we have more participants than detected positions
     count = min(len(participants), max(len(circles), len(free_lines)))
@@ -578,8 +958,8 @@ def mark_positions(image_path, participants, output_path, category_name=None, fo
             assignments.append((name, (cx, cy), virtual_line))
     
     # Load fonts for category and names
-    category_font = load_font('bold', 'category')
-    names_font = load_font('regular', 'names')
+    category_font = load_font('bold', 'category', scale_factor)
+    names_font = load_font('regular', 'names', scale_factor)
     
     print("Loaded fonts:")
     print(f"Category font: {category_font}")
@@ -616,7 +996,8 @@ def mark_positions(image_path, participants, output_path, category_name=None, fo
         line_length = lx - cx
         
         # If line is too short or detection failed, use fixed positioning
-        if line_length < 50:
+        # (threshold given on the 4x image)
+        if line_length < 50 * scale_factor / 4:
             # Use fixed position relative to circle
             tx = cx + 60 * scale_factor  # Fixed offset from circle
             ty = cy - (th // 2)  # Center vertically on circle
@@ -639,56 +1020,254 @@ def mark_positions(image_path, participants, output_path, category_name=None, fo
         draw.text((tx, ty), name, font=names_font, fill=(0,0,0))
     
     # Resize back to original size with high-quality downsampling
-    final_img = high_res_img.resize(pil_img.size, Image.Resampling.LANCZOS)
+    if scale_factor != 1:
+        final_img = high_res_img.resize(original_size, Image.Resampling.LANCZOS)
+    else:
+        final_img = high_res_img
     
     # Convert to RGB before saving
     final_img = final_img.convert('RGB')
     
-    # Save with maximum quality
-    final_img.save(output_path, format='PNG', optimize=False)
+    # Save with maximum quality (only when PNG export is requested)
+    if output_path:
+        final_img.save(output_path, format='PNG', optimize=False)
+    return final_img
 
-def generar_bracket_categoria(categoria, participantes, carpeta_salida, plantillas_path="bracket_templates"):
-    """Genera un bracket para una categoría específica."""
+# Bracket renderizado en memoria: ruta_png es None si no se exportó el PNG.
+# Los brackets vectoriales no tienen imagen: llevan los participantes y se
+# dibujan directamente en el PDF (ver bracket_vectorial.py).
+# huella y desde_cache solo se completan con el caché incremental (cache_brackets.py).
+BracketRenderizado = namedtuple('BracketRenderizado',
+                                ['categoria', 'imagen', 'ruta_png', 'participantes', 'huella', 'desde_cache'],
+                                defaults=(None, None, False))
+
+RENDERIZADORES = ('plantilla', 'vectorial')
+
+# Perfiles de calidad del render con plantillas: cuántas veces se amplía la
+# plantilla para dibujar el texto antes de volver a su tamaño. Memoria y tiempo
+# por bracket en el README (sección "Perfiles de render").
+PERFILES_RENDER = {'borrador': 1, 'pantalla': 2, 'impresion': 4}
+
+def resolver_renderizador(renderizador=None):
+    """
+    'plantilla' = PNG de bracket_templates (llave vectorial si no hay plantilla para N),
+    'vectorial' = siempre la llave vectorial. None = variable BRACKET_RENDERER.
+    """
+    if renderizador is None:
+        renderizador = os.environ.get('BRACKET_RENDERER', 'plantilla')
+    if renderizador not in RENDERIZADORES:
+        print(f"⚠️ Renderizador desconocido '{renderizador}', usando 'plantilla'")
+        return 'plantilla'
+    return renderizador
+
+def resolver_perfil_render(perfil=None):
+    """
+    'borrador' (tamaño de la plantilla), 'pantalla' (2x) o 'impresion' (4x, la
+    calidad de siempre). None = variable BRACKET_RENDER_PROFILE.
+    """
+    if perfil is None:
+        perfil = os.environ.get('BRACKET_RENDER_PROFILE', 'impresion')
+    perfil = (perfil or 'impresion').strip().lower()
+    if perfil not in PERFILES_RENDER:
+        print(f"⚠️ Perfil de render desconocido '{perfil}', usando 'impresion'")
+        return 'impresion'
+    return perfil
+
+def huella_render_bracket(categoria, participantes, plantillas_path="bracket_templates", renderizador='plantilla', perfil='impresion'):
+    """
+    Huella del dibujo de un bracket: categoría, participantes, contenido de la
+    plantilla (o llave vectorial), fuentes, tamaños y perfil de render. Si no
+    cambia, la imagen del caché es la misma que se dibujaría.
+    """
+    template_file = f"{plantillas_path}/{len(participantes)}.png"
+    plantilla = 'vectorial'
+    if renderizador != 'vectorial' and os.path.exists(template_file):
+        plantilla = huella_archivo(template_file)
+    fuentes = [registro_fuentes.resolver('arial', peso) for peso in ('bold', 'regular')]
+    return huella_bracket(categoria, list(participantes), renderizador, plantilla, fuentes, TAMANOS_FUENTE, perfil)
+
+def renderizar_bracket_categoria(categoria, participantes, carpeta_salida=None, plantillas_path="bracket_templates", exportar_png=True, renderizador='plantilla', cache=None, huella=None, perfil='impresion'):
+    """
+    Renderiza el bracket de una categoría en memoria, con la calidad del perfil
+    (ver PERFILES_RENDER).
+    Solo escribe el PNG si exportar_png y hay carpeta_salida (los vectoriales no tienen PNG).
+    Con cache (CacheBrackets) y huella, reutiliza la imagen guardada para esa huella
+    o guarda la que se dibuje.
+    Devuelve un BracketRenderizado o None si no se pudo generar.
+    """
     try:
         num_participantes = len(participantes)
         if num_participantes < 2:
             print(f"⚠️ Categoría {categoria} tiene menos de 2 participantes, saltando bracket")
             return None
         template_file = f"{plantillas_path}/{num_participantes}.png"
-        if not os.path.exists(template_file):
-            print(f"⚠️ No se encontró plantilla para {num_participantes} participantes")
-            return None
-        output_file = os.path.join(carpeta_salida, f"bracket_{categoria.replace(' ', '_')}.png")
-        mark_positions(template_file, participantes, output_file, categoria)
-        print(f"✅ Bracket generado: {output_file}")
-        return output_file
+        if renderizador == 'vectorial' or not os.path.exists(template_file):
+            if num_participantes > MAX_PARTICIPANTES:
+                print(f"⚠️ Categoría {categoria} supera {MAX_PARTICIPANTES} participantes, saltando bracket")
+                return None
+            if renderizador != 'vectorial':
+                print(f"⚠️ No se encontró plantilla para {num_participantes} participantes, se usa la llave vectorial")
+            print(f"✅ Bracket vectorial: {categoria}")
+            return BracketRenderizado(categoria, None, None, list(participantes), huella)
+        output_file = None
+        if exportar_png and carpeta_salida:
+            output_file = os.path.join(carpeta_salida, f"bracket_{categoria.replace(' ', '_')}.png")
+        usar_cache = cache is not None and huella is not None
+        if usar_cache:
+            imagen = cache.cargar(huella, output_file)
+            if imagen is not None:
+                print(f"♻️ Bracket sin cambios (caché): {categoria}")
+                return BracketRenderizado(categoria, imagen, output_file, None, huella, True)
+        imagen = mark_positions(template_file, participantes, output_file, categoria,
+                                scale_factor=PERFILES_RENDER[perfil])
+        if usar_cache:
+            cache.guardar(huella, imagen, output_file)
+        if output_file:
+            print(f"✅ Bracket generado: {output_file}")
+        else:
+            print(f"✅ Bracket generado en memoria: {categoria}")
+        return BracketRenderizado(categoria, imagen, output_file, None, huella)
     except Exception as e:
         print(f"Error en generar_bracket_categoria: {e}")
         return None
 
-def crear_pdf_brackets(imagenes_brackets, carpeta_salida):
-    """Crea un PDF con todas las imágenes de brackets."""
-    if not imagenes_brackets:
-        print("⚠️ No hay imágenes de brackets para incluir en el PDF")
+def contadores_cache_plantillas(antes):
+    """
+    Aciertos y fallos del caché de plantillas ampliadas desde `antes`
+    (cache_plantillas.estadisticas()), para los contadores de la etapa de brackets.
+    Con un pool de render cada proceso tiene su caché y aquí solo cuenta el principal.
+    """
+    despues = cache_plantillas.estadisticas()
+    return {'plantillas_aciertos': despues['aciertos'] - antes['aciertos'],
+            'plantillas_fallos': despues['fallos'] - antes['fallos']}
+
+def generar_bracket_categoria(categoria, participantes, carpeta_salida, plantillas_path="bracket_templates"):
+    """Genera un bracket para una categoría específica y devuelve la ruta del PNG."""
+    bracket = renderizar_bracket_categoria(categoria, participantes, carpeta_salida, plantillas_path, exportar_png=True)
+    return bracket.ruta_png if bracket else None
+
+# --- RENDERIZADO EN PARALELO ---
+def resolver_workers_render(workers=None):
+    """
+    Número de procesos para renderizar brackets.
+    None = variable BRACKET_RENDER_WORKERS (por defecto 1), 0 o negativo = todos los CPUs.
+    """
+    if workers is None:
+        try:
+            workers = int(os.environ.get('BRACKET_RENDER_WORKERS', 1))
+        except ValueError:
+            workers = 1
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+def _inicializar_worker_render(plantillas_path, perfil='impresion'):
+    """Precarga fuentes y geometría de plantillas una vez por proceso del pool."""
+    precargar_fuentes(perfil)
+    for plantilla in glob.glob(os.path.join(plantillas_path, '*.png')):
+        try:
+            obtener_geometria_plantilla(plantilla)
+        except OSError:
+            pass
+
+def _tarea_bracket_categoria(tarea):
+    categoria, participantes, carpeta_salida, plantillas_path, exportar_png, renderizador, cache, huella, perfil = tarea
+    return renderizar_bracket_categoria(categoria, participantes, carpeta_salida, plantillas_path, exportar_png,
+                                        renderizador, cache, huella, perfil)
+
+def _mapa_ordenado_acotado(executor, funcion, tareas, ventana):
+    """
+    Como executor.map pero con a lo sumo `ventana` tareas en vuelo, para que los
+    resultados (imágenes) no se acumulen en memoria si el consumidor es más lento.
+    """
+    tareas = iter(tareas)
+    en_vuelo = deque(executor.submit(funcion, tarea) for tarea in itertools.islice(tareas, ventana))
+    while en_vuelo:
+        futuro = en_vuelo.popleft()
+        for tarea in itertools.islice(tareas, 1):
+            en_vuelo.append(executor.submit(funcion, tarea))
+        yield futuro.result()
+
+def renderizar_brackets(categorias_participantes, carpeta_salida=None, plantillas_path="bracket_templates", workers=None, exportar_png=True, renderizador=None, cache=None, perfil=None):
+    """
+    Generador de BracketRenderizado en el mismo orden que categorias_participantes
+    (las categorías que no se pudieron generar se omiten).
+    Con workers > 1 renderiza en un pool de procesos con una ventana acotada.
+    Con cache (CacheBrackets) solo se dibujan los brackets cuya huella no está guardada.
+    perfil: calidad del render con plantillas (None = BRACKET_RENDER_PROFILE, ver resolver_perfil_render).
+    """
+    workers = resolver_workers_render(workers)
+    renderizador = resolver_renderizador(renderizador)
+    perfil = resolver_perfil_render(perfil)
+    # Las categorías se consumen a medida que se renderizan (pueden venir de un generador)
+    tareas = ((categoria, participantes, carpeta_salida, plantillas_path, exportar_png, renderizador, cache,
+               huella_render_bracket(categoria, participantes, plantillas_path, renderizador, perfil) if cache else None,
+               perfil)
+              for categoria, participantes in categorias_participantes)
+    if renderizador == 'vectorial':
+        # No hay nada que rasterizar: el dibujo ocurre al armar el PDF
+        workers = 1
+    if workers > 1:
+        primeras = list(itertools.islice(tareas, workers))
+        workers = len(primeras)
+        tareas = itertools.chain(primeras, tareas)
+    if workers <= 1:
+        for tarea in tareas:
+            bracket = _tarea_bracket_categoria(tarea)
+            if bracket:
+                yield bracket
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    print(f"⚙️ Renderizando brackets con {workers} procesos...")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker_render,
+                             initargs=(plantillas_path, perfil)) as executor:
+        # El orden de entrada es el orden de páginas del PDF
+        for bracket in _mapa_ordenado_acotado(executor, _tarea_bracket_categoria, tareas, workers * 2):
+            if bracket:
+                yield bracket
+
+def generar_brackets_categorias(categorias_participantes, carpeta_salida, plantillas_path="bracket_templates", workers=None):
+    """
+    Genera los PNG de los brackets de varias categorías, en un pool de procesos si workers > 1.
+    Devuelve las rutas de las imágenes en el mismo orden que categorias_participantes.
+    """
+    return [bracket.ruta_png for bracket in
+            renderizar_brackets(categorias_participantes, carpeta_salida, plantillas_path, workers, exportar_png=True)
+            if bracket.ruta_png]
+
+def _fuente_imagen_pdf(bracket):
+    """Devuelve (origen para drawImage, ancho, alto) de una ruta, un PIL.Image o un BracketRenderizado."""
+    if isinstance(bracket, BracketRenderizado):
+        bracket = bracket.imagen
+    if isinstance(bracket, Image.Image):
+        return ImageReader(bracket), bracket.width, bracket.height
+    if not os.path.exists(bracket):
         return None
+    with Image.open(bracket) as img:
+        return bracket, img.width, img.height
+
+def crear_pdf_brackets(imagenes_brackets, carpeta_salida):
+    """
+    Crea un PDF con todas las imágenes de brackets, 2 por página.
+    imagenes_brackets puede ser una lista o un generador de rutas PNG, imágenes PIL
+    o BracketRenderizado; se consume en una sola pasada y solo se retienen las
+    imágenes de la página en curso.
+    """
     try:
         pdf_path = os.path.join(carpeta_salida, "BRACKETS.pdf")
-        c = canvas.Canvas(pdf_path, pagesize=A4)
+        c = None
         page_width, page_height = A4
-        
+
         # Configuración para exactamente 2 brackets por página
         margin = 30
         vertical_gap = 5  # Minimal gap between brackets
         available_width = page_width - 2 * margin
         available_height = page_height - 2 * margin
         images_per_page = 2
-        
-        for page_start in range(0, len(imagenes_brackets), images_per_page):
-            page_images = imagenes_brackets[page_start:page_start + images_per_page]
-            num_images_on_page = len(page_images)
-            
+
+        def dibujar_pagina(page_images):
             # Calcular posiciones para esta página
-            if num_images_on_page == 1:
+            if len(page_images) == 1:
                 # Una imagen en la última página - usar toda la página
                 positions = [(margin, margin, available_width, available_height)]
             else:  # 2 imágenes
@@ -698,109 +1277,233 @@ def crear_pdf_brackets(imagenes_brackets, carpeta_salida):
                     (margin, margin + img_height + vertical_gap, available_width, img_height),
                     (margin, margin, available_width, img_height)
                 ]
-            
+
             # Colocar imágenes en la página
-            for i, imagen_path in enumerate(page_images):
-                if i >= len(positions):
-                    break
-                    
-                if os.path.exists(imagen_path):
-                    x, y, max_width, max_height = positions[i]
-                    
-                    img = Image.open(imagen_path)
-                    img_width, img_height = img.size
-                    aspect_ratio = img_width / img_height
-                    
-                    # Ajustar imagen al espacio disponible
-                    if aspect_ratio > max_width / max_height:
-                        # Imagen más ancha - ajustar al ancho
-                        new_width = max_width
-                        new_height = new_width / aspect_ratio
-                    else:
-                        # Imagen más alta - ajustar a la altura
-                        new_height = max_height
-                        new_width = new_height * aspect_ratio
-                    
-                    # Centrar imagen en el espacio asignado
-                    final_x = x + (max_width - new_width) / 2
-                    final_y = y + (max_height - new_height) / 2
-                    
-                    c.drawImage(imagen_path, final_x, final_y, width=new_width, height=new_height)
-            
-            # Nueva página si hay más imágenes (excepto para la última página)
-            if page_start + images_per_page < len(imagenes_brackets):
+            for imagen, (x, y, max_width, max_height) in zip(page_images, positions):
+                if isinstance(imagen, BracketRenderizado) and imagen.imagen is None:
+                    # Llave vectorial: se dibuja directo en el espacio asignado
+                    dibujar_llave(c, imagen.participantes, x, y, max_width, max_height, titulo=imagen.categoria)
+                    continue
+                fuente = _fuente_imagen_pdf(imagen)
+                if fuente is None:
+                    continue
+                origen, img_width, img_height = fuente
+                aspect_ratio = img_width / img_height
+
+                # Ajustar imagen al espacio disponible
+                if aspect_ratio > max_width / max_height:
+                    # Imagen más ancha - ajustar al ancho
+                    new_width = max_width
+                    new_height = new_width / aspect_ratio
+                else:
+                    # Imagen más alta - ajustar a la altura
+                    new_height = max_height
+                    new_width = new_height * aspect_ratio
+
+                # Centrar imagen en el espacio asignado
+                final_x = x + (max_width - new_width) / 2
+                final_y = y + (max_height - new_height) / 2
+
+                c.drawImage(origen, final_x, final_y, width=new_width, height=new_height)
+
+        total_brackets = 0
+        total_pages = 0
+        pendientes = []
+        for imagen in imagenes_brackets:
+            total_brackets += 1
+            pendientes.append(imagen)
+            if len(pendientes) < images_per_page:
+                continue
+            # Nueva página solo cuando ya hay otra dibujada
+            if c is None:
+                c = canvas.Canvas(pdf_path, pagesize=A4)
+            else:
                 c.showPage()
-        
+            dibujar_pagina(pendientes)
+            total_pages += 1
+            pendientes = []
+
+        if pendientes:
+            if c is None:
+                c = canvas.Canvas(pdf_path, pagesize=A4)
+            else:
+                c.showPage()
+            dibujar_pagina(pendientes)
+            total_pages += 1
+
+        if c is None:
+            print("⚠️ No hay imágenes de brackets para incluir en el PDF")
+            return None
+
         c.save()
-        total_pages = (len(imagenes_brackets) + images_per_page - 1) // images_per_page
         print(f"✅ PDF de brackets creado: {pdf_path}")
-        print(f"📄 Total de páginas: {total_pages} ({len(imagenes_brackets)} brackets, 2 por página)")
+        print(f"📄 Total de páginas: {total_pages} ({total_brackets} brackets, 2 por página)")
         return pdf_path
     except Exception as e:
         print(f"Error creando PDF: {e}")
         return None
 
-def generar_brackets_desde_excel(archivo_excel, carpeta_salida):
-    """Genera brackets desde un archivo Excel de categorías."""
+def columnas_para_brackets(encabezados):
+    """Columnas de CATEGORIAS.xlsx que usa armar_participantes_por_categoria."""
+    if encabezados is None:
+        return None
+    return [col for col in encabezados if col == 'categoria_completa' or (
+        isinstance(col, str) and any(clave in col.lower() for clave in ('nombre', 'apellido', 'abreviatura')))]
+
+def roles_columnas_participantes(columnas):
+    """
+    (nombre, apellido, abreviatura) entre las columnas de CATEGORIAS.xlsx.
+    Si varias coinciden gana la última, como en la búsqueda original por fila.
+    """
+    nombre_col = apellido_col = abreviatura_col = None
+    for col in columnas:
+        if not isinstance(col, str):
+            continue
+        col_lower = col.lower()
+        if 'nombre' in col_lower and 'apellido' not in col_lower:
+            nombre_col = col
+        elif 'apellido' in col_lower:
+            apellido_col = col
+        elif 'abreviatura' in col_lower:
+            abreviatura_col = col
+    return nombre_col, apellido_col, abreviatura_col
+
+def _como_texto(serie):
+    """str() de cada valor (NaN -> 'nan'), igual que al formatear fila por fila."""
+    if pd.api.types.is_datetime64_any_dtype(serie.dtype) or isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.map(str)
+    return serie.astype(str)
+
+def nombres_para_brackets(df):
+    """
+    Nombre de cada fila tal como va en el bracket: "NOMBRE APELLIDO (ACAD)".
+    Sin columna de nombre se usa "Participante <índice>". La academia se agrega
+    salvo que falte: None, NaN o texto vacío se tratan igual, así el DataFrame en
+    memoria ('') y CATEGORIAS.xlsx releído (NaN) dan el mismo nombre.
+    """
+    nombre_col, apellido_col, abreviatura_col = roles_columnas_participantes(df.columns)
+    if nombre_col and apellido_col:
+        nombres = _como_texto(df[nombre_col]) + ' ' + _como_texto(df[apellido_col])
+    elif nombre_col:
+        nombres = _como_texto(df[nombre_col])
+    else:
+        nombres = pd.Series([f"Participante {etiqueta}" for etiqueta in df.index], index=df.index, dtype=object)
+    if abreviatura_col:
+        valores = df[abreviatura_col]
+        abreviaturas = _como_texto(valores).str.strip()
+        con_abreviatura = valores.notna().to_numpy() & (abreviaturas != '').to_numpy()
+        nombres = nombres.where(~con_abreviatura, nombres + ' (' + abreviaturas + ')')
+    return nombres.to_numpy(dtype=object)
+
+def iterar_participantes_por_categoria(df, minimo=2):
+    """
+    Genera (categoria, [nombres para el bracket]) de las categorías con `minimo` o
+    más participantes, en el orden en que aparecen en el DataFrame de categorías.
+    Una sola pasada: los nombres se arman vectorizados y se agrupan con groupby.
+    """
+    nombres = nombres_para_brackets(df)
+    grupos = df.groupby('categoria_completa', sort=False, observed=True).indices
+    for categoria, posiciones in grupos.items():
+        if len(posiciones) >= minimo:
+            yield categoria, nombres[np.sort(posiciones)].tolist()
+
+def armar_participantes_por_categoria(df):
+    """
+    Devuelve [(categoria, [nombres para el bracket])] de las categorías con 2 o más
+    participantes, en el orden en que aparecen en el DataFrame de categorías.
+    """
+    return list(iterar_participantes_por_categoria(df))
+
+def generar_brackets_desde_df(df, carpeta_salida, workers=None, exportar_png=True, renderizador=None, cache=None, perfil=None):
+    """
+    Genera brackets desde el DataFrame de categorías (el mismo que se exporta a
+    CATEGORIAS.xlsx), sin escribir ni volver a leer el Excel.
+    workers: procesos para renderizar (None = BRACKET_RENDER_WORKERS, 1 = secuencial).
+    exportar_png: además del PDF, guarda un PNG por bracket en carpeta_salida.
+    renderizador: 'plantilla' o 'vectorial' (None = BRACKET_RENDERER, ver resolver_renderizador).
+    perfil: 'borrador', 'pantalla' o 'impresion' (None = BRACKET_RENDER_PROFILE, ver resolver_perfil_render).
+    cache: CacheBrackets para la regeneración incremental (solo se dibujan los
+    brackets que cambiaron); deja manifiesto_brackets.json en carpeta_salida.
+    Los brackets pasan de memoria al PDF en una sola pasada; los PNG no se vuelven a leer.
+    """
     try:
-        df = pd.read_excel(archivo_excel)
         if 'categoria_completa' not in df.columns:
-            print("❌ El archivo Excel no contiene la columna 'categoria_completa'")
+            print("❌ El DataFrame de categorías no contiene la columna 'categoria_completa'")
             return None
+        # Solo hacen falta la categoría y las columnas de nombre, apellido y abreviatura,
+        # numeradas desde 0 como al leer CATEGORIAS.xlsx
+        df = df[columnas_para_brackets(list(df.columns))].reset_index(drop=True)
         if not os.path.exists(carpeta_salida):
             os.makedirs(carpeta_salida)
-        categorias = df['categoria_completa'].unique()
+        categorias_participantes = iterar_participantes_por_categoria(df)
+
+        categorias_generadas = []
         imagenes_generadas = []
-        for categoria in categorias:
-            participantes_cat = df[df['categoria_completa'] == categoria]
-            if len(participantes_cat) >= 2:
-                # Crear lista de participantes con nombres completos y abreviación de academia
-                participantes = []
-                for _, row in participantes_cat.iterrows():
-                    # Buscar columnas de nombre y apellido
-                    nombre_col = None
-                    apellido_col = None
-                    abreviatura_col = None
-                    for col in df.columns:
-                        if 'nombre' in col.lower() and 'apellido' not in col.lower():
-                            nombre_col = col
-                        elif 'apellido' in col.lower():
-                            apellido_col = col
-                        elif 'abreviatura' in col.lower():
-                            abreviatura_col = col
-                    
-                    if nombre_col and apellido_col:
-                        nombre_completo = f"{row[nombre_col]} {row[apellido_col]}"
-                    elif nombre_col:
-                        nombre_completo = str(row[nombre_col])
-                    else:
-                        # Si no encuentra columnas de nombre, usar el índice
-                        nombre_completo = f"Participante {row.name}"
-                    
-                    # Agregar abreviación de academia si existe
-                    if abreviatura_col:
-                        try:
-                            abreviatura_valor = row[abreviatura_col]
-                            if abreviatura_valor is not None and str(abreviatura_valor).strip():
-                                abrev_str = str(abreviatura_valor).strip()
-                                nombre_completo = f"{nombre_completo} ({abrev_str})"
-                        except:
-                            pass
-                    
-                    participantes.append(nombre_completo)
-                
-                imagen = generar_bracket_categoria(categoria, participantes, carpeta_salida)
-                if imagen:
-                    imagenes_generadas.append(imagen)
-        if imagenes_generadas:
-            pdf_path = crear_pdf_brackets(imagenes_generadas, carpeta_salida)
-            return {'imagenes': imagenes_generadas, 'pdf': pdf_path}
+        entradas_manifiesto = []
+
+        def registrar(brackets):
+            for bracket in brackets:
+                categorias_generadas.append(bracket.categoria)
+                if bracket.ruta_png:
+                    imagenes_generadas.append(bracket.ruta_png)
+                if cache is not None:
+                    origen = 'vectorial' if bracket.imagen is None else ('cache' if bracket.desde_cache else 'render')
+                    entradas_manifiesto.append({
+                        'categoria': bracket.categoria,
+                        'huella': bracket.huella,
+                        'origen': origen,
+                        'png': os.path.basename(bracket.ruta_png) if bracket.ruta_png else None,
+                    })
+                yield bracket
+
+        brackets = renderizar_brackets(categorias_participantes, carpeta_salida, workers=workers,
+                                       exportar_png=exportar_png, renderizador=renderizador, cache=cache,
+                                       perfil=perfil)
+        pdf_path = crear_pdf_brackets(registrar(brackets), carpeta_salida)
+        if categorias_generadas:
+            resultado = {'imagenes': imagenes_generadas, 'categorias': categorias_generadas, 'pdf': pdf_path}
+            if cache is not None:
+                resultado.update(escribir_manifiesto(carpeta_salida, entradas_manifiesto, cache))
+                print(f"♻️ Brackets reutilizados del caché: {resultado['reutilizados']}, "
+                      f"dibujados: {resultado['renderizados']}")
+            return resultado
         else:
             print("⚠️ No se generaron imágenes de brackets")
             return None
+    except Exception as e:
+        print(f"Error generando brackets: {e}")
+        return None
+
+def generar_brackets_desde_excel(archivo_excel, carpeta_salida, workers=None, exportar_png=True, renderizador=None, cache=None, perfil=None):
+    """
+    Genera brackets desde un archivo de categorías: CATEGORIAS.xlsx o el snapshot
+    binario del torneo (ver snapshot_torneo). Con un Excel se usa antes el snapshot
+    vigente de la misma carpeta, si lo hay. Los parámetros son los de
+    generar_brackets_desde_df.
+    """
+    try:
+        if not es_snapshot(archivo_excel):
+            snapshot = snapshot_vigente(archivo_excel)
+            if snapshot:
+                print(f"💾 Usando el snapshot del torneo en lugar de {os.path.basename(archivo_excel)}: {snapshot}")
+                archivo_excel = snapshot
+        if es_snapshot(archivo_excel):
+            encabezados = leer_columnas_snapshot(archivo_excel)
+        else:
+            encabezados = leer_encabezados(archivo_excel)
+        if encabezados is not None and 'categoria_completa' not in encabezados:
+            print("❌ El archivo Excel no contiene la columna 'categoria_completa'")
+            return None
+        # Solo hacen falta la categoría y las columnas de nombre, apellido y abreviatura
+        if es_snapshot(archivo_excel):
+            df = cargar_snapshot(archivo_excel, columnas_para_brackets(encabezados))
+        else:
+            df = leer_columnas(archivo_excel, columnas_para_brackets(encabezados), encabezados)
     except Exception as e:
         print(f"Error generando brackets desde Excel: {e}")
         return None
+    return generar_brackets_desde_df(df, carpeta_salida, workers=workers, exportar_png=exportar_png,
+                                     renderizador=renderizador, cache=cache, perfil=perfil)
 
 # --- FUNCIÓN DE PRUEBA DE ESTE BLOQUE ---
 def prueba_excel_y_solos():
@@ -837,14 +1540,14 @@ def prueba_brackets_y_pdf():
     carpeta_brackets = "resultados/brackets"
     resultado = generar_brackets_desde_excel(excel_categorias, carpeta_brackets)
     if resultado:
-        print(f"✅ Se generaron {len(resultado['imagenes'])} imágenes de brackets")
+        print(f"✅ Se generaron {len(resultado['categorias'])} brackets ({len(resultado['imagenes'])} imágenes PNG)")
         if resultado['pdf']:
             print(f"✅ PDF de brackets creado: {resultado['pdf']}")
     else:
         print("❌ No se pudieron generar los brackets.")
 
 # --- FUNCIÓN PRINCIPAL COMPLETA ---
-def generar_torneo_completo():
+def generar_torneo_completo(perfil=None):
     """
     Función principal que genera un torneo completo:
     - Procesa archivos Excel
@@ -852,6 +1555,7 @@ def generar_torneo_completo():
     - Genera Excel de solos
     - Genera brackets (imágenes y PDF)
     - Muestra resumen final
+    perfil: calidad de los brackets (None = BRACKET_RENDER_PROFILE, ver PERFILES_RENDER).
     """
     print("🥋 FILO 0.5-BETA - GENERADOR COMPLETO DE TORNEO 🥋")
     print("=" * 60)
@@ -867,93 +1571,155 @@ def generar_torneo_completo():
     for archivo in archivos_excel:
         print(f"  • {archivo.name}")
     
-    try:
-        # Crear agrupador
-        agrupador = AgrupadorMultiple()
+    instrumentacion = Instrumentacion(torneo='cli')
+    # Perfilado opcional (FILO_PERFIL): se guarda junto a resumen_torneo.txt
+    with perfilar("resultados"):
+        try:
+            # Crear agrupador
+            agrupador = AgrupadorMultiple()
+            carpeta_salida = "resultados"
+            # CLASSIFY_CHUNK_ROWS > 0: clasificación en bloques, CATEGORIAS.xlsx se escribe al leer
+            filas_por_bloque = resolver_filas_por_bloque()
         
-        # Procesar archivos
-        print(f"\n🔄 Procesando {len(archivos_excel)} archivos...")
-        df = agrupador.procesar_multiples_archivos([str(a) for a in archivos_excel], combinar=True)
+            # Procesar archivos
+            print(f"\n🔄 Procesando {len(archivos_excel)} archivos...")
+            with instrumentacion.etapa('lectura') as etapa:
+                if filas_por_bloque:
+                    df = agrupador.procesar_archivos_por_bloques([str(a) for a in archivos_excel], carpeta_salida,
+                                                                  filas_por_bloque)
+                    filas_leidas = 0 if df is None else df.filas_leidas
+                    etapa.contar(bloques=0 if df is None else df.bloques)
+                    etapa.archivos(None if df is None else df.archivo_categorias)
+                else:
+                    df = agrupador.procesar_multiples_archivos([str(a) for a in archivos_excel], combinar=True)
+                    filas_leidas = 0 if df is None else len(df)
+                    if df is not None:
+                        etapa.contar(memoria_df_mb=memoria_mb(df))
+                etapa.contar(archivos=len(archivos_excel), filas=filas_leidas,
+                             fechas_no_reconocidas=agrupador.fechas.no_reconocidas)
         
-        if df is not None and len(df) > 0:
-            # Mostrar filas con categoria_completa None para depuración
-            df_none = df[df['categoria_completa'].isnull()]
-            if not df_none.empty:
-                print("\n⚠️ Filas con categoria_completa = None (revisa estos datos en tu Excel):")
-                print(df_none[['edad', 'sexo_normalizado', 'nivel_normalizado', 'categoria_edad', 'categoria_peso']])
-            # Filtrar filas inválidas
-            df = df[df['categoria_completa'].notnull()].copy()
-            if len(df) == 0:
-                print("❌ No quedan filas válidas para procesar después de filtrar None.")
-                return
-
-            # Validar categorías
-            print("\n🔍 Validando categorías...")
-            is_valid, invalid_categories = validate_categories(df)
+            if filas_leidas > 0:
+                # Mostrar filas con categoria_completa None para depuración
+                if filas_por_bloque:
+                    df_none = df.ejemplos_sin_categoria_df()
+                else:
+                    df_none = df[df['categoria_completa'].isnull()]
+                if not df_none.empty:
+                    print("\n⚠️ Filas con categoria_completa = None (revisa estos datos en tu Excel):")
+                    print(df_none[['edad', 'sexo_normalizado', 'nivel_normalizado', 'categoria_edad', 'categoria_peso']])
+                    if filas_por_bloque and df.filas_sin_categoria > len(df_none):
+                        print(f"  ... y {df.filas_sin_categoria - len(df_none)} filas más")
+                # Filtrar filas inválidas
+                if not filas_por_bloque:
+                    df = df[df['categoria_completa'].notnull()]
+                if len(df) == 0:
+                    print("❌ No quedan filas válidas para procesar después de filtrar None.")
+                    return
+
+                # Validar categorías
+                print("\n🔍 Validando categorías...")
+                with instrumentacion.etapa('validacion') as etapa:
+                    is_valid, invalid_categories = validate_categories(df)
+                    etapa.contar(filas=len(df), categorias_invalidas=len(invalid_categories))
             
-            if not is_valid:
-                print("❌ Categorías inválidas encontradas:")
-                for cat in invalid_categories:
-                    print(f"  • {cat}")
-                print("\n💡 Verifica que las categorías coincidan con categorias_taekwondo.json")
-                return
+                if not is_valid:
+                    print("❌ Categorías inválidas encontradas:")
+                    for cat in invalid_categories:
+                        print(f"  • {cat}")
+                    print("\n💡 Verifica que las categorías coincidan con categorias_taekwondo.json")
+                    return
             
-            print("✅ Todas las categorías son válidas!")
+                print("✅ Todas las categorías son válidas!")
             
-            # Crear carpeta de resultados
-            carpeta_salida = "resultados"
-            if not os.path.exists(carpeta_salida):
-                os.makedirs(carpeta_salida)
+                # Crear carpeta de resultados
+                if not os.path.exists(carpeta_salida):
+                    os.makedirs(carpeta_salida)
             
-            # 1. Exportar Excel de categorías
-            print("\n📊 Exportando Excel de categorías...")
-            excel_categorias = agrupador.exportar_categorias_unico_excel(df, carpeta_salida)
+                # 1. Exportar Excel de categorías (en bloques ya quedó escrito al leer)
+                print("\n📊 Exportando Excel de categorías...")
+                with instrumentacion.etapa('categorias') as etapa:
+                    if filas_por_bloque:
+                        excel_categorias = df.archivo_categorias
+                        etapa.contar(filas=len(df), categorias=len(df.categorias))
+                    else:
+                        excel_categorias = agrupador.exportar_categorias_unico_excel(df, carpeta_salida)
+                        etapa.contar(filas=len(df), categorias=int(df['categoria_completa'].nunique()),
+                                     memoria_df_mb=memoria_mb(df))
+                        etapa.archivos(excel_categorias, guardar_snapshot(df, carpeta_salida))
             
-            # 2. Identificar y exportar solos
-            print("\n👤 Identificando participantes solos...")
-            df_solos = agrupador.identificar_solos(df)
-            excel_solos = agrupador.exportar_solos(df_solos, carpeta_salida)
+                # 2. Identificar y exportar solos
+                print("\n👤 Identificando participantes solos...")
+                with instrumentacion.etapa('solos') as etapa:
+                    df_solos = df.solos() if filas_por_bloque else agrupador.identificar_solos(df)
+                    excel_solos = agrupador.exportar_solos(df_solos, carpeta_salida)
+                    etapa.contar(solos=len(df_solos))
+                    etapa.archivos(excel_solos)
             
-            # 3. Generar brackets
-            print("\n🏆 Generando brackets...")
-            carpeta_brackets = os.path.join(carpeta_salida, "brackets")
-            resultado_brackets = generar_brackets_desde_excel(excel_categorias, carpeta_brackets)
+                # 3. Generar brackets
+                print("\n🏆 Generando brackets...")
+                carpeta_brackets = os.path.join(carpeta_salida, "brackets")
+                with instrumentacion.etapa('brackets') as etapa:
+                    # En memoria el DataFrame pasa directo; en bloques se lee CATEGORIAS.xlsx
+                    # BRACKET_CACHE: solo se dibujan los brackets que cambiaron desde la última corrida
+                    cache = CacheBrackets.desde_config(carpeta_salida)
+                    plantillas_antes = cache_plantillas.estadisticas()
+                    if filas_por_bloque:
+                        resultado_brackets = generar_brackets_desde_excel(excel_categorias, carpeta_brackets, cache=cache,
+                                                                          perfil=perfil)
+                    else:
+                        resultado_brackets = generar_brackets_desde_df(df, carpeta_brackets, cache=cache, perfil=perfil)
+                    etapa.contar(brackets=len(resultado_brackets['categorias']) if resultado_brackets else 0,
+                                 **contadores_cache_plantillas(plantillas_antes))
+                    if resultado_brackets and cache:
+                        etapa.contar(reutilizados=resultado_brackets['reutilizados'])
+                    etapa.carpeta(carpeta_brackets)
             
-            # 4. Generar resumen
-            print("\n📋 Generando resumen...")
-            generar_resumen_torneo(df, df_solos, resultado_brackets, carpeta_salida)
+                # 4. Generar resumen
+                print("\n📋 Generando resumen...")
+                with instrumentacion.etapa('resumen') as etapa:
+                    etapa.archivos(generar_resumen_torneo(df, df_solos, resultado_brackets, carpeta_salida))
+                instrumentacion.imprimir_resumen()
             
-            # 5. Mostrar resultados finales
-            print("\n" + "=" * 60)
-            print("🎉 ¡TORNEO GENERADO EXITOSAMENTE! 🎉")
-            print("=" * 60)
-            print(f"📂 Carpeta de resultados: {Path(carpeta_salida).absolute()}")
-            print(f"📊 Total participantes: {len(df)}")
-            print(f"👤 Participantes solos: {len(df_solos)}")
-            print(f"🏆 Categorías con brackets: {len(df) - len(df_solos)}")
+                # 5. Mostrar resultados finales
+                print("\n" + "=" * 60)
+                print("🎉 ¡TORNEO GENERADO EXITOSAMENTE! 🎉")
+                print("=" * 60)
+                print(f"📂 Carpeta de resultados: {Path(carpeta_salida).absolute()}")
+                print(f"📊 Total participantes: {len(df)}")
+                print(f"👤 Participantes solos: {len(df_solos)}")
+                print(f"🏆 Categorías con brackets: {len(df) - len(df_solos)}")
             
-            if resultado_brackets:
-                print(f"🖼️  Imágenes de brackets: {len(resultado_brackets['imagenes'])}")
-                if resultado_brackets['pdf']:
-                    print(f"📄 PDF de brackets: {Path(resultado_brackets['pdf']).name}")
+                if resultado_brackets:
+                    print(f"🖼️  Brackets generados: {len(resultado_brackets['categorias'])}")
+                    if resultado_brackets['pdf']:
+                        print(f"📄 PDF de brackets: {Path(resultado_brackets['pdf']).name}")
             
-            print(f"\n📁 Archivos generados:")
-            print(f"  • {Path(excel_categorias).name}")
-            print(f"  • {Path(excel_solos).name}")
-            if resultado_brackets and resultado_brackets['pdf']:
-                print(f"  • {Path(resultado_brackets['pdf']).name}")
-            print(f"  • resumen_torneo.txt")
+                print("\n📁 Archivos generados:")
+                print(f"  • {Path(excel_categorias).name}")
+                print(f"  • {Path(excel_solos).name}")
+                if resultado_brackets and resultado_brackets['pdf']:
+                    print(f"  • {Path(resultado_brackets['pdf']).name}")
+                print("  • resumen_torneo.txt")
             
-        else:
-            print("❌ No se pudieron procesar participantes de ningún archivo.")
+            else:
+                print("❌ No se pudieron procesar participantes de ningún archivo.")
             
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        import traceback
-        traceback.print_exc()
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            import traceback
+            traceback.print_exc()
+
+def conteos_participantes(participantes, columna):
+    """value_counts de una columna, del DataFrame o del AcumuladorCategorias del modo en bloques."""
+    if isinstance(participantes, AcumuladorCategorias):
+        return participantes.conteos(columna)
+    return conteos(participantes[columna])
 
 def generar_resumen_torneo(df, df_solos, resultado_brackets, carpeta_salida):
-    """Genera un archivo de texto con el resumen del torneo."""
+    """
+    Genera un archivo de texto con el resumen del torneo.
+    df puede ser el DataFrame de participantes o el AcumuladorCategorias del modo en bloques.
+    """
     try:
         archivo_resumen = os.path.join(carpeta_salida, "resumen_torneo.txt")
         
@@ -969,7 +1735,7 @@ def generar_resumen_torneo(df, df_solos, resultado_brackets, carpeta_salida):
             # Distribución por nivel
             f.write("DISTRIBUCIÓN POR NIVEL:\n")
             f.write("-" * 30 + "\n")
-            nivel_counts = df['nivel_normalizado'].value_counts()
+            nivel_counts = conteos_participantes(df, 'nivel_normalizado')
             for nivel, count in nivel_counts.items():
                 f.write(f"{nivel}: {count} participantes\n")
             f.write("\n")
@@ -977,7 +1743,7 @@ def generar_resumen_torneo(df, df_solos, resultado_brackets, carpeta_salida):
             # Distribución por sexo
             f.write("DISTRIBUCIÓN POR SEXO:\n")
             f.write("-" * 30 + "\n")
-            sexo_counts = df['sexo_normalizado'].value_counts()
+            sexo_counts = conteos_participantes(df, 'sexo_normalizado')
             for sexo, count in sexo_counts.items():
                 f.write(f"{sexo}: {count} participantes\n")
             f.write("\n")
@@ -985,7 +1751,7 @@ def generar_resumen_torneo(df, df_solos, resultado_brackets, carpeta_salida):
             # Categorías con más participantes
             f.write("CATEGORÍAS CON MÁS PARTICIPANTES:\n")
             f.write("-" * 40 + "\n")
-            categoria_counts = df['categoria_completa'].value_counts().head(10)
+            categoria_counts = conteos_participantes(df, 'categoria_completa').head(10)
             for categoria, count in categoria_counts.items():
                 f.write(f"{categoria}: {count} participantes\n")
             f.write("\n")
@@ -997,10 +1763,9 @@ def generar_resumen_torneo(df, df_solos, resultado_brackets, carpeta_salida):
                 f.write(f"• {row['categoria_completa']}\n")
             
             if resultado_brackets:
-                f.write(f"\nBRACKETS GENERADOS: {len(resultado_brackets['imagenes'])}\n")
+                f.write(f"\nBRACKETS GENERADOS: {len(resultado_brackets['categorias'])}\n")
                 f.write("-" * 30 + "\n")
-                for imagen in resultado_brackets['imagenes']:
-                    categoria = Path(imagen).stem.replace('bracket_', '').replace('_', ' ')
+                for categoria in resultado_brackets['categorias']:
                     f.write(f"• {categoria}\n")
         
         print(f"✅ Resumen generado: {archivo_resumen}")
@@ -1012,4 +1777,11 @@ def generar_resumen_torneo(df, df_solos, resultado_brackets, carpeta_salida):
 
 # --- MAIN ---
 if __name__ == "__main__":
-    generar_torneo_completo() 
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Genera el torneo completo con las planillas .xlsx del directorio")
+    parser.add_argument('--perfil', choices=list(PERFILES_RENDER), default=None,
+                        help="calidad de los brackets: borrador (1x), pantalla (2x) o impresion (4x, "
+                             "por defecto BRACKET_RENDER_PROFILE o impresion)")
+    perfil = parser.parse_args().perfil
+    precargar_fuentes(perfil)
+    generar_torneo_completo(perfil)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Registro de fuentes TrueType para dibujar los brackets.
+Cada familia/peso se resuelve una sola vez recorriendo su lista de candidatos
+(fuentes del sistema primero, luego las de fonts/) y las instancias de
+ImageFont quedan en caché por (familia, peso, tamaño).
+"""
+
+import os
+import threading
+
+from PIL import ImageFont
+
+CARPETA_FUENTES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fonts')
+
+# (familia, peso) -> archivos a probar en orden
+CANDIDATOS_FUENTES = {
+    ('arial', 'bold'): ('arialbd.ttf', 'Arial-Bold.ttf', 'fonts/Anton-Regular.ttf'),
+    ('arial', 'regular'): ('arial.ttf', 'Arial.ttf', 'fonts/Roboto-VariableFont_wdth,wght.ttf'),
+}
+
+FUENTE_POR_DEFECTO = 'default'
+
+class RegistroFuentes:
+    """
+    Resuelve y guarda en caché las fuentes de PIL.
+
+    resolver(familia, peso) devuelve el archivo elegido (o 'default' si ninguno
+    cargó y se usa ImageFont.load_default); fuente(familia, peso, tamano)
+    devuelve la instancia de ImageFont lista para dibujar.
+    """
+
+    def __init__(self, candidatos=None):
+        self.candidatos = dict(candidatos or CANDIDATOS_FUENTES)
+        self._resueltas = {}
+        self._fuentes = {}
+        self._lock = threading.Lock()
+
+    def _abrir(self, archivo, tamano):
+        if archivo == FUENTE_POR_DEFECTO:
+            return ImageFont.load_default()
+        if archivo.startswith('fonts/') and not os.path.exists(archivo):
+            # Las fuentes incluidas se buscan también junto al código, no solo en el cwd
+            archivo = os.path.join(CARPETA_FUENTES, archivo[len('fonts/'):])
+        return ImageFont.truetype(archivo, tamano)
+
+    def _resolver(self, familia, peso, tamano):
+        for archivo in self.candidatos.get((familia, peso), ()):
+            try:
+                return archivo, self._abrir(archivo, tamano)
+            except OSError:
+                continue
+        print(f"⚠️ No se encontró ninguna fuente para {familia}/{peso}, usando la fuente por defecto")
+        return FUENTE_POR_DEFECTO, ImageFont.load_default()
+
+    def resolver(self, familia, peso):
+        """Archivo elegido para la familia y peso (se resuelve la primera vez)."""
+        with self._lock:
+            archivo = self._resueltas.get((familia, peso))
+        if archivo is None:
+            self.fuente(familia, peso, 12)
+            archivo = self._resueltas[(familia, peso)]
+        return archivo
+
+    def fuente(self, familia, peso, tamano):
+        """ImageFont para (familia, peso, tamano); solo se parsea el TTF la primera vez."""
+        clave = (familia, peso, tamano)
+        fuente = self._fuentes.get(clave)
+        if fuente is not None:
+            return fuente
+        with self._lock:
+            fuente = self._fuentes.get(clave)
+            if fuente is not None:
+                return fuente
+            archivo = self._resueltas.get((familia, peso))
+            if archivo is None:
+                archivo, fuente = self._resolver(familia, peso, tamano)
+                self._resueltas[(familia, peso)] = archivo
+                print(f"🔤 Fuente {familia}/{peso}: {archivo}")
+            else:
+                fuente = self._abrir(archivo, tamano)
+            self._fuentes[clave] = fuente
+            return fuente
+
+    def elegidas(self):
+        """{'familia/peso': archivo} de las fuentes resueltas hasta ahora."""
+        with self._lock:
+            return {f"{familia}/{peso}": archivo for (familia, peso), archivo in self._resueltas.items()}
+
+    def precargar(self, tamanos):
+        """Resuelve y carga de una vez una lista de (familia, peso, tamano)."""
+        for familia, peso, tamano in tamanos:
+            self.fuente(familia, peso, tamano)
+        return self.elegidas()
+
+# Registro compartido del proceso
+registro_fuentes = RegistroFuentes()
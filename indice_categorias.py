@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Índice compilado de categorias_taekwondo.json.
+Se construye una vez por proceso (y de nuevo solo si cambia el mtime del
+archivo) y lo comparten la clasificación, la validación y category_logger.py.
+"""
+
+import copy
+import json
+import os
+import threading
+from types import MappingProxyType
+
+import numpy as np
+
+# Rangos de edad con los que se clasifica a los participantes. Se evalúan en
+# orden (12 años cae en INFANTIL_C) y no coinciden con EDAD del JSON.
+RANGOS_EDAD_CLASIFICACION = (
+    ('PRE_INFANTIL', 4, 6),
+    ('INFANTIL_A', 7, 8),
+    ('INFANTIL_B', 9, 10),
+    ('INFANTIL_C', 11, 12),
+    ('CADETE', 12, 14),
+    ('JUVENIL', 15, 17),
+    ('MAYORES', 18, 100),
+)
+
+SEXOS = ('MASCULINO', 'FEMENINO')
+
+def generar_combinaciones(categorias):
+    """Genera todas las combinaciones posibles de categorías (formato clásico)."""
+    combinaciones = []
+    for division, datos in categorias.items():
+        niveles = datos['NIVEL']
+        # Para CADETE, JUVENIL, MAYORES: pesos por sexo
+        if isinstance(datos['SEXO'], dict):
+            for nivel in niveles:
+                for genero, pesos in datos['SEXO'].items():
+                    for peso in pesos:
+                        combinaciones.append(f"{nivel} {division.replace('_', ' ')} {genero} {peso}")
+        else:
+            # Para divisiones con pesos mixtos
+            for nivel in niveles:
+                for genero in datos['SEXO']:
+                    for peso in datos['PESOS']:
+                        combinaciones.append(f"{nivel} {division.replace('_', ' ')} {genero} {peso}")
+    return sorted(combinaciones)
+
+def _solo_lectura(valores, dtype):
+    arreglo = np.array(valores, dtype=dtype)
+    arreglo.flags.writeable = False
+    return arreglo
+
+def _json_solo_lectura(valor):
+    """El JSON con los diccionarios como MappingProxyType y las listas como tuplas."""
+    if isinstance(valor, dict):
+        return MappingProxyType({clave: _json_solo_lectura(v) for clave, v in valor.items()})
+    if isinstance(valor, list):
+        return tuple(_json_solo_lectura(v) for v in valor)
+    return valor
+
+def _compilar_rangos_peso(etiquetas):
+    """
+    Separa las etiquetas '-X' (peso <= X) y '+X' (peso > X) y parsea sus límites.
+    Devuelve None si los límites '-' no son crecientes (no sirve searchsorted).
+    """
+    menores = [(e, float(e.replace('-', ''))) for e in etiquetas if '-' in e]
+    mayores = [(e, float(e.replace('+', ''))) for e in etiquetas if '-' not in e and '+' in e]
+    limites = [limite for _, limite in menores]
+    if limites != sorted(limites):
+        return None
+    return (
+        _solo_lectura([e for e, _ in menores], object),
+        _solo_lectura(limites, float),
+        tuple(e for e, _ in mayores),
+        tuple(limite for _, limite in mayores),
+    )
+
+class IndiceCategorias:
+    """
+    Vista inmutable y precalculada de las categorías oficiales.
+
+    Atributos:
+        datos: el JSON original de solo lectura (diccionarios como MappingProxyType,
+            listas como tuplas), compartido sin copiar entre agrupadores.
+        combinaciones: tupla ordenada con todos los nombres de categoría.
+        nombres_validos: frozenset para validar en O(1).
+        rangos_peso: {(division, sexo): (etiquetas '-', límites '-', etiquetas '+', límites '+')}
+        rangos_edad: {division: (edad_min, edad_max)} en orden de evaluación.
+        edades_oficiales: {division: (min, max)} tal como figuran en EDAD del JSON.
+        niveles, etiquetas_peso: valores distintos de NIVEL y de los pesos, en el
+            orden del JSON (las categorías fijas de esquema_torneo.py).
+    """
+
+    def __init__(self, datos, archivo=None, mtime_ns=None):
+        rangos_peso = {}
+        for division, criterios in datos.items():
+            for sexo in SEXOS:
+                # Igual que determinar_categoria_peso: pesos por sexo si existen, si no PESOS
+                if isinstance(criterios['SEXO'], dict) and sexo in criterios['SEXO']:
+                    etiquetas = criterios['SEXO'][sexo]
+                else:
+                    etiquetas = criterios.get('PESOS')
+                if etiquetas is not None:
+                    rangos_peso[(division, sexo)] = _compilar_rangos_peso(etiquetas)
+        combinaciones = tuple(generar_combinaciones(datos))
+        niveles = dict.fromkeys(nivel for criterios in datos.values() for nivel in criterios['NIVEL'])
+        etiquetas_peso = {}
+        for criterios in datos.values():
+            if isinstance(criterios['SEXO'], dict):
+                for pesos in criterios['SEXO'].values():
+                    etiquetas_peso.update(dict.fromkeys(pesos))
+            etiquetas_peso.update(dict.fromkeys(criterios.get('PESOS') or ()))
+
+        object.__setattr__(self, 'archivo', archivo)
+        object.__setattr__(self, 'mtime_ns', mtime_ns)
+        object.__setattr__(self, '_datos', copy.deepcopy(datos))
+        object.__setattr__(self, 'datos', _json_solo_lectura(datos))
+        object.__setattr__(self, 'divisiones', tuple(datos.keys()))
+        object.__setattr__(self, 'combinaciones', combinaciones)
+        object.__setattr__(self, 'nombres_validos', frozenset(combinaciones))
+        object.__setattr__(self, 'niveles', tuple(niveles))
+        object.__setattr__(self, 'etiquetas_peso', tuple(etiquetas_peso))
+        object.__setattr__(self, 'rangos_peso', MappingProxyType(rangos_peso))
+        object.__setattr__(self, 'rangos_edad', MappingProxyType(
+            {division: (edad_min, edad_max) for division, edad_min, edad_max in RANGOS_EDAD_CLASIFICACION}))
+        object.__setattr__(self, 'edades_oficiales', MappingProxyType(
+            {division: tuple(criterios.get('EDAD', ())) for division, criterios in datos.items()}))
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError("IndiceCategorias es inmutable")
+
+    def datos_json(self):
+        """Copia modificable del JSON original; para solo leerlo alcanza con datos."""
+        return copy.deepcopy(self._datos)
+
+    def es_valida(self, categoria):
+        return categoria is not None and categoria in self.nombres_validos
+
+    def categorias_invalidas(self, categorias):
+        """Devuelve las categorías (en el orden recibido) que no son oficiales."""
+        return [cat for cat in categorias if not self.es_valida(cat)]
+
+_indices = {}
+_lock_indices = threading.Lock()
+
+def obtener_indice_categorias(archivo="categorias_taekwondo.json"):
+    """
+    Devuelve el índice compilado del archivo de categorías.
+    Se reutiliza mientras no cambie el mtime del archivo.
+    Propaga FileNotFoundError / json.JSONDecodeError si no se puede leer.
+    """
+    ruta = os.path.abspath(archivo)
+    mtime_ns = os.stat(ruta).st_mtime_ns
+    with _lock_indices:
+        indice = _indices.get(ruta)
+        if indice is not None and indice.mtime_ns == mtime_ns:
+            return indice
+        with open(ruta, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+        indice = IndiceCategorias(datos, archivo=ruta, mtime_ns=mtime_ns)
+        _indices[ruta] = indice
+        return indice
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Instrumentación por etapa del pipeline de torneos.
+Cada etapa registra tiempo de reloj, tiempo de CPU (del hilo y de los procesos
+hijos que terminaron, p. ej. el pool de render), memoria residente al terminar,
+contadores (filas, categorías, brackets, MB del DataFrame) y bytes escritos. Cada etapa terminada se emite como una línea JSON
+en el logger 'filo.etapas' y el resumen completo se puede devolver en la
+respuesta de la API.
+
+Perfilado opcional (FILO_PERFIL=cprofile o pyinstrument): vuelca el perfil de
+la corrida junto a resumen_torneo.txt.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    # Windows: sin CPU de procesos hijos ni memoria residente
+    resource = None
+
+logger = logging.getLogger('filo.etapas')
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+PERFILADORES = ('cprofile', 'pyinstrument')
+
+def _cpu_hijos():
+    if resource is None:
+        return 0.0
+    uso = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return uso.ru_utime + uso.ru_stime
+
+def rss_actual_mb():
+    """Memoria residente actual del proceso en MB (en Linux; si no, el pico; None sin resource)."""
+    if resource is None:
+        return None
+    try:
+        with open('/proc/self/statm') as f:
+            paginas = int(f.read().split()[1])
+        return round(paginas * resource.getpagesize() / (1024 * 1024), 1)
+    except (OSError, ValueError, IndexError):
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa KB, macOS bytes
+        return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+class Etapa:
+    """Una etapa en curso; el pipeline le agrega contadores y archivos escritos."""
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.contadores = {}
+        self.bytes_escritos = 0
+
+    def contar(self, **valores):
+        """Agrega o reemplaza contadores (filas=..., categorias=..., brackets=...)."""
+        self.contadores.update(valores)
+
+    def archivos(self, *rutas):
+        """Suma al total de bytes escritos el tamaño de los archivos que existan."""
+        for ruta in rutas:
+            if ruta and os.path.isfile(ruta):
+                self.bytes_escritos += os.path.getsize(ruta)
+
+    def carpeta(self, ruta):
+        """Suma los bytes de todos los archivos de una carpeta (p. ej. brackets/)."""
+        for raiz, _, archivos in os.walk(ruta):
+            self.archivos(*(os.path.join(raiz, archivo) for archivo in archivos))
+
+class Instrumentacion:
+    """
+    Junta las etapas de una corrida.
+    contexto: datos fijos que acompañan cada línea de log (p. ej. trabajo=<id>).
+    """
+
+    def __init__(self, **contexto):
+        self.contexto = contexto
+        self.etapas = []
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nombre):
+        etapa = Etapa(nombre)
+        inicio = datetime.now().isoformat(timespec='seconds')
+        reloj, cpu, cpu_hijos = time.perf_counter(), time.thread_time(), _cpu_hijos()
+        estado = 'ok'
+        try:
+            yield etapa
+        except Exception:
+            estado = 'error'
+            raise
+        finally:
+            registro = {
+                'nombre': nombre,
+                'estado': estado,
+                'inicio': inicio,
+                'wall_s': round(time.perf_counter() - reloj, 4),
+                'cpu_s': round(time.thread_time() - cpu, 4),
+                'cpu_hijos_s': round(_cpu_hijos() - cpu_hijos, 4),
+                'rss_mb': rss_actual_mb(),
+                'bytes_escritos': etapa.bytes_escritos,
+                **etapa.contadores,
+            }
+            self.etapas.append(registro)
+            logger.info(json.dumps({'evento': 'etapa', **self.contexto, **registro}, ensure_ascii=False, default=str))
+
+    def resumen(self):
+        """Totales y detalle por etapa, serializable a JSON."""
+        return {
+            'wall_s': round(time.perf_counter() - self._inicio, 4),
+            'cpu_s': round(sum(e['cpu_s'] for e in self.etapas), 4),
+            'cpu_hijos_s': round(sum(e['cpu_hijos_s'] for e in self.etapas), 4),
+            'bytes_escritos': sum(e['bytes_escritos'] for e in self.etapas),
+            'rss_max_mb': max((e['rss_mb'] for e in self.etapas if e['rss_mb'] is not None), default=None),
+            'etapas': [dict(e) for e in self.etapas],
+        }
+
+    def imprimir_resumen(self):
+        """Tabla de tiempos por etapa para la salida de consola."""
+        print("\n⏱️  Tiempos por etapa:")
+        for e in self.etapas:
+            rss = f"{e['rss_mb']:8.1f} MB RSS" if e['rss_mb'] is not None else ""
+            print(f"  • {e['nombre']:<12} {e['wall_s']:8.2f} s reloj  {e['cpu_s']:8.2f} s CPU  "
+                  f"{e['bytes_escritos'] / 1024:10.1f} KB  {rss}")
+
+def resolver_perfilador(perfilador=None):
+    """None = variable FILO_PERFIL; vacío o desconocido = sin perfilado."""
+    if perfilador is None:
+        perfilador = os.environ.get('FILO_PERFIL', '')
+    perfilador = (perfilador or '').strip().lower()
+    if perfilador and perfilador not in PERFILADORES:
+        print(f"⚠️ Perfilador desconocido '{perfilador}' (opciones: {', '.join(PERFILADORES)})")
+        return None
+    return perfilador or None
+
+@contextmanager
+def perfilar(carpeta_salida, perfilador=None):
+    """
+    Perfila el bloque si se pidió (argumento o FILO_PERFIL) y escribe el resultado
+    en carpeta_salida: perfil_torneo.prof + perfil_torneo.txt (cProfile) o
+    perfil_torneo.html (pyinstrument). Entrega la lista de archivos escritos.
+    """
+    perfilador = resolver_perfilador(perfilador)
+    archivos = []
+    if perfilador == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("⚠️ pyinstrument no está instalado, se usa cProfile")
+            perfilador = 'cprofile'
+    if perfilador is None:
+        yield archivos
+        return
+
+    os.makedirs(carpeta_salida, exist_ok=True)
+    if perfilador == 'pyinstrument':
+        perfil = Profiler()
+        perfil.start()
+        try:
+            yield archivos
+        finally:
+            perfil.stop()
+            ruta = os.path.join(carpeta_salida, 'perfil_torneo.html')
+            with open(ruta, 'w', encoding='utf-8') as f:
+                f.write(perfil.output_html())
+            archivos.append(ruta)
+            print(f"🔬 Perfil guardado: {ruta}")
+        return
+
+    perfil = cProfile.Profile()
+    perfil.enable()
+    try:
+        yield archivos
+    finally:
+        perfil.disable()
+        ruta_prof = os.path.join(carpeta_salida, 'perfil_torneo.prof')
+        perfil.dump_stats(ruta_prof)
+        texto = io.StringIO()
+        pstats.Stats(perfil, stream=texto).sort_stats('cumulative').print_stats(40)
+        ruta_txt = os.path.join(carpeta_salida, 'perfil_torneo.txt')
+        with open(ruta_txt, 'w', encoding='utf-8') as f:
+            f.write(texto.getvalue())
+        archivos.extend([ruta_prof, ruta_txt])
+        print(f"🔬 Perfil guardado: {ruta_prof} (resumen en {ruta_txt})")
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Lectura de planillas Excel con el motor más rápido disponible.
+Primero se lee solo la fila de encabezados para resolver las columnas con los
+patrones de búsqueda; si falta alguna requerida se corta ahí, sin parsear la
+hoja. Después se cargan solo las columnas necesarias.
+
+Motores: calamine (paquete opcional python-calamine, bastante más rápido) y
+openpyxl como respaldo. EXCEL_ENGINE fuerza uno de los dos.
+
+leer_excel_por_bloques recorre una planilla .xlsx en bloques de filas con
+openpyxl en modo read_only, sin cargar la hoja entera, y arma cada bloque con
+el mismo parser que usa pd.read_excel (mismos nombres de columna y valores).
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+MOTORES = ('calamine', 'openpyxl')
+FILAS_POR_BLOQUE = 5000
+
+class ColumnasFaltantesError(ValueError):
+    """Faltan columnas requeridas; se detecta solo con los encabezados."""
+
+    def __init__(self, archivo, faltantes, encontradas):
+        self.archivo = archivo
+        self.faltantes = list(faltantes)
+        self.encontradas = list(encontradas)
+        super().__init__(f"Faltan columnas requeridas en {archivo}: {', '.join(self.faltantes)}")
+
+_calamine = None
+
+def calamine_disponible():
+    """True si pandas puede usar engine='calamine' (requiere python-calamine)."""
+    global _calamine
+    if _calamine is None:
+        try:
+            import python_calamine  # noqa: F401
+            _calamine = True
+        except ImportError:
+            _calamine = False
+    return _calamine
+
+def motor_excel(archivo=None):
+    """
+    Motor para pd.read_excel: EXCEL_ENGINE si está definido, si no calamine cuando
+    está instalado y openpyxl para .xlsx/.xlsm. None = que pandas elija (p. ej. .xls).
+    """
+    forzado = os.environ.get('EXCEL_ENGINE', '').strip().lower()
+    if forzado in MOTORES and (forzado != 'calamine' or calamine_disponible()):
+        return forzado
+    if calamine_disponible():
+        return 'calamine'
+    if archivo is None or str(archivo).lower().endswith(('.xlsx', '.xlsm')):
+        return 'openpyxl'
+    return None
+
+def leer_excel(archivo, usecols=None, motor=None, **kwargs):
+    """
+    pd.read_excel con el motor elegido por motor_excel. Si calamine falla con un
+    archivo que openpyxl sí entiende, se reintenta con openpyxl.
+    """
+    motor = motor or motor_excel(archivo)
+    try:
+        return pd.read_excel(archivo, usecols=usecols, engine=motor, **kwargs)
+    except (FileNotFoundError, ValueError):
+        raise
+    except Exception as e:
+        if motor != 'calamine':
+            raise
+        print(f"⚠️ calamine no pudo leer {archivo} ({e}), reintentando con openpyxl")
+        return pd.read_excel(archivo, usecols=usecols, engine=None, **kwargs)
+
+def leer_encabezados(archivo, motor=None):
+    """
+    Nombres de columna tal como los pondría pandas (incluye 'Unnamed: N' y
+    duplicados 'X.1'), leyendo solo la primera fila. None si no se pudo leer.
+    """
+    try:
+        return list(leer_excel(archivo, motor=motor, nrows=0).columns)
+    except Exception as e:
+        print(f"⚠️ No se pudieron leer los encabezados de {archivo}: {e}")
+        return None
+
+def buscar_columna(columnas, patrones):
+    """
+    Primera columna que contiene alguno de los patrones, probando los patrones en
+    orden (igual que la detección original). Ignora encabezados que no son texto.
+    """
+    for patron in patrones:
+        encontrada = next((c for c in columnas if isinstance(c, str) and patron in c.lower()), None)
+        if encontrada:
+            return encontrada
+    return None
+
+def resolver_columnas(columnas, patrones_por_campo):
+    """{campo: columna o None} para cada campo de patrones_por_campo."""
+    return {campo: buscar_columna(columnas, patrones) for campo, patrones in patrones_por_campo.items()}
+
+def verificar_requeridas(archivo, resueltas, requeridas, encontradas):
+    """Lanza ColumnasFaltantesError si algún campo requerido no se resolvió."""
+    faltantes = [campo for campo in requeridas if not resueltas.get(campo)]
+    if faltantes:
+        raise ColumnasFaltantesError(archivo, faltantes, encontradas)
+
+def indices_columnas(encabezados, columnas):
+    """Posiciones (para usecols) de las columnas pedidas, en el orden de la hoja."""
+    pedidas = set(c for c in columnas if c is not None)
+    return [i for i, encabezado in enumerate(encabezados) if encabezado in pedidas]
+
+def leer_columnas(archivo, columnas, encabezados=None, motor=None):
+    """
+    Lee solo `columnas` (nombres como los da leer_encabezados). Si columnas es
+    None o no hay encabezados para ubicarlas, lee la hoja completa.
+    """
+    if columnas is not None and encabezados is None:
+        encabezados = leer_encabezados(archivo, motor)
+    if columnas is None or encabezados is None:
+        return leer_excel(archivo, motor=motor)
+    return leer_excel(archivo, usecols=indices_columnas(encabezados, columnas), motor=motor)
+
+def motor_por_bloques(archivo):
+    """Motor con el que leer_excel_por_bloques lee la planilla (para sniffear encabezados iguales)."""
+    if str(archivo).lower().endswith(('.xlsx', '.xlsm')):
+        return 'openpyxl'
+    return motor_excel(archivo)
+
+def _valor_celda(celda):
+    # Misma conversión que el lector openpyxl de pandas
+    if celda.value is None:
+        return ""
+    if celda.data_type == 'e':
+        return np.nan
+    if celda.data_type == 'n':
+        entero = int(celda.value)
+        return entero if entero == celda.value else float(celda.value)
+    return celda.value
+
+def _fila_recortada(fila):
+    valores = [_valor_celda(celda) for celda in fila]
+    while valores and valores[-1] == "":
+        valores.pop()
+    return valores
+
+def _armar_bloque(encabezado, filas, inicio):
+    ancho = len(encabezado)
+    datos = [encabezado] + [fila[:ancho] + [""] * (ancho - len(fila)) for fila in filas]
+    bloque = TextParser(datos, header=0, skip_blank_lines=False).read()
+    bloque.index = pd.RangeIndex(inicio, inicio + len(bloque))
+    return bloque
+
+def leer_excel_por_bloques(archivo, filas_por_bloque=FILAS_POR_BLOQUE):
+    """
+    Generador de DataFrames de hasta filas_por_bloque filas de la primera hoja.
+    Los nombres de columna y los valores coinciden con pd.read_excel(engine='openpyxl');
+    el índice sigue la numeración de la hoja completa. Como el encabezado se fija
+    al principio, las celdas de una fila más allá de la última columna con
+    encabezado se ignoran. Los formatos sin lector en streaming (.xls) se leen
+    completos y se entregan igual partidos en bloques.
+    """
+    if not str(archivo).lower().endswith(('.xlsx', '.xlsm')):
+        df = leer_excel(archivo)
+        for inicio in range(0, len(df), filas_por_bloque):
+            yield df.iloc[inicio:inicio + filas_por_bloque].copy()
+        return
+
+    from openpyxl import load_workbook
+    libro = load_workbook(archivo, read_only=True, data_only=True, keep_links=False)
+    try:
+        hoja = libro.worksheets[0]
+        hoja.reset_dimensions()
+        filas = (_fila_recortada(fila) for fila in hoja.rows)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            return
+        bloque, vacias, inicio = [], [], 0
+        for fila in filas:
+            if not fila:
+                # Las filas vacías del final de la hoja no cuentan (igual que pandas)
+                vacias.append(fila)
+                continue
+            bloque.extend(vacias)
+            vacias = []
+            bloque.append(fila)
+            if len(bloque) >= filas_por_bloque:
+                yield _armar_bloque(encabezado, bloque, inicio)
+                inicio += len(bloque)
+                bloque = []
+        if bloque:
+            yield _armar_bloque(encabezado, bloque, inicio)
+    finally:
+        libro.close()
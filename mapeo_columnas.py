@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Mapeo de columnas de las planillas de inscripción.
+Una sola tabla de patrones para el clasificador (filo_0_5) y el editor web
+(app.py). El resultado se guarda por huella de encabezados: las academias usan
+la misma planilla toda la temporada, así que la búsqueda por patrones corre una
+vez por formato y después es una consulta a un diccionario.
+
+Los mapeos se persisten en un JSON chico (COLUMN_MAP_STORE, por defecto
+mapeos_columnas.json junto al código; vacío = solo en memoria). Un operador
+puede fijar el mapeo de una planilla conocida; los fijados tienen prioridad
+sobre la detección y no se descartan al cambiar los patrones.
+
+Uso:
+    python mapeo_columnas.py mostrar planilla.xlsx
+    python mapeo_columnas.py fijar planilla.xlsx abreviatura=CLUB peso="Peso (kg)"
+    python mapeo_columnas.py soltar planilla.xlsx
+    python mapeo_columnas.py listar
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from datetime import datetime
+
+from lector_excel import buscar_columna
+
+# Campo -> patrones a buscar en el nombre de la columna (en minúsculas); se
+# prueban en orden y gana la primera columna que contiene el patrón
+PATRONES_CAMPOS = {
+    'nombre': ['nombre', 'name', 'first_name', 'firstname'],
+    'apellido': ['apellido', 'lastname', 'last_name', 'surname'],
+    'documento': ['documento', 'dni', 'cedula', 'cédula', 'id', 'identificacion', 'identificación', 'pasaporte', 'ci'],
+    'fecha_nacimiento': ['nacim', 'fecha', 'birth', 'nacimiento', 'fecha_nacimiento', 'birthdate', 'born'],
+    'genero': ['sexo', 'genero', 'género', 'gender', 'sex'],
+    'kup': ['kup', 'dan', 'nivel', 'grado', 'cinturon', 'cinturón', 'belt', 'grade'],
+    'peso': ['peso', 'weight', 'kg', 'kilos'],
+    'modalidad': ['modalidad', 'modality', 'disciplina', 'discipline', 'category', 'tipo', 'sport'],
+    'abreviatura': ['abreviatura', 'abbreviation', 'abrev', 'academia', 'academy', 'club', 'escuela', 'school', 'team'],
+}
+CAMPOS_REQUERIDOS = ('fecha_nacimiento', 'genero', 'kup', 'peso')
+
+VERSION_MAPEOS = 1
+MAX_MAPEOS = 500
+ARCHIVO_MAPEOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mapeos_columnas.json')
+
+def huella_encabezados(encabezados):
+    """Huella estable de la fila de encabezados (nombres y orden)."""
+    texto = json.dumps([str(c) for c in encabezados], ensure_ascii=False)
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()[:16]
+
+def huella_patrones(patrones):
+    """Cambia si cambia la tabla de patrones: invalida los mapeos detectados con la anterior."""
+    texto = json.dumps(patrones, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()[:12]
+
+def detectar_columnas(encabezados, patrones=None):
+    """{campo: columna o None} buscando con los patrones, sin caché."""
+    encabezados = list(encabezados)
+    if patrones is None:
+        patrones = PATRONES_CAMPOS
+    return {campo: buscar_columna(encabezados, lista) for campo, lista in patrones.items()}
+
+def ruta_mapeos_por_defecto():
+    """COLUMN_MAP_STORE si está definida (vacía = sin persistencia), si no ARCHIVO_MAPEOS."""
+    ruta = os.environ.get('COLUMN_MAP_STORE')
+    if ruta is None:
+        return ARCHIVO_MAPEOS
+    return ruta or None
+
+class MapeadorColumnas:
+    """
+    Resuelve {campo: columna} para una fila de encabezados con caché por huella.
+
+    resolver(encabezados) devuelve siempre un dict nuevo; fijar() guarda el mapeo
+    de un operador para esa planilla y soltar() lo quita.
+    """
+
+    def __init__(self, ruta=None, patrones=None, persistir=True):
+        self.patrones = dict(patrones or PATRONES_CAMPOS)
+        self.version_patrones = huella_patrones(self.patrones)
+        self.ruta = (ruta or ruta_mapeos_por_defecto()) if persistir else None
+        self.aciertos = 0
+        self.detecciones = 0
+        self._mapeos = None
+        self._soltados = set()
+        self._lock = threading.Lock()
+
+    # --- persistencia ---
+    def _leer_archivo(self):
+        if not self.ruta:
+            return {}
+        try:
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ No se pudo leer {self.ruta}: {e}")
+            return {}
+        if datos.get('version') != VERSION_MAPEOS:
+            return {}
+        # Los detectados con otra tabla de patrones se descartan; los fijados se conservan
+        return {huella: entrada for huella, entrada in datos.get('mapeos', {}).items()
+                if entrada.get('fijado') or entrada.get('patrones') == self.version_patrones}
+
+    def _escribir_archivo(self):
+        """Escribe de forma atómica, mezclando con lo que otro proceso haya guardado."""
+        if not self.ruta:
+            return
+        try:
+            mapeos = self._leer_archivo()
+            mapeos.update(self._mapeos)
+            for huella in [h for h in mapeos if h in self._soltados]:
+                del mapeos[huella]
+            detectados = sorted((h for h, e in mapeos.items() if not e.get('fijado')),
+                                key=lambda h: mapeos[h].get('creado', ''))
+            for huella in detectados[:max(0, len(mapeos) - MAX_MAPEOS)]:
+                del mapeos[huella]
+            directorio = os.path.dirname(os.path.abspath(self.ruta))
+            os.makedirs(directorio, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix='.mapeos_', suffix='.json', dir=directorio)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': VERSION_MAPEOS, 'mapeos': mapeos}, f, indent=1, ensure_ascii=False, sort_keys=True)
+            os.replace(tmp_path, self.ruta)
+            self._mapeos = mapeos
+        except OSError as e:
+            print(f"⚠️ No se pudieron guardar los mapeos de columnas en {self.ruta}: {e}")
+
+    def _cargar(self):
+        if self._mapeos is None:
+            self._mapeos = self._leer_archivo()
+
+    # --- consulta ---
+    def _columnas_validas(self, entrada, encabezados):
+        """Columnas de la entrada; un fijado que nombra una columna inexistente se ignora."""
+        columnas = dict(entrada['columnas'])
+        nombres = set(str(c) for c in encabezados)
+        if any(c is not None and c not in nombres for c in columnas.values()):
+            return None
+        return columnas
+
+    def resolver(self, encabezados):
+        """{campo: columna o None} para cada campo de la tabla de patrones."""
+        encabezados = list(encabezados)
+        huella = huella_encabezados(encabezados)
+        with self._lock:
+            self._cargar()
+            entrada = self._mapeos.get(huella)
+            if entrada is not None:
+                columnas = self._columnas_validas(entrada, encabezados)
+                if columnas is not None:
+                    self.aciertos += 1
+                    if entrada.get('fijado'):
+                        # Los campos que el operador no fijó se detectan
+                        faltantes = {c: p for c, p in self.patrones.items() if c not in columnas}
+                        columnas.update(detectar_columnas(encabezados, faltantes))
+                    return {campo: columnas.get(campo) for campo in self.patrones}
+                print(f"⚠️ El mapeo guardado para {huella} nombra columnas que no están, se vuelve a detectar")
+        columnas = detectar_columnas(encabezados, self.patrones)
+        with self._lock:
+            self.detecciones += 1
+            self._mapeos[huella] = {
+                'encabezados': [str(c) for c in encabezados],
+                'columnas': columnas,
+                'patrones': self.version_patrones,
+                'fijado': False,
+                'creado': datetime.now().isoformat(timespec='seconds'),
+            }
+            self._escribir_archivo()
+        return dict(columnas)
+
+    def fijar(self, encabezados, columnas):
+        """
+        Fija {campo: columna} para esta planilla (los campos no incluidos se siguen
+        detectando). Devuelve la huella.
+        """
+        encabezados = list(encabezados)
+        nombres = [str(c) for c in encabezados]
+        desconocidos = [campo for campo in columnas if campo not in self.patrones]
+        if desconocidos:
+            raise ValueError(f"Campos desconocidos: {', '.join(desconocidos)} (opciones: {', '.join(self.patrones)})")
+        inexistentes = [c for c in columnas.values() if c is not None and c not in nombres]
+        if inexistentes:
+            raise ValueError(f"Columnas que no están en la planilla: {', '.join(inexistentes)}")
+        huella = huella_encabezados(encabezados)
+        with self._lock:
+            self._cargar()
+            self._soltados.discard(huella)
+            self._mapeos[huella] = {
+                'encabezados': nombres,
+                'columnas': dict(columnas),
+                'patrones': self.version_patrones,
+                'fijado': True,
+                'creado': datetime.now().isoformat(timespec='seconds'),
+            }
+            self._escribir_archivo()
+        return huella
+
+    def soltar(self, huella):
+        """Quita el mapeo (fijado o detectado) de una huella. True si existía."""
+        with self._lock:
+            self._cargar()
+            existia = self._mapeos.pop(huella, None) is not None
+            if existia:
+                self._soltados.add(huella)
+                self._escribir_archivo()
+            return existia
+
+    def entradas(self):
+        """Copia de los mapeos conocidos {huella: entrada}."""
+        with self._lock:
+            self._cargar()
+            return json.loads(json.dumps(self._mapeos))
+
+    def estadisticas(self):
+        with self._lock:
+            self._cargar()
+            return {
+                'mapeos': len(self._mapeos),
+                'fijados': sum(1 for e in self._mapeos.values() if e.get('fijado')),
+                'aciertos': self.aciertos,
+                'detecciones': self.detecciones,
+                'archivo': self.ruta,
+            }
+
+# Mapeador compartido del proceso
+mapeador_columnas = MapeadorColumnas()
+
+# --- LÍNEA DE COMANDOS ---
+def _encabezados_de(archivo):
+    from lector_excel import leer_encabezados
+    encabezados = leer_encabezados(archivo)
+    if encabezados is None:
+        sys.exit(1)
+    return encabezados
+
+def main():
+    parser = argparse.ArgumentParser(description="Mapeos de columnas de planillas de inscripción")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    mostrar = sub.add_parser('mostrar', help="muestra cómo se mapea una planilla")
+    mostrar.add_argument('archivo')
+    fijar = sub.add_parser('fijar', help="fija columnas para el formato de una planilla")
+    fijar.add_argument('archivo')
+    fijar.add_argument('asignaciones', nargs='+', metavar='campo=columna')
+    soltar = sub.add_parser('soltar', help="quita el mapeo de una planilla (archivo o huella)")
+    soltar.add_argument('archivo_o_huella')
+    sub.add_parser('listar', help="lista los mapeos guardados")
+    args = parser.parse_args()
+
+    if args.comando == 'mostrar':
+        encabezados = _encabezados_de(args.archivo)
+        print(f"🔑 Huella: {huella_encabezados(encabezados)}")
+        for campo, columna in mapeador_columnas.resolver(encabezados).items():
+            requerido = " (requerido)" if campo in CAMPOS_REQUERIDOS else ""
+            print(f"  • {campo}{requerido}: {columna if columna else 'No encontrada'}")
+    elif args.comando == 'fijar':
+        columnas = {}
+        for asignacion in args.asignaciones:
+            campo, separador, columna = asignacion.partition('=')
+            if not separador:
+                parser.error(f"Asignación inválida '{asignacion}', se espera campo=columna")
+            columnas[campo.strip()] = columna.strip() or None
+        try:
+            huella = mapeador_columnas.fijar(_encabezados_de(args.archivo), columnas)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"📌 Mapeo fijado para {huella}: {columnas}")
+    elif args.comando == 'soltar':
+        objetivo = args.archivo_o_huella
+        huella = huella_encabezados(_encabezados_de(objetivo)) if os.path.exists(objetivo) else objetivo
+        if mapeador_columnas.soltar(huella):
+            print(f"🗑️ Mapeo {huella} eliminado")
+        else:
+            print(f"⚠️ No hay mapeo guardado para {huella}")
+    else:
+        for huella, entrada in mapeador_columnas.entradas().items():
+            estado = "📌 fijado" if entrada.get('fijado') else "detectado"
+            print(f"{huella}  {estado:<10} {entrada.get('creado', '')}  {', '.join(entrada['encabezados'])}")
+            for campo, columna in entrada['columnas'].items():
+                if columna:
+                    print(f"    • {campo}: {columna}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Armado del JSON de categorías para el editor (/api/process-file).
+Las columnas de nombre, academia y documento se calculan una sola vez para
+todo el DataFrame y las categorías salen de un único groupby, en lugar de
+filtrar el DataFrame por cada categoría y recorrer las filas con iterrows.
+El resultado es el mismo que el armado original, fila por fila.
+"""
+
+import pandas as pd
+
+CAMPOS_PARTICIPANTE = (
+    ('age', 'edad'),
+    ('weight', 'categoria_peso'),
+    ('level', 'nivel_normalizado'),
+    ('gender', 'sexo_normalizado'),
+)
+
+def _valores(df, columna):
+    """Valores de una columna como objetos de Python (None si la columna no existe)."""
+    if columna not in df.columns:
+        return [None] * len(df)
+    # Las columnas compactas (Int16) marcan los faltantes con pd.NA, que no va a JSON
+    return [None if valor is pd.NA else valor for valor in df[columna].tolist()]
+
+def _texto_si_hay_valor(df, columna):
+    """str(valor).strip() para los valores con valor de verdad; '' para vacíos, 0 o None."""
+    if not columna:
+        return [""] * len(df)
+    return [str(valor).strip() if valor else "" for valor in df[columna].tolist()]
+
+def nombres_completos(df, columnas):
+    """
+    Nombre para mostrar de cada fila: "nombre apellido", solo el nombre, o la
+    primera columna que contenga 'nombre' (con "Participante <índice>" si está vacía).
+    """
+    nombre, apellido = columnas.get('nombre'), columnas.get('apellido')
+    if nombre and apellido:
+        return [f"{n} {a}" for n, a in zip(df[nombre].tolist(), df[apellido].tolist())]
+    if nombre:
+        return [str(n) for n in df[nombre].tolist()]
+    respaldo = next((c for c in df.columns if 'nombre' in c.lower()), None)
+    valores = df[respaldo].tolist() if respaldo is not None else [""] * len(df)
+    return [str(valor) or f"Participante {idx}" for valor, idx in zip(valores, df.index)]
+
+def armar_categorias_editor(df, columnas):
+    """
+    {categoria: {'name', 'participants', 'count'}} en el orden en que aparecen
+    las categorías. df debe traer solo filas con 'categoria_completa'.
+    """
+    claves = ('name', 'academy', 'document') + tuple(clave for clave, _ in CAMPOS_PARTICIPANTE)
+    valores = [
+        nombres_completos(df, columnas),
+        _texto_si_hay_valor(df, columnas.get('abreviatura')),
+        _texto_si_hay_valor(df, columnas.get('documento')),
+    ] + [_valores(df, columna) for _, columna in CAMPOS_PARTICIPANTE]
+    registros = [dict(zip(claves, fila)) for fila in zip(*valores)]
+
+    categorias = {}
+    for categoria, posiciones in df.groupby('categoria_completa', sort=False, observed=True).indices.items():
+        participantes = [registros[i] for i in posiciones]
+        categorias[categoria] = {
+            'name': categoria,
+            'participants': participantes,
+            'count': len(participantes)
+        }
+    return categorias
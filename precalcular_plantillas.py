@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Precalcula la geometría (líneas y círculos) de las plantillas de brackets.
+Se ejecuta en el deploy para que generar brackets no haga visión por computadora.
+
+Uso:
+    python precalcular_plantillas.py [carpeta_plantillas]
+"""
+
+import sys
+
+from filo_0_5 import precalcular_geometria_plantillas
+
+def main():
+    plantillas_path = sys.argv[1] if len(sys.argv) > 1 else "bracket_templates"
+    print(f"📐 Precalculando geometría de plantillas en {plantillas_path}...")
+    entradas = precalcular_geometria_plantillas(plantillas_path)
+    if not entradas:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ Asegura que la aplicación se vincule correctamente y sea detectable
 """
 
 import os
-from app import app
+from app import app, iniciar_servicios
 
 if __name__ == '__main__':
     # Obtener puerto de Render
@@ -17,6 +17,8 @@ if __name__ == '__main__':
     print(f"🌐 Puerto: {port}")
     print(f"🔧 Debug: {app.config['DEBUG']}")
     
+    iniciar_servicios()
+    
     # En Render, siempre usar 0.0.0.0 para ser accesible externamente
     app.run(
         host='0.0.0.0',
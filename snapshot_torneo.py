@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Snapshot binario del torneo clasificado.
+El pipeline pasa el DataFrame en memoria de la clasificación a los brackets y
+además lo guarda en un formato binario (Feather/Arrow o Parquet con pyarrow, o
+pickle de pandas si se pide) para que las re-corridas lo carguen sin volver a
+parsear CATEGORIAS.xlsx: generar_brackets_desde_excel busca el snapshot junto al
+Excel (ver snapshot_vigente) y solo lee el Excel si no hay uno. Feather se escribe sin compresión, así
+se puede mapear en memoria y leer solo las columnas necesarias. Los Excel
+siguen siendo los entregables para el usuario; el pickle nunca se entrega
+(ver exportacion_zip.es_entregable).
+
+TOURNAMENT_SNAPSHOT elige el formato: auto (por defecto: feather si hay
+pyarrow, si no no se guarda), feather, parquet, pickle o none. pyarrow está en
+requirements.txt; sin él el pipeline sigue, solo que sin snapshot.
+"""
+
+import os
+
+import pandas as pd
+
+FORMATOS = ('feather', 'parquet', 'pickle')
+EXTENSIONES = {'feather': '.feather', 'parquet': '.parquet', 'pickle': '.pkl'}
+NOMBRE_SNAPSHOT = 'torneo_clasificado'
+
+_pyarrow = None
+
+def pyarrow_disponible():
+    """True si está instalado pyarrow (Feather y Parquet)."""
+    global _pyarrow
+    if _pyarrow is None:
+        try:
+            import pyarrow  # noqa: F401
+            _pyarrow = True
+        except ImportError:
+            _pyarrow = False
+    return _pyarrow
+
+def resolver_formato(formato=None):
+    """
+    None = variable TOURNAMENT_SNAPSHOT. 'auto' = feather si hay pyarrow, si no
+    ninguno. Devuelve None si el snapshot está desactivado.
+    """
+    if formato is None:
+        formato = os.environ.get('TOURNAMENT_SNAPSHOT', 'auto')
+    formato = (formato or '').strip().lower()
+    if formato in ('', 'none', '0'):
+        return None
+    if formato == 'auto':
+        return 'feather' if pyarrow_disponible() else None
+    if formato not in FORMATOS:
+        print(f"⚠️ Formato de snapshot desconocido '{formato}' (opciones: auto, {', '.join(FORMATOS)}, none)")
+        return None
+    if formato != 'pickle' and not pyarrow_disponible():
+        print(f"⚠️ {formato} requiere pyarrow (pip install pyarrow), no se guarda el snapshot")
+        return None
+    return formato
+
+def ruta_snapshot(carpeta, formato):
+    return os.path.join(carpeta, NOMBRE_SNAPSHOT + EXTENSIONES[formato])
+
+def buscar_snapshot(carpeta):
+    """Ruta del snapshot más reciente guardado en carpeta (cualquier formato) o None."""
+    rutas = [ruta_snapshot(carpeta, formato) for formato in FORMATOS]
+    rutas = [ruta for ruta in rutas if os.path.isfile(ruta)]
+    return max(rutas, key=os.path.getmtime) if rutas else None
+
+def snapshot_vigente(archivo_excel):
+    """
+    Snapshot guardado junto a archivo_excel que se pueda usar en su lugar, o None.
+    Solo vale si no es más viejo que el Excel: si CATEGORIAS.xlsx se volvió a
+    escribir (otra corrida, clasificación en bloques o una edición a mano) manda el Excel.
+    Los formatos Arrow sin pyarrow instalado no se pueden leer y se ignoran.
+    """
+    ruta = buscar_snapshot(os.path.dirname(os.path.abspath(archivo_excel)))
+    if ruta is None:
+        return None
+    if _formato_de_ruta(ruta) != 'pickle' and not pyarrow_disponible():
+        return None
+    try:
+        if os.path.getmtime(ruta) < os.path.getmtime(archivo_excel):
+            return None
+    except OSError:
+        return None
+    return ruta
+
+def _formato_de_ruta(ruta):
+    for formato, extension in EXTENSIONES.items():
+        if str(ruta).lower().endswith(extension):
+            return formato
+    return None
+
+def es_snapshot(ruta):
+    """True si la ruta tiene la extensión de un snapshot (en lugar de un Excel)."""
+    return _formato_de_ruta(ruta) is not None
+
+def _tipos_mezclados(serie):
+    return len(set(type(valor) for valor in serie.dropna().tolist())) > 1
+
+def preparar_para_arrow(df):
+    """
+    Copia del DataFrame que Arrow puede guardar: índice por defecto, nombres de
+    columna como texto y columnas object con tipos mezclados (p. ej. fechas de
+    Excel junto a fechas escritas como texto) pasadas a texto, con faltantes vacíos.
+    """
+    df = df.reset_index(drop=True)
+    df.columns = [str(columna) for columna in df.columns]
+    for columna in df.columns[df.dtypes == object]:
+        serie = df[columna]
+        if _tipos_mezclados(serie):
+            df[columna] = serie.map(str).where(serie.notna(), None)
+    return df
+
+def guardar_snapshot(df, carpeta, formato=None):
+    """
+    Guarda el DataFrame clasificado en carpeta con el formato elegido (ver
+    resolver_formato). Se escribe en un temporal y se renombra. Devuelve la
+    ruta, o None si está desactivado o no se pudo guardar (el pipeline sigue).
+    """
+    formato = resolver_formato(formato)
+    if formato is None:
+        return None
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = ruta_snapshot(carpeta, formato)
+    temporal = os.path.join(carpeta, f".{os.path.basename(ruta)}.tmp")
+    try:
+        if formato == 'pickle':
+            df.reset_index(drop=True).to_pickle(temporal)
+        elif formato == 'feather':
+            preparar_para_arrow(df).to_feather(temporal, compression='uncompressed')
+        else:
+            preparar_para_arrow(df).to_parquet(temporal, index=False)
+        os.replace(temporal, ruta)
+    except Exception as e:
+        print(f"⚠️ No se pudo guardar el snapshot del torneo ({formato}): {e}")
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        return None
+    print(f"💾 Snapshot del torneo guardado: {ruta}")
+    return ruta
+
+def leer_columnas_snapshot(ruta):
+    """Nombres de columna del snapshot sin cargar los datos (pickle se carga completo)."""
+    formato = _formato_de_ruta(ruta)
+    if formato == 'feather':
+        import pyarrow.feather as feather
+        return list(feather.read_table(ruta, memory_map=True).schema.names)
+    if formato == 'parquet':
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(ruta).names)
+    return list(pd.read_pickle(ruta).columns)
+
+def cargar_snapshot(ruta, columnas=None):
+    """
+    DataFrame del snapshot. Con columnas solo se leen esas (las que existan);
+    Feather y Parquet se abren mapeados en memoria.
+    """
+    formato = _formato_de_ruta(ruta)
+    if formato is None:
+        raise ValueError(f"No es un snapshot de torneo: {ruta}")
+    if formato == 'pickle':
+        df = pd.read_pickle(ruta)
+        return df if columnas is None else df[[c for c in columnas if c in df.columns]]
+    if columnas is not None:
+        disponibles = set(leer_columnas_snapshot(ruta))
+        columnas = [columna for columna in columnas if columna in disponibles]
+    if formato == 'feather':
+        import pyarrow.feather as feather
+        return feather.read_table(ruta, columns=columnas, memory_map=True).to_pandas()
+    return pd.read_parquet(ruta, columns=columnas, memory_map=True)
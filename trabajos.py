@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Cola de trabajos de torneo para la web.
+/upload guarda los archivos, encola un trabajo y responde al instante; un pool
+local de hilos ejecuta el pipeline y /status/<job_id> informa el avance por
+etapa. No necesita broker externo: el estado vive en memoria o, si se
+configura JOB_STORE, en una base SQLite que sobrevive a reinicios.
+En memoria los trabajos terminados se descartan pasadas STORAGE_RETENTION_HOURS
+horas (las mismas que conservan sus archivos) o al superar MAXIMO_TERMINADOS.
+Cuando la limpieza del disco borra los archivos de un trabajo, su registro queda
+como expirado (ver expirar).
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
+from almacenamiento import resolver_retencion_horas
+from instrumentacion import Instrumentacion
+
+EN_COLA = 'en_cola'
+EN_PROCESO = 'en_proceso'
+COMPLETADO = 'completado'
+ERROR = 'error'
+# Terminado y con sus archivos ya borrados por la limpieza del disco
+EXPIRADO = 'expirado'
+TERMINADOS = (COMPLETADO, ERROR, EXPIRADO)
+# Trabajos terminados que conserva el almacén en memoria (los más viejos se descartan)
+MAXIMO_TERMINADOS = 1000
+
+def _ahora():
+    return datetime.now().isoformat(timespec='seconds')
+
+class AlmacenTrabajosMemoria:
+    """
+    Guarda los trabajos en un diccionario del proceso. Los terminados se
+    descartan después de retencion_horas (None = STORAGE_RETENTION_HOURS, 0 = sin
+    vencimiento) o, si son más de maximo_terminados, los más viejos primero.
+    Los trabajos en cola o en proceso nunca se descartan.
+    """
+
+    def __init__(self, retencion_horas=None, maximo_terminados=MAXIMO_TERMINADOS):
+        self._trabajos = {}
+        # id -> momento (monotónico) en que se guardó terminado, del más viejo al más nuevo
+        self._terminados = OrderedDict()
+        self.retencion_s = resolver_retencion_horas(retencion_horas) * 3600
+        self.maximo_terminados = maximo_terminados
+        self._lock = threading.Lock()
+
+    def guardar(self, trabajo):
+        with self._lock:
+            self._trabajos[trabajo['id']] = json.loads(json.dumps(trabajo))
+            if trabajo['estado'] in TERMINADOS:
+                self._terminados[trabajo['id']] = time.monotonic()
+                self._terminados.move_to_end(trabajo['id'])
+            else:
+                self._terminados.pop(trabajo['id'], None)
+            self._descartar_viejos()
+
+    def _descartar_viejos(self):
+        limite = time.monotonic() - self.retencion_s
+        while self._terminados:
+            trabajo_id, guardado = next(iter(self._terminados.items()))
+            vencido = self.retencion_s and guardado < limite
+            if not vencido and len(self._terminados) <= self.maximo_terminados:
+                break
+            del self._terminados[trabajo_id]
+            del self._trabajos[trabajo_id]
+
+    def obtener(self, trabajo_id):
+        with self._lock:
+            trabajo = self._trabajos.get(trabajo_id)
+            return json.loads(json.dumps(trabajo)) if trabajo else None
+
+    def pendientes(self):
+        with self._lock:
+            return [json.loads(json.dumps(t)) for t in self._trabajos.values()
+                    if t['estado'] in (EN_COLA, EN_PROCESO)]
+
+class AlmacenTrabajosSQLite:
+    """Guarda los trabajos en SQLite para poder retomarlos tras un reinicio."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        with self._conectar() as conexion:
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS trabajos ("
+                " id TEXT PRIMARY KEY, estado TEXT NOT NULL, creado TEXT NOT NULL, datos TEXT NOT NULL)"
+            )
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=30)
+
+    def guardar(self, trabajo):
+        with self._lock, self._conectar() as conexion:
+            conexion.execute(
+                "INSERT OR REPLACE INTO trabajos (id, estado, creado, datos) VALUES (?, ?, ?, ?)",
+                (trabajo['id'], trabajo['estado'], trabajo['creado'], json.dumps(trabajo)),
+            )
+
+    def obtener(self, trabajo_id):
+        with self._lock, self._conectar() as conexion:
+            fila = conexion.execute("SELECT datos FROM trabajos WHERE id = ?", (trabajo_id,)).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def pendientes(self):
+        with self._lock, self._conectar() as conexion:
+            filas = conexion.execute(
+                "SELECT datos FROM trabajos WHERE estado IN (?, ?) ORDER BY creado", (EN_COLA, EN_PROCESO)
+            ).fetchall()
+        return [json.loads(fila[0]) for fila in filas]
+
+def expirar(almacen, trabajo_id):
+    """
+    Marca como expirado un trabajo terminado cuyos archivos se borraron; el
+    resultado se descarta (sus archivos ya no existen). Devuelve False si el
+    trabajo no está en el almacén o sigue en cola o en proceso.
+    """
+    trabajo = almacen.obtener(trabajo_id)
+    if trabajo is None or trabajo['estado'] not in (COMPLETADO, ERROR):
+        return False
+    trabajo['estado'] = EXPIRADO
+    trabajo['expirado'] = _ahora()
+    trabajo['resultado'] = None
+    almacen.guardar(trabajo)
+    return True
+
+def crear_almacen(ruta_sqlite=None, retencion_horas=None):
+    """Almacén SQLite si se indica una ruta, en memoria (con retencion_horas) si no."""
+    if ruta_sqlite:
+        return AlmacenTrabajosSQLite(ruta_sqlite)
+    return AlmacenTrabajosMemoria(retencion_horas)
+
+class ProgresoTrabajo:
+    """
+    Registra el avance de un trabajo; lo recibe la función del pipeline.
+    Cada etapa se mide también con instrumentacion (CPU, contadores, bytes).
+    """
+
+    def __init__(self, gestor, trabajo):
+        self._gestor = gestor
+        self._trabajo = trabajo
+        self.instrumentacion = Instrumentacion(trabajo=trabajo['id'])
+
+    @contextmanager
+    def etapa(self, nombre):
+        """
+        Marca una etapa como en proceso y guarda su duración y métricas al terminar.
+        Entrega la Etapa de instrumentacion para que el pipeline cargue contadores.
+        """
+        registro = {'nombre': nombre, 'estado': EN_PROCESO, 'inicio': _ahora(), 'duracion_s': None}
+        self._trabajo['etapas'].append(registro)
+        self._trabajo['etapa_actual'] = nombre
+        self._gestor._guardar(self._trabajo)
+        inicio = time.perf_counter()
+        try:
+            with self.instrumentacion.etapa(nombre) as etapa:
+                yield etapa
+        except Exception:
+            registro['estado'] = ERROR
+            raise
+        else:
+            registro['estado'] = COMPLETADO
+        finally:
+            registro['duracion_s'] = round(time.perf_counter() - inicio, 3)
+            # CPU, contadores y bytes de la etapa medida por instrumentacion
+            medida = self.instrumentacion.etapas[-1]
+            registro.update({k: v for k, v in medida.items() if k not in ('nombre', 'estado', 'inicio', 'wall_s')})
+            self._gestor._guardar(self._trabajo)
+
+class GestorTrabajos:
+    """
+    Pool local de hilos que ejecuta funcion(progreso, **parametros) por trabajo.
+    Lo que devuelve la función queda en trabajo['resultado'].
+    """
+
+    def __init__(self, funcion, workers=1, almacen=None):
+        self.funcion = funcion
+        self.workers = max(1, int(workers))
+        self.almacen = almacen or AlmacenTrabajosMemoria()
+        self._cola = queue.Queue()
+        self._hilos = []
+        self._lock = threading.Lock()
+
+    def _asegurar_workers(self):
+        with self._lock:
+            while len(self._hilos) < self.workers:
+                hilo = threading.Thread(target=self._bucle_worker, name=f"trabajos-{len(self._hilos) + 1}", daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+
+    def _guardar(self, trabajo):
+        self.almacen.guardar(trabajo)
+
+    def encolar(self, trabajo_id, **parametros):
+        """Crea el trabajo en estado en_cola y lo pone en la cola. Los parámetros deben ser serializables a JSON."""
+        trabajo = {
+            'id': trabajo_id,
+            'estado': EN_COLA,
+            'creado': _ahora(),
+            'iniciado': None,
+            'finalizado': None,
+            'duracion_s': None,
+            'etapa_actual': None,
+            'etapas': [],
+            'parametros': parametros,
+            'resultado': None,
+            'error': None,
+        }
+        self._guardar(trabajo)
+        self._cola.put(trabajo_id)
+        self._asegurar_workers()
+        return trabajo
+
+    def obtener(self, trabajo_id):
+        return self.almacen.obtener(trabajo_id)
+
+    def activos(self):
+        """Ids de los trabajos en cola o en proceso (sus archivos no se pueden borrar)."""
+        return {trabajo['id'] for trabajo in self.almacen.pendientes()}
+
+    def expirar(self, trabajo_id):
+        """Marca el trabajo como expirado tras borrar sus archivos (ver expirar)."""
+        return expirar(self.almacen, trabajo_id)
+
+    def recuperar_pendientes(self):
+        """Vuelve a encolar los trabajos que quedaron sin terminar (solo útil con SQLite)."""
+        pendientes = self.almacen.pendientes()
+        for trabajo in pendientes:
+            trabajo['estado'] = EN_COLA
+            trabajo['etapas'] = []
+            trabajo['etapa_actual'] = None
+            self._guardar(trabajo)
+            self._cola.put(trabajo['id'])
+        if pendientes:
+            print(f"🔁 {len(pendientes)} trabajos pendientes reencolados")
+            self._asegurar_workers()
+        return len(pendientes)
+
+    def _bucle_worker(self):
+        while True:
+            trabajo_id = self._cola.get()
+            try:
+                self._ejecutar(trabajo_id)
+            finally:
+                self._cola.task_done()
+
+    def _ejecutar(self, trabajo_id):
+        trabajo = self.almacen.obtener(trabajo_id)
+        if trabajo is None or trabajo['estado'] != EN_COLA:
+            return
+        trabajo['estado'] = EN_PROCESO
+        trabajo['iniciado'] = _ahora()
+        self._guardar(trabajo)
+        inicio = time.perf_counter()
+        try:
+            trabajo['resultado'] = self.funcion(ProgresoTrabajo(self, trabajo), **trabajo['parametros'])
+            trabajo['estado'] = COMPLETADO
+        except Exception as e:
+            print(f"❌ Error en trabajo {trabajo_id}: {e}")
+            print(traceback.format_exc())
+            trabajo['estado'] = ERROR
+            trabajo['error'] = str(e)
+        finally:
+            trabajo['etapa_actual'] = None
+            trabajo['finalizado'] = _ahora()
+            trabajo['duracion_s'] = round(time.perf_counter() - inicio, 3)
+            self._guardar(trabajo)
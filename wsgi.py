@@ -5,7 +5,10 @@ Compatible con Render, Railway, Heroku y otros servidores WSGI
 """
 
 import os
-from app import app
+from app import app, iniciar_servicios
+
+# Servidores WSGI importan este módulo: la cola y el barrido arrancan acá
+iniciar_servicios()
 
 if __name__ == "__main__":
     # Configuración específica para Render